@@ -0,0 +1,109 @@
+"""Micro-benchmark of UserRepositoryDB hot queries.
+
+Compares the CPU time per call of building each query from scratch, as the
+repository used to, against executing its prebuilt statement.
+
+Usage:
+    python -m benchmarks.hot_queries [--calls N] [--user-id ID]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+from newsreader.db import (
+    database,
+    read_later_table,
+    user_favorites_table,
+    user_friends_table,
+    user_table,
+)
+from newsreader.infrastructure.repository import (
+    _favorites_query,
+    _friend_ids_query,
+    _read_later_query,
+    _user_aggregate_by_id_query,
+    _user_aggregate_query,
+)
+
+Query = Tuple[Any, Optional[Dict[str, Any]]]
+
+CASES: Dict[str, Tuple[Callable[[int], Query], Callable[[int], Query]]] = {
+    "get_by_id": (
+        lambda user_id: (
+            _user_aggregate_query.where(user_table.c.id == user_id),
+            None,
+        ),
+        lambda user_id: (_user_aggregate_by_id_query, {"user_id": user_id}),
+    ),
+    "get_friend_ids": (
+        lambda user_id: (
+            select(user_friends_table.c.friend_id).where(
+                user_friends_table.c.user_id == user_id
+            ),
+            None,
+        ),
+        lambda user_id: (_friend_ids_query, {"user_id": user_id}),
+    ),
+    "get_favorites": (
+        lambda user_id: (
+            select(
+                user_favorites_table.c.news_id, user_favorites_table.c.title
+            ).where(user_favorites_table.c.user_id == user_id),
+            None,
+        ),
+        lambda user_id: (_favorites_query, {"user_id": user_id}),
+    ),
+    "get_read_later": (
+        lambda user_id: (
+            select(read_later_table.c.news_id, read_later_table.c.title).where(
+                read_later_table.c.user_id == user_id
+            ),
+            None,
+        ),
+        lambda user_id: (_read_later_query, {"user_id": user_id}),
+    ),
+}
+
+
+async def _cpu_per_call(
+    make_query: Callable[[int], Query], calls: int, user_id: int
+) -> float:
+    """Return the process CPU time per call in microseconds."""
+    started = time.process_time()
+    for _ in range(calls):
+        query, values = make_query(user_id)
+        await database.fetch_all(query, values)
+    return (time.process_time() - started) / calls * 1e6
+
+
+async def run(calls: int, user_id: int) -> None:
+    await database.connect()
+    # one connection for all calls, so pool checkouts do not add noise
+    async with database.transaction():
+        for name, (rebuilt, prebuilt) in CASES.items():
+            await _cpu_per_call(rebuilt, 100, user_id)  # warm up caches
+            await _cpu_per_call(prebuilt, 100, user_id)
+            before = await _cpu_per_call(rebuilt, calls, user_id)
+            after = await _cpu_per_call(prebuilt, calls, user_id)
+            print(
+                f"{name:<16} rebuilt {before:8.1f} us/call"
+                f"  prebuilt {after:8.1f} us/call"
+                f"  saved {before - after:8.1f} us/call"
+            )
+    await database.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="hot_queries")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--user-id", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+"""Load test of every endpoint of the app, against local stand-ins.
+
+Creates a scratch database on the configured Postgres server (DB_HOST,
+DB_USER, DB_PASSWORD), seeds it with benchmarks.seed, starts
+benchmarks.stub_api in place of thenewsapi and the app under uvicorn,
+each in its own process. Then every endpoint of newsreader/api/routers.py
+is driven in turn by a fixed number of concurrent clients. Latency
+percentiles and requests per second are printed as JSON.
+
+With --baseline, the run fails when a scenario regresses against the
+stored results: p95 latency or errors grew, or throughput dropped, by
+more than --tolerance. A baseline only compares with a run of the same
+settings, and depends on the machine, so save one (--save-baseline)
+where the comparisons will run.
+
+Usage:
+    python -m benchmarks.load [--requests N] [--concurrency N]
+        [--users N] [--latency-ms MS] [--output PATH]
+        [--baseline PATH [--tolerance F]] [--save-baseline PATH]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import aiohttp
+import asyncpg  # type: ignore
+
+from newsreader.config import config
+
+from benchmarks.stub_api import CATEGORIES
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# method, path, query params, JSON body
+Request = Tuple[str, str, Optional[Dict[str, Any]], Any]
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable[[int], Request]
+    # writes are not warmed up, as every request index changes data once
+    writes: bool = False
+
+
+@dataclass
+class Fixtures:
+    """Data the scenarios pick from, prepared before measuring."""
+
+    users: int
+    news: int
+    spare_users: List[int]
+    deletable_users: List[int]
+    user_bodies: List[Dict[str, Any]]
+
+    def user_id(self, i: int) -> int:
+        # spread requests over users rather than walking them in order
+        return 1 + (i * 7919) % self.users
+
+    def news_id(self, i: int) -> str:
+        return f"u{(i * 104729) % self.news}"
+
+
+def _get(path: str, **params: Any) -> Request:
+    return "GET", path, params or None, None
+
+
+def _scenarios(f: Fixtures, requests: int) -> List[Scenario]:
+    half = requests // 2
+
+    def add_or_delete_friend(i: int) -> Request:
+        # each pair of spare users is befriended, then unfriended
+        user_id = f.spare_users[i // 2]
+        friend_id = f.spare_users[i // 2 + half]
+        if i % 2:
+            return "DELETE", f"/user/{user_id}/friends/{friend_id}", None, None
+        return (
+            "POST",
+            f"/user/{user_id}/friends",
+            {"friend_id": friend_id},
+            None,
+        )
+
+    def update_user(i: int) -> Request:
+        body = dict(f.user_bodies[i % len(f.user_bodies)])
+        body["name"] = f"user {body['id']} v{i}"
+        return "PUT", f"/user/{body['id']}", None, body
+
+    return [
+        Scenario("user_all", lambda i: _get("/user/all", limit=100)),
+        Scenario("user_by_id", lambda i: _get(f"/user/{f.user_id(i)}")),
+        Scenario(
+            "user_friends", lambda i: _get(f"/user/{f.user_id(i)}/friends")
+        ),
+        Scenario(
+            "user_favorites",
+            lambda i: _get(f"/user/{f.user_id(i)}/favorites"),
+        ),
+        Scenario(
+            "user_favorites_full",
+            lambda i: _get(f"/user/{f.user_id(i)}/favorites", expand="full"),
+        ),
+        Scenario(
+            "user_read_later",
+            lambda i: _get(f"/user/{f.user_id(i)}/read-later"),
+        ),
+        Scenario(
+            "user_recommended",
+            lambda i: _get(f"/user/{f.user_id(i)}/recommended"),
+        ),
+        Scenario(
+            "user_suggested_friends",
+            lambda i: _get(f"/user/{f.user_id(i)}/suggested-friends"),
+        ),
+        Scenario("user_feed", lambda i: _get(f"/user/{f.user_id(i)}/feed")),
+        Scenario(
+            "user_create",
+            lambda i: ("POST", "/user/create", None, {"id": 0, "name": "new"}),
+            writes=True,
+        ),
+        Scenario("user_update", update_user, writes=True),
+        Scenario(
+            "user_delete",
+            lambda i: ("DELETE", f"/user/{f.deletable_users[i]}", None, None),
+            writes=True,
+        ),
+        Scenario("user_friend_add_delete", add_or_delete_friend, writes=True),
+        Scenario(
+            "user_favorite_add_delete",
+            lambda i: (
+                "DELETE" if i % 2 else "POST",
+                f"/user/{f.user_id(i // 2)}/favorites",
+                {"news_id": f"bench-{i // 2}", "title": "Benchmark"},
+                None,
+            ),
+            writes=True,
+        ),
+        Scenario(
+            "user_read_later_add_delete",
+            lambda i: (
+                "DELETE" if i % 2 else "POST",
+                f"/user/{f.user_id(i // 2)}/read-later",
+                {"news_id": f"bench-{i // 2}", "title": "Benchmark"},
+                None,
+            ),
+            writes=True,
+        ),
+        Scenario("news_top", lambda i: _get("/news/top", limit=10)),
+        Scenario(
+            "news_top_category",
+            lambda i: _get(
+                "/news/top", limit=25, categories=CATEGORIES[i % 10]
+            ),
+        ),
+        Scenario(
+            "news_top_stream",
+            lambda i: _get("/news/top", limit=50, stream="true"),
+        ),
+        Scenario(
+            "news_all_search",
+            lambda i: _get("/news/all", limit=10, search=f"topic{i % 5}"),
+        ),
+        Scenario(
+            "news_batch",
+            lambda i: _get(
+                "/news/batch",
+                ids=",".join(f.news_id(i * 10 + j) for j in range(10)),
+            ),
+        ),
+        Scenario("news_by_id", lambda i: _get(f"/news/{f.news_id(i)}")),
+        Scenario("metrics_news_cache", lambda i: _get("/metrics/news-cache")),
+        Scenario("metrics_upstream", lambda i: _get("/metrics/upstream")),
+        Scenario("metrics_db", lambda i: _get("/metrics/db")),
+        Scenario(
+            "metrics_news_parsing", lambda i: _get("/metrics/news-parsing")
+        ),
+        Scenario(
+            "metrics_response_cache",
+            lambda i: _get("/metrics/response-cache"),
+        ),
+        Scenario("metrics_feed_cache", lambda i: _get("/metrics/feed-cache")),
+        Scenario(
+            "metrics_friend_graph", lambda i: _get("/metrics/friend-graph")
+        ),
+    ]
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    index = min(
+        len(sorted_values) - 1, round(percent / 100 * (len(sorted_values) - 1))
+    )
+    return sorted_values[index]
+
+
+async def _drive(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    scenario: Scenario,
+    indexes: range,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Send one request per index from `concurrency` clients at a time."""
+    pending = iter(indexes)
+    latencies: List[float] = []
+    errors = 0
+
+    async def client() -> None:
+        nonlocal errors
+        for i in pending:
+            method, path, params, body = scenario.request(i)
+            started = time.perf_counter()
+            try:
+                async with session.request(
+                    method, base_url + path, params=params, json=body
+                ) as response:
+                    await response.read()
+                    failed = response.status >= 400
+            except aiohttp.ClientError:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+    }
+
+
+async def _fixtures(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    users: int,
+    news: int,
+    requests: int,
+) -> Fixtures:
+    async def create_users(count: int) -> List[int]:
+        ids = []
+        for _ in range(count):
+            async with session.post(
+                base_url + "/user/create", json={"id": 0, "name": "spare"}
+            ) as response:
+                ids.append(int(await response.json()))
+        return ids
+
+    bodies = []
+    for user_id in range(1, min(users, 50) + 1):
+        async with session.get(f"{base_url}/user/{user_id}") as response:
+            bodies.append(await response.json())
+    return Fixtures(
+        users=users,
+        news=news,
+        spare_users=await create_users(requests),
+        deletable_users=await create_users(requests),
+        user_bodies=bodies,
+    )
+
+
+async def _run_scenarios(
+    base_url: str, args: argparse.Namespace
+) -> Dict[str, Dict[str, Any]]:
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=timeout
+    ) as session:
+        fixtures = await _fixtures(
+            session, base_url, args.users, args.news, args.requests
+        )
+        results = {}
+        for scenario in _scenarios(fixtures, args.requests):
+            if args.only and not re.search(args.only, scenario.name):
+                continue
+            if not scenario.writes:
+                await _drive(
+                    session,
+                    base_url,
+                    scenario,
+                    range(args.requests, args.requests + args.warmup),
+                    args.concurrency,
+                )
+            results[scenario.name] = await _drive(
+                session,
+                base_url,
+                scenario,
+                range(args.requests),
+                args.concurrency,
+            )
+            print(scenario.name, results[scenario.name], file=sys.stderr)
+        return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _recreate_database(name: str) -> None:
+    if not re.fullmatch(r"[a-z_][a-z0-9_]*", name):
+        raise ValueError(f"Invalid database name: {name!r}")
+    conn = await asyncpg.connect(
+        f"postgresql://{config.DB_USER}:{config.DB_PASSWORD}"
+        f"@{config.DB_HOST}/postgres"
+    )
+    try:
+        await conn.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+        await conn.execute(f"CREATE DATABASE {name}")
+    finally:
+        await conn.close()
+
+
+@contextmanager
+def _process(
+    command: List[str], env: Dict[str, str]
+) -> Iterator[subprocess.Popen]:
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _wait_until_up(
+    url: str, process: subprocess.Popen, timeout: float = 60.0
+) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{process.args!r} exited")
+            try:
+                async with session.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{url} did not come up")
+            await asyncio.sleep(0.2)
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    asyncio.run(_recreate_database(args.db_name))
+    stub_port = args.stub_port or _free_port()
+    app_port = args.app_port or _free_port()
+    env = {
+        **os.environ,
+        "DB_NAME": args.db_name,
+        "API_KEY": os.environ.get("API_KEY", "benchmark"),
+        "NEWS_API_URL": f"http://127.0.0.1:{stub_port}/v1/news/",
+        "INGESTION_ENABLED": "false",
+        # measure the app, not the protection of the upstream plan
+        "UPSTREAM_RATE_LIMIT": "100000",
+        "UPSTREAM_RATE_BURST": "100000",
+    }
+    python = sys.executable
+    subprocess.run(
+        [python, "-m", "benchmarks.seed"]
+        + ["--users", str(args.users), "--friends", str(args.friends)]
+        + ["--favorites", str(args.favorites), "--news", str(args.news)],
+        cwd=ROOT,
+        env=env,
+        check=True,
+    )
+    stub = [python, "-m", "benchmarks.stub_api", "--port", str(stub_port)]
+    stub += ["--latency-ms", str(args.latency_ms), "--total", str(args.news)]
+    app = [python, "-m", "uvicorn", "newsreader.main:app"]
+    app += ["--port", str(app_port), "--log-level", "warning"]
+    app += ["--no-access-log"]
+    base_url = f"http://127.0.0.1:{app_port}"
+    with _process(stub, env), _process(app, env) as app_process:
+        asyncio.run(_wait_until_up(f"{base_url}/metrics/db", app_process))
+        scenarios = asyncio.run(_run_scenarios(base_url, args))
+    return {
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "friends": args.friends,
+            "favorites": args.favorites,
+            "news": args.news,
+            "latency_ms": args.latency_ms,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def regressions(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    slack_ms: float,
+) -> List[str]:
+    """Compare results with a baseline, describing each regression.
+
+    `slack_ms` is added to allowed latencies, so the noise of endpoints
+    answering in a millisecond or two does not fail runs. Any new error
+    is a regression.
+    """
+    if results["settings"] != baseline["settings"]:
+        return [f"settings differ from the baseline: {baseline['settings']}"]
+    found = []
+    for name, base in baseline["scenarios"].items():
+        result = results["scenarios"].get(name)
+        if result is None:
+            continue
+        allowed_p95 = base["p95_ms"] * (1 + tolerance) + slack_ms
+        if result["p95_ms"] > allowed_p95:
+            found.append(
+                f"{name}: p95 {result['p95_ms']} ms > {allowed_p95:.2f} ms"
+            )
+        allowed_rps = base["rps"] * (1 - tolerance)
+        if result["rps"] < allowed_rps:
+            found.append(
+                f"{name}: {result['rps']} req/s < {allowed_rps:.1f} req/s"
+            )
+        if result["errors"] > base["errors"]:
+            found.append(
+                f"{name}: {result['errors']} errors > {base['errors']}"
+            )
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="load")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--friends", type=int, default=20)
+    parser.add_argument("--favorites", type=int, default=10)
+    parser.add_argument("--news", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--db-name", default="newsreader_bench")
+    parser.add_argument("--app-port", type=int, default=0)
+    parser.add_argument("--stub-port", type=int, default=0)
+    parser.add_argument(
+        "--only", help="run only scenarios whose name matches this regex"
+    )
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--save-baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--slack-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    results = run(args)
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        args.output.write_text(report + "\n")
+    if args.save_baseline:
+        args.save_baseline.write_text(report + "\n")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        found = regressions(results, baseline, args.tolerance, args.slack_ms)
+        for regression in found:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
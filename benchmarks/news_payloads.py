@@ -0,0 +1,147 @@
+"""Benchmark of decoding upstream news pages and encoding responses.
+
+Compares the old per-item `model_validate` loop with the batch
+TypeAdapter pipeline of NewsRepository, and the requests per second of
+FastAPI's default JSONResponse against FastJSONResponse for a page of news.
+The app is called in-process through ASGI, so no server is needed.
+
+Usage:
+    python -m benchmarks.news_payloads [--items N] [--requests N]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List, MutableMapping, Type
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic_core import from_json
+
+from newsreader.api.responses import FastJSONResponse
+from newsreader.core.domain import News
+from newsreader.infrastructure.repository import NewsRepository
+
+
+def _news_payload(items: int) -> bytes:
+    return json.dumps(
+        {
+            "meta": {"found": items, "returned": items, "limit": items},
+            "data": [
+                {
+                    "uuid": f"00000000-0000-0000-0000-{i:012d}",
+                    "title": f"Title of article {i}",
+                    "description": "A description of the article. " * 4,
+                    "keywords": "news, benchmark, payload",
+                    "snippet": "The first sentences of the article. " * 6,
+                    "url": f"https://example.com/articles/{i}",
+                    "image_url": f"https://example.com/images/{i}.jpg",
+                    "language": "en",
+                    "published_at": "2024-01-01T12:00:00.000000Z",
+                    "source": "example.com",
+                    "categories": ["general", "tech"],
+                    "relevance_score": None,
+                    "locale": "us",
+                }
+                for i in range(items)
+            ],
+        }
+    ).encode()
+
+
+def _parse_loop(body: bytes) -> List[News]:
+    """The previous pipeline: json decode, then validate item by item."""
+    news = []
+    for item in json.loads(body).get("data", []):
+        try:
+            news.append(News.model_validate(item))
+        except (KeyError, ValueError) as e:
+            print(f"Error parsing news: {e}")
+    return news
+
+
+def _parse_batch(repository: NewsRepository) -> Callable[[bytes], List[News]]:
+    return lambda body: repository._parse_news_list(from_json(body))
+
+
+def _per_second(fn: Callable[[], Any], seconds: float = 2.0) -> float:
+    calls = 0
+    started = time.perf_counter()
+    while (elapsed := time.perf_counter() - started) < seconds:
+        fn()
+        calls += 1
+    return calls / elapsed
+
+
+def _app(response_class: Type[JSONResponse], news: List[News]) -> FastAPI:
+    app = FastAPI(default_response_class=response_class)
+
+    @app.get("/news", response_model=List[News])
+    async def get_news() -> List[News]:
+        return news
+
+    return app
+
+
+async def _requests_per_second(app: FastAPI, requests: int) -> float:
+    scope: Dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/news",
+        "raw_path": b"/news",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 1),
+        "server": ("127.0.0.1", 80),
+    }
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: MutableMapping[str, Any]) -> None:
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(scope, receive, send)
+    return requests / (time.perf_counter() - started)
+
+
+def run(items: int, requests: int) -> None:
+    body = _news_payload(items)
+    repository = NewsRepository(session=None, page_size=items)  # type: ignore[arg-type]
+    news = _parse_batch(repository)(body)
+    assert len(news) == len(_parse_loop(body)) == items
+
+    loop_rate = _per_second(lambda: _parse_loop(body))
+    batch_rate = _per_second(lambda: _parse_batch(repository)(body))
+    print(f"decode+validate {items} items")
+    print(f"  json + model_validate loop  {loop_rate:10.1f} pages/s")
+    print(f"  from_json + TypeAdapter     {batch_rate:10.1f} pages/s")
+
+    print(f"GET /news returning {items} items")
+    for name, response_class in (
+        ("JSONResponse", JSONResponse),
+        ("FastJSONResponse", FastJSONResponse),
+    ):
+        app = _app(response_class, news)
+        asyncio.run(_requests_per_second(app, 50))  # warm up
+        rate = asyncio.run(_requests_per_second(app, requests))
+        print(f"  {name:<26}  {rate:10.1f} req/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="news_payloads")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.items, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Benchmark of ranking recommendation candidates with RecommendationScorer.
+
+Scores synthetic candidates, as rows of the recommendation candidates
+query would give them, and reports the latency per request of building
+the batches, scoring them and keeping the top-k, against sorting all
+candidates by score in Python. No database is needed.
+
+Usage:
+    python -m benchmarks.recommendation_scoring [--candidates N] [--k N]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from newsreader.config import config
+from newsreader.infrastructure.scoring import (
+    CandidateBatch,
+    CategoryAffinity,
+    RecommendationScorer,
+    TopK,
+)
+
+CATEGORIES = [
+    "general",
+    "science",
+    "sports",
+    "business",
+    "health",
+    "entertainment",
+    "tech",
+    "politics",
+    "food",
+    "travel",
+]
+
+
+def _rows(candidates: int, now: float) -> List[Dict[str, Any]]:
+    rng = random.Random(0)
+    return [
+        {
+            "news_id": f"{i:032x}",
+            "title": f"News {i}",
+            "score": rng.randint(1, 50),
+            # a tenth of the candidates are not stored as articles
+            "published_at": (
+                None if i % 10 == 0 else now - rng.uniform(0, 30 * 86400)
+            ),
+            "relevance_score": None if i % 3 else rng.uniform(0, 40),
+            "categories": rng.sample(CATEGORIES, rng.randint(1, 3)),
+        }
+        for i in range(candidates)
+    ]
+
+
+def _scorer(batch_size: int) -> RecommendationScorer:
+    return RecommendationScorer(
+        friends_weight=config.RECOMMENDATION_FRIENDS_WEIGHT,
+        affinity_weight=config.RECOMMENDATION_AFFINITY_WEIGHT,
+        recency_weight=config.RECOMMENDATION_RECENCY_WEIGHT,
+        relevance_weight=config.RECOMMENDATION_RELEVANCE_WEIGHT,
+        half_life=config.RECOMMENDATION_HALF_LIFE,
+        max_candidates=config.RECOMMENDATION_MAX_CANDIDATES,
+        batch_size=batch_size,
+    )
+
+
+def _rank_vectorized(
+    rows: List[Dict[str, Any]],
+    scorer: RecommendationScorer,
+    affinity: CategoryAffinity,
+    k: int,
+    now: float,
+) -> List[Any]:
+    top = TopK(k)
+    for start in range(0, len(rows), scorer.batch_size):
+        batch = CandidateBatch.from_rows(
+            rows[start : start + scorer.batch_size]
+        )
+        top.push(batch, scorer.score(batch, affinity, now))
+    return top.result()
+
+
+def _rank_python(
+    rows: List[Dict[str, Any]],
+    affinity: CategoryAffinity,
+    k: int,
+    now: float,
+) -> List[Any]:
+    """The same ranking, one candidate at a time."""
+    shares = dict(zip(affinity.index, affinity.vector.tolist()))
+    decay = 0.5 ** (1 / config.RECOMMENDATION_HALF_LIFE)
+    scored = []
+    for row in rows:
+        friends = row["score"]
+        score = config.RECOMMENDATION_FRIENDS_WEIGHT * friends / (friends + 1)
+        score += config.RECOMMENDATION_AFFINITY_WEIGHT * min(
+            sum(shares.get(name, 0.0) for name in row["categories"]), 1.0
+        )
+        if row["published_at"] is not None:
+            age = max(now - row["published_at"], 0)
+            score += config.RECOMMENDATION_RECENCY_WEIGHT * decay**age
+        relevance = max(row["relevance_score"] or 0.0, 0)
+        score += (
+            config.RECOMMENDATION_RELEVANCE_WEIGHT * relevance / (relevance + 1)
+        )
+        scored.append((-score, row["news_id"], row["title"]))
+    scored.sort()
+    return [(news_id, title) for _, news_id, title in scored[:k]]
+
+
+def _latencies(fn: Callable[[], Any], requests: int) -> List[float]:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def run(candidates: int, k: int, batch_size: int, requests: int) -> None:
+    now = time.time()
+    rows = _rows(candidates, now)
+    affinity = CategoryAffinity([["tech"], ["tech", "science"], ["sports"]])
+    scorer = _scorer(batch_size)
+
+    vectorized = _rank_vectorized(rows, scorer, affinity, k, now)
+    python = _rank_python(rows, affinity, k, now)
+    assert [news_id for news_id, _ in vectorized] == [
+        news_id for news_id, _ in python
+    ]
+
+    print(f"top {k} of {candidates} candidates, batches of {batch_size}")
+    for name, fn in (
+        ("python sort", lambda: _rank_python(rows, affinity, k, now)),
+        (
+            "numpy partition",
+            lambda: _rank_vectorized(rows, scorer, affinity, k, now),
+        ),
+    ):
+        latencies = _latencies(fn, requests)
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(
+            f"  {name:<20}  p50 {statistics.median(latencies):8.2f} ms"
+            f"  p95 {p95:8.2f} ms"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="recommendation_scoring")
+    parser.add_argument("--candidates", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument(
+        "--batch-size", type=int, default=config.RECOMMENDATION_BATCH_SIZE
+    )
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    run(args.candidates, args.k, args.batch_size, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Seed the configured database with synthetic users for load tests.
+
+Applies migrations, then inserts users with symmetric friendships,
+favorites and read later picked from the articles served by
+benchmarks.stub_api, stores those articles, and rebuilds
+recommendations. The same arguments and seed give the same data, so it
+should be run against an empty database.
+
+Usage:
+    python -m benchmarks.seed [--users N] [--friends N] [--favorites N]
+        [--read-later N] [--news N] [--seed N]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Set, Tuple
+
+from sqlalchemy import Table
+
+from newsreader.core.domain import News
+from newsreader.db import (
+    database,
+    read_later_table,
+    user_favorites_table,
+    user_friends_table,
+    user_table,
+)
+from newsreader.infrastructure.repository import (
+    ArticleRepositoryDB,
+    recommendation_rebuild_queries,
+)
+from newsreader.migrations import migrate
+
+from benchmarks.stub_api import article
+
+INSERT_BATCH_SIZE = 1000
+
+
+async def _insert(table: Table, rows: List[Dict[str, Any]]) -> None:
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        batch = rows[start : start + INSERT_BATCH_SIZE]
+        await database.execute(table.insert().values(batch))
+
+
+def _friendships(
+    rng: random.Random, users: int, friends: int
+) -> Set[Tuple[int, int]]:
+    """Pick about `friends` friends per user, in both directions."""
+    edges: Set[Tuple[int, int]] = set()
+    for user_id in range(1, users + 1):
+        for _ in range(friends // 2):
+            friend_id = rng.randint(1, users)
+            if friend_id != user_id:
+                edges.add((user_id, friend_id))
+                edges.add((friend_id, user_id))
+    return edges
+
+
+def _news_lists(
+    rng: random.Random, users: int, per_user: int, news: int
+) -> List[Dict[str, Any]]:
+    return [
+        {"user_id": user_id, "news_id": f"u{number}", "title": f"News {number}"}
+        for user_id in range(1, users + 1)
+        for number in rng.sample(range(news), min(per_user, news))
+    ]
+
+
+async def seed(
+    users: int,
+    friends: int,
+    favorites: int,
+    read_later: int,
+    news: int,
+    seed: int,
+) -> Dict[str, int]:
+    """Insert the synthetic data, returning the number of rows per table."""
+    rng = random.Random(seed)
+    await migrate()
+
+    edges = _friendships(rng, users, friends)
+    favorite_rows = _news_lists(rng, users, favorites, news)
+    read_later_rows = _news_lists(rng, users, read_later, news)
+    async with database.transaction():
+        await _insert(
+            user_table,
+            [{"name": f"user {i}"} for i in range(1, users + 1)],
+        )
+        await _insert(
+            user_friends_table,
+            [
+                {"user_id": user_id, "friend_id": friend_id}
+                for user_id, friend_id in sorted(edges)
+            ],
+        )
+        await _insert(user_favorites_table, favorite_rows)
+        await _insert(read_later_table, read_later_rows)
+
+    articles = ArticleRepositoryDB()
+    for start in range(0, news, INSERT_BATCH_SIZE):
+        await articles.save_many(
+            [
+                News.model_validate(article(number))
+                for number in range(start, min(start + INSERT_BATCH_SIZE, news))
+            ]
+        )
+
+    async with database.transaction():
+        for query in recommendation_rebuild_queries():
+            await database.execute(query)
+
+    return {
+        "users": users,
+        "friendships": len(edges),
+        "favorites": len(favorite_rows),
+        "read_later": len(read_later_rows),
+        "articles": news,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="seed")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--friends", type=int, default=20)
+    parser.add_argument("--favorites", type=int, default=10)
+    parser.add_argument("--read-later", type=int, default=5)
+    parser.add_argument("--news", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    async def run() -> None:
+        started = time.perf_counter()
+        counts = await seed(
+            args.users,
+            args.friends,
+            args.favorites,
+            args.read_later,
+            args.news,
+            args.seed,
+        )
+        await database.disconnect()
+        elapsed = time.perf_counter() - started
+        print(f"Seeded {counts} in {elapsed:.1f}s")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
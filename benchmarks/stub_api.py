@@ -0,0 +1,154 @@
+"""A local stand-in for thenewsapi, serving synthetic articles.
+
+Serves /top, /all and /uuid/{id} like the real API, after a configurable
+latency, so load tests measure the service rather than the upstream plan.
+Articles are derived from their number, so `u17` is the same article in
+every response and run. The tests run it in-process, telling it to fail
+some requests and looking at the requests it received.
+
+Usage:
+    python -m benchmarks.stub_api [--port N] [--latency-ms MS]
+        [--jitter-ms MS] [--page-size N] [--total N]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+CATEGORIES = [
+    "general",
+    "science",
+    "sports",
+    "business",
+    "health",
+    "entertainment",
+    "tech",
+    "politics",
+    "food",
+    "travel",
+]
+
+
+def article(number: int, category: str = "") -> Dict[str, Any]:
+    category = category or CATEGORIES[number % len(CATEGORIES)]
+    return {
+        "uuid": f"u{number}",
+        "title": f"Synthetic news {number}",
+        "description": f"Description of synthetic news {number}. " * 4,
+        "keywords": "synthetic, benchmark, news",
+        "snippet": f"Snippet of synthetic news {number}. " * 8,
+        "url": f"https://news.example/{number}",
+        "image_url": f"https://news.example/{number}.jpg",
+        "language": "en",
+        "published_at": "2025-01-01T00:00:00.000000Z",
+        "source": "news.example",
+        "categories": [category],
+        "relevance_score": None,
+    }
+
+
+class StubAPI:
+    """Serves `total` articles, at most `page_size` per response.
+
+    Each status in `faults` answers one request, in order, before requests
+    are answered normally again; None in `faults` answers normally. With
+    `record_requests`, (monotonic time, path, query) of every request are
+    kept in `requests`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        page_size: int = 100,
+        total: int = 100_000,
+        record_requests: bool = False,
+    ):
+        self.latency = latency
+        self._jitter = jitter
+        self.page_size = page_size
+        self.total = total
+        self.faults: Deque[Optional[int]] = deque()
+        self.requests: List[Tuple[float, str, Dict[str, str]]] = []
+        self._record_requests = record_requests
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v1/news/top", self.news_list)
+        app.router.add_get("/v1/news/all", self.news_list)
+        app.router.add_get("/v1/news/uuid/{news_id}", self.news_by_id)
+        return app
+
+    async def _answer(self, request: web.Request) -> Optional[web.Response]:
+        """Wait, then return the injected fault answering `request`, if any."""
+        if self._record_requests:
+            self.requests.append(
+                (time.monotonic(), request.path, dict(request.query))
+            )
+        delay = self.latency + random.uniform(0, self._jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        status = self.faults.popleft() if self.faults else None
+        if status is not None:
+            return web.json_response(
+                {"error": {"code": "injected"}}, status=status
+            )
+        return None
+
+    async def news_list(self, request: web.Request) -> web.Response:
+        fault = await self._answer(request)
+        if fault is not None:
+            return fault
+        limit = min(int(request.query.get("limit", 3)), self.page_size)
+        page = int(request.query.get("page", 1))
+        category = request.query.get("categories", "").split(",")[0]
+        first = (page - 1) * limit
+        last = min(first + limit, self.total)
+        data = [article(number, category) for number in range(first, last)]
+        return web.json_response(
+            {
+                "meta": {"found": self.total, "returned": len(data)},
+                "data": data,
+            }
+        )
+
+    async def news_by_id(self, request: web.Request) -> web.Response:
+        fault = await self._answer(request)
+        if fault is not None:
+            return fault
+        news_id = request.match_info["news_id"]
+        number = news_id[1:]
+        if not (news_id.startswith("u") and number.isdigit()):
+            return web.json_response(
+                {"error": {"code": "not_found"}}, status=404
+            )
+        return web.json_response(article(int(number)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="stub_api")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--page-size", type=int, default=25)
+    parser.add_argument("--total", type=int, default=100_000)
+    args = parser.parse_args()
+    stub = StubAPI(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        page_size=args.page_size,
+        total=args.total,
+    )
+    web.run_app(
+        stub.app(), host=args.host, port=args.port, print=None, access_log=None
+    )
+
+
+if __name__ == "__main__":
+    main()
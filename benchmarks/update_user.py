@@ -0,0 +1,192 @@
+"""Benchmark of UserRepositoryDB.update_user for a user with many favorites.
+
+Creates a user with --favorites favorites, a tenth as many news to read
+later and --friends friends, then times updates which rename the user or
+add one favorite. The diff-based update_user is compared with the former
+implementation, which rewrote every friendship, favorite and read later
+row of the user and rebuilt recommendations of everyone related. The
+created users are deleted afterwards.
+
+Usage:
+    python -m benchmarks.update_user [--favorites N] [--friends N]
+        [--calls N]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy import select
+
+from newsreader.core.domain import NewsPreview, User
+from newsreader.db import (
+    database,
+    read_later_table,
+    user_favorites_table,
+    user_friends_table,
+    user_table,
+)
+from newsreader.infrastructure.repository import UserRepositoryDB
+
+Update = Callable[[int, User], Awaitable[None]]
+
+
+async def _update_user_rewrite(
+    repository: UserRepositoryDB, user_id: int, user_data: User
+) -> None:
+    """update_user as it was, deleting and reinserting all rows."""
+    async with database.transaction():
+        related_query = select(user_friends_table.c.user_id).where(
+            user_friends_table.c.friend_id == user_id
+        )
+        related_ids = {
+            row["user_id"] for row in await database.fetch_all(related_query)
+        }
+        await database.execute(
+            user_table.update()
+            .where(user_table.c.id == user_id)
+            .values(name=user_data.name)
+        )
+        await database.fetch_all(select(user_table.c.id))
+
+        await database.execute(
+            user_friends_table.delete().where(
+                (user_friends_table.c.user_id == user_id)
+                | (user_friends_table.c.friend_id == user_id)
+            )
+        )
+        if user_data.friends:
+            await database.execute(
+                user_friends_table.insert().values(
+                    [
+                        row
+                        for friend_id in user_data.friends
+                        for row in (
+                            {"user_id": user_id, "friend_id": friend_id},
+                            {"user_id": friend_id, "friend_id": user_id},
+                        )
+                    ]
+                )
+            )
+        for table, news in (
+            (user_favorites_table, user_data.favorites),
+            (read_later_table, user_data.read_later),
+        ):
+            await database.execute(
+                table.delete().where(table.c.user_id == user_id)
+            )
+            if news:
+                await database.execute(
+                    table.insert().values(
+                        [
+                            {
+                                "user_id": user_id,
+                                "news_id": item.uuid,
+                                "title": item.title,
+                            }
+                            for item in news
+                        ]
+                    )
+                )
+        await repository.rebuild_recommendations(
+            sorted(related_ids | set(user_data.friends) | {user_id})
+        )
+
+
+def _news(prefix: str, count: int) -> List[NewsPreview]:
+    return [
+        NewsPreview(uuid=f"{prefix}{i}", title=f"News {prefix}{i}")
+        for i in range(count)
+    ]
+
+
+async def _create_users(
+    repository: UserRepositoryDB, favorites: int, friends: int
+) -> User:
+    friend_ids = [
+        await repository.create_user(User(id=0, name=f"Friend {i}"))
+        for i in range(friends)
+    ]
+    for friend_id in friend_ids:
+        for news in _news("f", 10):
+            await repository.add_to_favorites(friend_id, news.uuid, news.title)
+    user = User(
+        id=0,
+        name="Benchmark user",
+        friends=friend_ids,
+        favorites=_news("bench-", favorites),
+        read_later=_news("later-", favorites // 10),
+    )
+    user.id = await repository.create_user(user)
+    await repository.update_user(user.id, user)
+    return user
+
+
+async def _latencies(
+    update: Update, user: User, change: Callable[[User, int], User], calls: int
+) -> List[float]:
+    latencies = []
+    for i in range(calls):
+        user_data = change(user, i)
+        started = time.perf_counter()
+        await update(user.id, user_data)
+        latencies.append((time.perf_counter() - started) * 1000)
+    await update(user.id, user)
+    return latencies
+
+
+def _rename(user: User, i: int) -> User:
+    return user.model_copy(update={"name": f"Benchmark user {i}"})
+
+
+def _add_favorite(user: User, i: int) -> User:
+    favorites = user.favorites + [NewsPreview(uuid=f"new-{i}", title="New")]
+    return user.model_copy(update={"favorites": favorites})
+
+
+async def run(favorites: int, friends: int, calls: int) -> None:
+    await database.connect()
+    repository = UserRepositoryDB()
+    user = await _create_users(repository, favorites, friends)
+    updates: Dict[str, Update] = {
+        "rewrite": lambda user_id, user_data: _update_user_rewrite(
+            repository, user_id, user_data
+        ),
+        "diff": repository.update_user,
+    }
+    print(
+        f"user with {favorites} favorites, {favorites // 10} read later"
+        f" and {friends} friends"
+    )
+    try:
+        for change_name, change in (
+            ("rename", _rename),
+            ("add favorite", _add_favorite),
+        ):
+            for name, update in updates.items():
+                latencies = await _latencies(update, user, change, calls)
+                p95 = statistics.quantiles(latencies, n=20)[-1]
+                print(
+                    f"  {change_name:<13} {name:<8}"
+                    f"  p50 {statistics.median(latencies):8.2f} ms"
+                    f"  p95 {p95:8.2f} ms"
+                )
+    finally:
+        for user_id in [user.id, *user.friends]:
+            await repository.delete_user(user_id)
+        await database.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="update_user")
+    parser.add_argument("--favorites", type=int, default=5000)
+    parser.add_argument("--friends", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.favorites, args.friends, args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark of the ways UserRepositoryDB.get_by_id can load a user.
+
+Compares the latency of the single aggregate statement, of the fallback
+running the four queries concurrently and of the four queries one after
+another, as get_by_id used to. Run it against a database seeded by
+benchmarks.seed; round trips to a local Postgres are cheap, so the gains
+grow with the network latency to the database.
+
+Usage:
+    python -m benchmarks.user_aggregate [--calls N] [--users N]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from newsreader.core.domain import User
+from newsreader.db import database
+from newsreader.infrastructure.repository import (
+    UserRepositoryDB,
+    _user_by_id_query,
+)
+
+GetUser = Callable[[int], Awaitable[Optional[User]]]
+
+
+async def _get_by_id_sequentially(
+    repository: UserRepositoryDB, user_id: int
+) -> Optional[User]:
+    result = await database.fetch_one(_user_by_id_query, {"user_id": user_id})
+    if result:
+        user = User.model_validate(result)
+        user.friends = await repository.get_friend_ids(user_id)
+        user.favorites = await repository.get_favorites(user_id)
+        user.read_later = await repository.get_read_later(user_id)
+        return user
+    return None
+
+
+async def _latencies(get_user: GetUser, calls: int, users: int) -> List[float]:
+    latencies = []
+    for i in range(calls):
+        started = time.perf_counter()
+        await get_user(1 + i % users)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def run(calls: int, users: int) -> None:
+    await database.connect()
+    repository = UserRepositoryDB()
+    cases: Dict[str, GetUser] = {
+        "sequential": lambda user_id: _get_by_id_sequentially(
+            repository, user_id
+        ),
+        "concurrent": repository._get_by_id_concurrently,
+        "aggregate": repository.get_by_id,
+    }
+    for user_id in range(1, min(users, 20) + 1):
+        loaded = [await get_user(user_id) for get_user in cases.values()]
+        assert all(user == loaded[0] for user in loaded), user_id
+
+    for name, get_user in cases.items():
+        await _latencies(get_user, 100, users)  # warm up statement caches
+        latencies = await _latencies(get_user, calls, users)
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(
+            f"{name:<12}  p50 {statistics.median(latencies):7.3f} ms"
+            f"  p95 {p95:7.3f} ms"
+        )
+    await database.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="user_aggregate")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.users))
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,40 @@ CREATE TABLE IF NOT EXISTS user_read_later (
     PRIMARY KEY (user_id, news_id)
 );
 
+-- Table to store precomputed recommendations (friends' favorites)
+CREATE TABLE IF NOT EXISTS user_recommendations (
+    user_id INTEGER REFERENCES users(id),
+    news_id VARCHAR NOT NULL,
+    title VARCHAR NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (user_id, news_id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_user_recommendations_user_id_score
+    ON user_recommendations (user_id, score DESC, news_id);
+
+-- Table to store news articles fetched from the API
+CREATE TABLE IF NOT EXISTS articles (
+    uuid VARCHAR PRIMARY KEY,
+    title VARCHAR NOT NULL,
+    description VARCHAR NOT NULL,
+    keywords VARCHAR NOT NULL,
+    snippet VARCHAR NOT NULL,
+    url VARCHAR NOT NULL,
+    image_url VARCHAR NOT NULL,
+    language VARCHAR NOT NULL,
+    published_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    source VARCHAR NOT NULL,
+    categories VARCHAR[] NOT NULL,
+    relevance_score FLOAT,
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        to_tsvector('simple', title || ' ' || description || ' ' || keywords || ' ' || snippet)
+    ) STORED
+);
+
+CREATE INDEX IF NOT EXISTS ix_articles_search_vector
+    ON articles USING GIN (search_vector);
+
 -- Insert users
 INSERT INTO users (name) VALUES ('Alice'), ('Bob'), ('Charlie');
 
@@ -43,4 +77,11 @@ INSERT INTO user_favorites (user_id, news_id, title) VALUES
 -- Alice's read later
 INSERT INTO user_read_later (user_id, news_id, title) VALUES
     (1, 'e7869452-a34c-40c4-9330-de4433ee76ff', 'Banana Republic Outlet Sale: 50% off Everything, +20% off with $6 Finds'),
-    (1, '6a957f44-22c6-4d2f-82b1-0044f2acef9b', 'Spider-Man''s Marisa Tomei Reacts to Tom Holland''s Engagement');
\ No newline at end of file
+    (1, '6a957f44-22c6-4d2f-82b1-0044f2acef9b', 'Spider-Man''s Marisa Tomei Reacts to Tom Holland''s Engagement');
+
+-- Recommendations computed from the data above
+INSERT INTO user_recommendations (user_id, news_id, title, score)
+SELECT f.user_id, fav.news_id, MIN(fav.title), COUNT(*)
+FROM user_friends f
+JOIN user_favorites fav ON fav.user_id = f.friend_id
+GROUP BY f.user_id, fav.news_id;
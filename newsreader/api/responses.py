@@ -0,0 +1,59 @@
+"""A module providing response classes."""
+
+import time
+from typing import Any, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+from newsreader.infrastructure.cache import SerializedResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded by pydantic-core instead of the json module."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def _etag_matches(if_none_match: Optional[str], etags: Any) -> bool:
+    """Weakly compare an If-None-Match header against `etags`."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") in etags
+        for tag in if_none_match.split(",")
+    )
+
+
+def cached_json_response(
+    serialized: SerializedResponse, request: Request
+) -> Response:
+    """Build a response, or a 304, straight from pre-serialized bytes."""
+    use_gzip = serialized.gzip_body is not None and "gzip" in (
+        request.headers.get("accept-encoding", "")
+    )
+    headers = {
+        "ETag": serialized.gzip_etag if use_gzip else serialized.etag,
+        "Cache-Control": (
+            f"public, max-age={serialized.max_age(time.monotonic())}"
+        ),
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(
+        request.headers.get("if-none-match"),
+        (serialized.etag, serialized.gzip_etag),
+    ):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(
+            serialized.gzip_body, media_type="application/json", headers=headers
+        )
+    return Response(
+        serialized.body, media_type="application/json", headers=headers
+    )
@@ -1,30 +1,107 @@
 import logging
-from typing import List, Optional
+import math
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Union
 from dependency_injector.wiring import inject, Provide
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import (
+    APIRouter,
+    Depends,
+    Query,
+    HTTPException,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
 
 
 from newsreader.container import Container
-from newsreader.core.domain import User, News, NewsPreview
-from newsreader.core.service import IUserService, INewsService
+from newsreader.config import config
+from newsreader.core.domain import (
+    FriendSuggestion,
+    User,
+    News,
+    NewsPreview,
+    NewsBatchItem,
+)
+from newsreader.core.service import IUserService, INewsService, IFeedService
+from newsreader.db import database
+from newsreader.api.responses import cached_json_response
+from newsreader.infrastructure.cache import (
+    CachedNewsRepository,
+    FeedCache,
+    FeedExpiredError,
+    InvalidCursorError,
+    ResponseCache,
+    make_key,
+    normalize_categories,
+    normalize_language,
+    track_expiry,
+)
+from newsreader.infrastructure.graph import FriendGraph
+from newsreader.infrastructure.repository import NewsRepository
+from newsreader.infrastructure.resilience import (
+    UpstreamGuard,
+    UpstreamUnavailableError,
+)
 
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
 user_router = APIRouter()
 news_router = APIRouter()
+metrics_router = APIRouter()
+
+_news_list_adapter = TypeAdapter(List[News])
+
+
+async def _expand(
+    previews: List[NewsPreview],
+    budget_ms: Optional[int],
+    news_service: INewsService,
+) -> List[Union[News, NewsPreview]]:
+    """Hydrate previews into full news, within `budget_ms` if given."""
+    timeout = budget_ms / 1000 if budget_ms else None
+    return await news_service.expand_previews(previews, timeout)
+
+
+def _upstream_unavailable(e: UpstreamUnavailableError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(max(math.ceil(e.retry_after), 1))},
+    )
+
+
+async def _ndjson(items: AsyncIterator[BaseModel]) -> AsyncIterator[str]:
+    async for item in items:
+        yield item.model_dump_json() + "\n"
 
 
 @user_router.get("/all", response_model=List[User])
 @inject
 async def get_all_users(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[int] = None,
+    stream: bool = False,
     service: IUserService = Depends(Provide[Container.user_service]),
-) -> List[User]:
+) -> Union[List[User], StreamingResponse]:
     try:
-        users = await service.get_all_users()
-        if not users:
+        if stream:
+            return StreamingResponse(
+                _ndjson(service.iter_all_users(batch_size=limit, after=after)),
+                media_type="application/x-ndjson",
+            )
+        # one more user tells whether there is a next page
+        users = await service.get_all_users(limit=limit + 1, after=after)
+        if not users and after is None:
             raise HTTPException(status_code=404, detail="No user was found")
+        if len(users) > limit:
+            users = users[:limit]
+            response.headers["X-Next-Cursor"] = str(users[-1].id)
         return users
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
@@ -116,14 +193,22 @@ async def delete_user_friend(
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
 
-@user_router.get("/{user_id}/favorites", response_model=List[NewsPreview])
+@user_router.get(
+    "/{user_id}/favorites", response_model=List[Union[News, NewsPreview]]
+)
 @inject
 async def get_favorites(
     user_id: int,
+    expand: Optional[Literal["full"]] = None,
+    budget_ms: Optional[int] = Query(None, ge=1),
     user_service: IUserService = Depends(Provide[Container.user_service]),
-) -> List[NewsPreview]:
+    news_service: INewsService = Depends(Provide[Container.news_service]),
+) -> List[Union[News, NewsPreview]]:
     try:
-        return await user_service.get_favorites(user_id)
+        previews = await user_service.get_favorites(user_id)
+        if expand == "full":
+            return await _expand(previews, budget_ms, news_service)
+        return list(previews)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
@@ -159,22 +244,73 @@ async def delete_from_favorites(
 @inject
 async def get_recommended_news(
     user_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     user_service: IUserService = Depends(Provide[Container.user_service]),
 ) -> List[NewsPreview]:
     try:
-        return await user_service.get_recommended_news(user_id)
+        return await user_service.get_recommended_news(
+            user_id, limit=limit, offset=offset
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
 
-@user_router.get("/{user_id}/read-later", response_model=List[NewsPreview])
+@user_router.get(
+    "/{user_id}/feed", response_model=List[Union[News, NewsPreview]]
+)
+@inject
+async def get_feed(
+    user_id: int,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    feed_service: IFeedService = Depends(Provide[Container.feed_service]),
+) -> List[Union[News, NewsPreview]]:
+    try:
+        items, next_cursor = await feed_service.get_feed(
+            user_id, limit=limit, cursor=cursor
+        )
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return items
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FeedExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {e}")
+
+
+@user_router.get("/{user_id}/suggested-friends")
+@inject
+async def get_suggested_friends(
+    user_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    user_service: IUserService = Depends(Provide[Container.user_service]),
+) -> List[FriendSuggestion]:
+    try:
+        return await user_service.get_suggested_friends(user_id, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {e}")
+
+
+@user_router.get(
+    "/{user_id}/read-later", response_model=List[Union[News, NewsPreview]]
+)
 @inject
 async def get_read_later(
     user_id: int,
+    expand: Optional[Literal["full"]] = None,
+    budget_ms: Optional[int] = Query(None, ge=1),
     user_service: IUserService = Depends(Provide[Container.user_service]),
-) -> List[NewsPreview]:
+    news_service: INewsService = Depends(Provide[Container.news_service]),
+) -> List[Union[News, NewsPreview]]:
     try:
-        return await user_service.get_read_later(user_id)
+        previews = await user_service.get_read_later(user_id)
+        if expand == "full":
+            return await _expand(previews, budget_ms, news_service)
+        return list(previews)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
@@ -209,18 +345,49 @@ async def delete_read_later(
 @news_router.get("/top", response_model=List[News])
 @inject
 async def get_top_news(
-    limit: int = 10,
+    request: Request,
+    limit: int = Query(10, ge=1, le=config.NEWS_MAX_LIMIT),
     categories: Optional[List[str]] = Query(None),
     language: Optional[str] = None,
+    stream: bool = False,
     service: INewsService = Depends(Provide[Container.news_service]),
-) -> List[News]:
+    response_cache: ResponseCache = Depends(Provide[Container.response_cache]),
+) -> Union[List[News], Response]:
     try:
-        news = await service.get_top_news(
-            limit=limit, categories=categories, language=language
+        if stream:
+            return StreamingResponse(
+                _ndjson(
+                    service.iter_top_news(
+                        limit=limit, categories=categories, language=language
+                    )
+                ),
+                media_type="application/x-ndjson",
+            )
+        key = make_key(
+            "top",
+            limit=limit,
+            categories=normalize_categories(categories),
+            language=normalize_language(language),
         )
-        if not news:
-            raise HTTPException(status_code=404, detail=f"News not found")
-        return news
+        serialized = response_cache.get(key)
+        if serialized is None:
+            with track_expiry() as expiry:
+                news = await service.get_top_news(
+                    limit=limit, categories=categories, language=language
+                )
+            if not news:
+                raise HTTPException(status_code=404, detail=f"News not found")
+            # stale news are served once, as not fresh, not cached again
+            serialized = response_cache.set(
+                key,
+                _news_list_adapter.dump_json(news),
+                expiry.ttl(config.NEWS_CACHE_TOP_TTL),
+            )
+        return cached_json_response(serialized, request)
+    except HTTPException:
+        raise
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
@@ -228,19 +395,61 @@ async def get_top_news(
 @news_router.get("/all", response_model=List[News])
 @inject
 async def get_all_news(
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=config.NEWS_MAX_LIMIT),
     search: Optional[str] = Query(None),
     categories: Optional[List[str]] = Query(None),
     language: Optional[str] = None,
+    stream: bool = False,
     service: INewsService = Depends(Provide[Container.news_service]),
-) -> List[News]:
+) -> Union[List[News], StreamingResponse]:
     try:
+        if stream:
+            return StreamingResponse(
+                _ndjson(
+                    service.iter_all_news(
+                        limit=limit,
+                        search=search,
+                        categories=categories,
+                        language=language,
+                    )
+                ),
+                media_type="application/x-ndjson",
+            )
         news = await service.get_all_news(
             search=search, limit=limit, categories=categories, language=language
         )
         if not news:
             raise HTTPException(status_code=404, detail=f"News not found")
         return news
+    except HTTPException:
+        raise
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {e}")
+
+
+@news_router.get("/batch", response_model=List[NewsBatchItem])
+@inject
+async def get_news_batch(
+    ids: List[str] = Query(...),
+    service: INewsService = Depends(Provide[Container.news_service]),
+) -> List[NewsBatchItem]:
+    # accept both ?ids=a&ids=b and ?ids=a,b
+    news_ids = [
+        news_id for value in ids for news_id in value.split(",") if news_id
+    ]
+    if len(news_ids) > config.NEWS_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.NEWS_BATCH_MAX_IDS} ids are allowed",
+        )
+    try:
+        return await service.get_news_batch(news_ids)
+    except HTTPException:
+        raise
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
@@ -249,12 +458,83 @@ async def get_all_news(
 @inject
 async def get_news_by_id(
     news_id: str,
+    request: Request,
     service: INewsService = Depends(Provide[Container.news_service]),
-) -> Optional[News]:
+    response_cache: ResponseCache = Depends(Provide[Container.response_cache]),
+) -> Response:
     try:
-        news = await service.get_news_by_id(news_id)
-        if not news:
-            raise HTTPException(status_code=404, detail=f"News not found")
-        return news
+        key = make_key("uuid", news_id=news_id)
+        serialized = response_cache.get(key)
+        if serialized is None:
+            news = await service.get_news_by_id(news_id)
+            if not news:
+                raise HTTPException(status_code=404, detail=f"News not found")
+            serialized = response_cache.set(
+                key,
+                news.model_dump_json().encode(),
+                config.NEWS_RESPONSE_ARTICLE_TTL,
+            )
+        return cached_json_response(serialized, request)
+    except HTTPException:
+        raise
+    except UpstreamUnavailableError as e:
+        raise _upstream_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
+
+
+@metrics_router.get("/news-cache")
+@inject
+async def get_news_cache_stats(
+    repository: CachedNewsRepository = Depends(
+        Provide[Container.cached_news_repository]
+    ),
+) -> Dict[str, int]:
+    return repository.stats()
+
+
+@metrics_router.get("/upstream")
+@inject
+async def get_upstream_stats(
+    guard: UpstreamGuard = Depends(Provide[Container.upstream_guard]),
+) -> Dict[str, Union[int, str]]:
+    return guard.stats()
+
+
+@metrics_router.get("/db")
+async def get_db_pool_stats() -> Dict[str, Union[int, float]]:
+    return database.stats()
+
+
+@metrics_router.get("/news-parsing")
+@inject
+async def get_news_parsing_stats(
+    repository: NewsRepository = Depends(
+        Provide[Container.upstream_news_repository]
+    ),
+) -> Dict[str, Any]:
+    return repository.stats()
+
+
+@metrics_router.get("/response-cache")
+@inject
+async def get_response_cache_stats(
+    response_cache: ResponseCache = Depends(Provide[Container.response_cache]),
+) -> Dict[str, int]:
+    return response_cache.stats()
+
+
+@metrics_router.get("/feed-cache")
+@inject
+async def get_feed_cache_stats(
+    feed_cache: FeedCache = Depends(Provide[Container.feed_cache]),
+) -> Dict[str, int]:
+    return feed_cache.stats()
+
+
+@metrics_router.get("/friend-graph")
+@inject
+async def get_friend_graph_stats(
+    graph: FriendGraph = Depends(Provide[Container.friend_graph]),
+) -> Dict[str, int]:
+    return graph.stats()
@@ -0,0 +1,220 @@
+"""A module providing management commands.
+
+Usage:
+    python -m newsreader.cli rebuild-recommendations [--user-id ID ...]
+    python -m newsreader.cli migrate [--target VERSION]
+    python -m newsreader.cli show-migrations
+    python -m newsreader.cli check-query-plans
+"""
+
+import argparse
+import asyncio
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from newsreader.db import (
+    database,
+    read_later_table,
+    user_favorites_table,
+    user_friends_table,
+)
+from newsreader.infrastructure.repository import (
+    _favorites_query,
+    _friend_favorites,
+    _friend_ids_query,
+    _read_later_query,
+    _recommended_page_query,
+    recommendation_rebuild_queries,
+)
+from newsreader.migrations import (
+    MIGRATIONS,
+    applied_versions,
+    init_db,
+    migrate,
+)
+
+
+async def rebuild_recommendations(user_ids: Optional[List[int]]) -> None:
+    """Recompute stored recommendations, e.g. after a backfill.
+
+    Args:
+        user_ids (Optional[List[int]]): Users to rebuild, all when None.
+    """
+    await init_db()
+    async with database.transaction():
+        for query in recommendation_rebuild_queries(user_ids):
+            await database.execute(query)
+    await database.disconnect()
+
+
+async def run_migrations(target: Optional[int]) -> None:
+    applied = await migrate(target)
+    for migration in applied:
+        print(f"Applied {migration.version}: {migration.description}")
+    if not applied:
+        print("Nothing to migrate")
+    await database.disconnect()
+
+
+async def show_migrations() -> None:
+    applied = set(await applied_versions())
+    for migration in MIGRATIONS:
+        state = "applied" if migration.version in applied else "pending"
+        print(f"{migration.version:>4}  {state:<8} {migration.description}")
+    await database.disconnect()
+
+
+def _hot_queries(
+    user_id: int, news_id: str
+) -> Dict[str, Tuple[Any, List[str]]]:
+    """Hot queries, each with the indexes its plan must use."""
+    return {
+        "friend ids": (
+            _friend_ids_query.params(user_id=user_id),
+            ["user_friends_pkey"],
+        ),
+        "favorites": (
+            _favorites_query.params(user_id=user_id),
+            ["user_favorites_pkey"],
+        ),
+        "read later": (
+            _read_later_query.params(user_id=user_id),
+            ["user_read_later_pkey"],
+        ),
+        "recommended page": (
+            _recommended_page_query.params(user_id=user_id, limit=20, offset=0),
+            ["ix_user_recommendations_user_id_score"],
+        ),
+        # delete_user and update_user
+        "friendships of user": (
+            user_friends_table.delete().where(
+                (user_friends_table.c.user_id == user_id)
+                | (user_friends_table.c.friend_id == user_id)
+            ),
+            ["user_friends_pkey", "ix_user_friends_friend_id"],
+        ),
+        "favorites of friends of user": (
+            _friend_favorites(user_friends_table.c.friend_id == user_id),
+            ["ix_user_friends_friend_id", "user_favorites_pkey"],
+        ),
+        "users who favorited": (
+            select(user_favorites_table.c.user_id).where(
+                user_favorites_table.c.news_id == news_id
+            ),
+            ["ix_user_favorites_news_id"],
+        ),
+        "read later of user": (
+            read_later_table.delete().where(
+                read_later_table.c.user_id == user_id
+            ),
+            ["user_read_later_pkey"],
+        ),
+    }
+
+
+def _plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def _explain_hot_queries() -> Dict[str, List[str]]:
+    """EXPLAIN the hot queries, returning what is wrong with their plans.
+
+    Sequential scans are disabled while planning, so Postgres picks one
+    only if no index can serve the query, even on near-empty tables. As it
+    may still read a whole index to filter on a column other than the
+    first, each query must use the indexes listed for it.
+
+    Returns:
+        Dict[str, List[str]]: Problems found, by query name.
+    """
+    failures: Dict[str, List[str]] = {}
+    async with database.transaction():
+        await database.execute(text("SET LOCAL enable_seqscan = off"))
+        queries = _hot_queries(user_id=1, news_id="news")
+        for name, (query, indexes) in queries.items():
+            sql = query.compile(
+                dialect=postgresql.dialect(),
+                compile_kwargs={"literal_binds": True},
+            )
+            plan = await database.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+            nodes = list(_plan_nodes(plan[0]["Plan"]))
+            problems = [
+                f"sequential scan of {node['Relation Name']}"
+                for node in nodes
+                if node["Node Type"] == "Seq Scan"
+            ]
+            used = {node.get("Index Name") for node in nodes}
+            problems += [
+                f"{index} not used" for index in indexes if index not in used
+            ]
+            if problems:
+                failures[name] = problems
+    return failures
+
+
+async def check_query_plans() -> int:
+    """Fail when a hot query would not use the indexes meant for it.
+
+    Returns:
+        int: The exit status, 1 if any query scans a table.
+    """
+    failures = await _explain_hot_queries()
+    await database.disconnect()
+    for name, problems in failures.items():
+        print(f"{name}: {', '.join(problems)}")
+    if failures:
+        return 1
+    print("All hot queries use indexes")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="newsreader")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser(
+        "rebuild-recommendations",
+        help="recompute the user_recommendations table",
+    )
+    rebuild.add_argument(
+        "--user-id",
+        type=int,
+        action="append",
+        dest="user_ids",
+        help="rebuild only this user (can be repeated)",
+    )
+
+    migrate_command = commands.add_parser(
+        "migrate", help="apply pending schema migrations"
+    )
+    migrate_command.add_argument(
+        "--target",
+        type=int,
+        help="apply migrations up to this version only",
+    )
+    commands.add_parser(
+        "show-migrations", help="list schema migrations and their state"
+    )
+    commands.add_parser(
+        "check-query-plans",
+        help="EXPLAIN hot queries, failing if one misses its indexes",
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "rebuild-recommendations":
+        asyncio.run(rebuild_recommendations(args.user_ids))
+    elif args.command == "migrate":
+        asyncio.run(run_migrations(args.target))
+    elif args.command == "show-migrations":
+        asyncio.run(show_migrations())
+    elif args.command == "check-query-plans":
+        sys.exit(asyncio.run(check_query_plans()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""A module providing the shared HTTP client session."""
+
+from typing import AsyncIterator
+
+import aiohttp
+
+from newsreader.config import config
+
+
+async def init_http_session() -> AsyncIterator[aiohttp.ClientSession]:
+    """Resource initializing the pooled HTTP client session.
+
+    The session (and its connection pool) lives for the whole app lifespan,
+    so upstream requests reuse keep-alive connections and cached DNS
+    lookups instead of opening a new TCP+TLS connection on every call.
+
+    Yields:
+        aiohttp.ClientSession: The shared client session.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.HTTP_POOL_LIMIT,
+        limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+        use_dns_cache=True,
+        ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=config.HTTP_TOTAL_TIMEOUT,
+        connect=config.HTTP_CONNECT_TIMEOUT,
+        sock_read=config.HTTP_READ_TIMEOUT,
+    )
+    session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+    try:
+        yield session
+    finally:
+        await session.close()
@@ -1,6 +1,6 @@
 """A module providing configuration variables."""
 
-from typing import Optional
+from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -17,7 +17,85 @@ class AppConfig(BaseConfig):
     DB_NAME: Optional[str] = None
     DB_USER: Optional[str] = None
     DB_PASSWORD: Optional[str] = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    # 0 disables the timeout
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256
+    DB_ECHO: bool = False
+    # otherwise run `python -m newsreader.cli migrate` before starting
+    MIGRATE_ON_STARTUP: bool = True
     API_KEY: Optional[str] = None
+    NEWS_API_URL: str = "https://api.thenewsapi.com/v1/news/"
+    NEWS_BATCH_CONCURRENCY: int = 10
+    NEWS_BATCH_MAX_IDS: int = 100
+    # articles per upstream response, as capped by the thenewsapi plan
+    NEWS_API_PAGE_SIZE: int = 25
+    NEWS_API_PAGE_CONCURRENCY: int = 4
+    NEWS_MAX_LIMIT: int = 1000
+
+    USER_AGGREGATE_QUERY: bool = True
+    FRIEND_GRAPH_ENABLED: bool = True
+    FRIEND_GRAPH_COMPACT_THRESHOLD: int = 100_000
+
+    RECOMMENDATION_SCORING_ENABLED: bool = True
+    RECOMMENDATION_FRIENDS_WEIGHT: float = 1.0
+    RECOMMENDATION_AFFINITY_WEIGHT: float = 0.5
+    RECOMMENDATION_RECENCY_WEIGHT: float = 0.5
+    RECOMMENDATION_RELEVANCE_WEIGHT: float = 0.1
+    # seconds after which an article's recency score halves
+    RECOMMENDATION_HALF_LIFE: float = 86400.0
+    RECOMMENDATION_MAX_CANDIDATES: int = 100_000
+    RECOMMENDATION_BATCH_SIZE: int = 10_000
+
+    # a feed is the user's recommendations merged with top news of up to
+    # FEED_CATEGORIES categories of their favorites
+    FEED_CATEGORIES: int = 3
+    FEED_TOP_LIMIT: int = 25
+    FEED_RECOMMENDED_LIMIT: int = 50
+    FEED_TTL: float = 300.0
+    FEED_CACHE_MAX_ENTRIES: int = 10_000
+    FEED_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    HTTP_POOL_LIMIT: int = 100
+    HTTP_POOL_LIMIT_PER_HOST: int = 20
+    HTTP_KEEPALIVE_TIMEOUT: float = 30.0
+    HTTP_DNS_CACHE_TTL: int = 300
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 10.0
+    HTTP_TOTAL_TIMEOUT: float = 15.0
+
+    NEWS_CACHE_MAX_ENTRIES: int = 1024
+    NEWS_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    NEWS_CACHE_TOP_TTL: float = 60.0
+    NEWS_CACHE_ALL_TTL: float = 300.0
+    NEWS_CACHE_STALE_TTL: float = 600.0
+    NEWS_CACHE_STALE_IF_ERROR_TTL: float = 3600.0
+
+    NEWS_RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    NEWS_RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    NEWS_RESPONSE_GZIP_MIN_SIZE: int = 1024
+    # articles do not change once published
+    NEWS_RESPONSE_ARTICLE_TTL: float = 3600.0
+
+    UPSTREAM_RATE_LIMIT: float = 5.0
+    UPSTREAM_RATE_BURST: int = 20
+    UPSTREAM_RATE_MAX_WAIT: float = 2.0
+    UPSTREAM_MAX_RETRIES: int = 2
+    UPSTREAM_BACKOFF_BASE: float = 0.2
+    UPSTREAM_BACKOFF_MAX: float = 2.0
+    UPSTREAM_BREAKER_THRESHOLD: int = 5
+    UPSTREAM_BREAKER_RESET: float = 30.0
+
+    # "" in the category/language lists means "no filter"
+    INGESTION_ENABLED: bool = False
+    INGESTION_CATEGORIES: List[str] = ["", "general", "business", "tech"]
+    INGESTION_LANGUAGES: List[str] = ["", "en"]
+    INGESTION_LIMIT: int = 10
+    INGESTION_INTERVAL: float = 300.0
+    INGESTION_MAX_AGE: float = 900.0
+    INGESTION_MAX_REQUESTS_PER_HOUR: int = 100
 
 
 config = AppConfig()
@@ -1,14 +1,163 @@
 from dependency_injector import containers, providers
+from newsreader.client import init_http_session
+from newsreader.config import config
+from newsreader.infrastructure.cache import (
+    CachedNewsRepository,
+    FeedCache,
+    ResponseCache,
+    TTLCache,
+)
+from newsreader.infrastructure.graph import FriendGraph
+from newsreader.infrastructure.ingestion import (
+    NewsIngestionWorker,
+    SnapshotNewsRepository,
+    TopNewsSnapshot,
+)
 from newsreader.infrastructure.repository import (
     UserRepositoryDB,
     NewsRepository,
+    ArticleRepositoryDB,
+)
+from newsreader.infrastructure.resilience import (
+    CircuitBreaker,
+    TokenBucket,
+    UpstreamGuard,
+)
+from newsreader.infrastructure.scoring import RecommendationScorer
+from newsreader.infrastructure.singleflight import CoalescingNewsRepository
+from newsreader.infrastructure.store import StoredNewsRepository
+from newsreader.infrastructure.service import (
+    FeedService,
+    UserService,
+    NewsService,
 )
-from newsreader.infrastructure.service import UserService, NewsService
 
 
 class Container(containers.DeclarativeContainer):
-    user_repository = providers.Singleton(UserRepositoryDB)
-    news_repository = providers.Singleton(NewsRepository)
+    http_session = providers.Resource(init_http_session)
+
+    news_cache = providers.Singleton(
+        TTLCache,
+        max_entries=config.NEWS_CACHE_MAX_ENTRIES,
+        max_bytes=config.NEWS_CACHE_MAX_BYTES,
+    )
+
+    response_cache = providers.Singleton(
+        ResponseCache,
+        max_entries=config.NEWS_RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=config.NEWS_RESPONSE_CACHE_MAX_BYTES,
+        gzip_min_size=config.NEWS_RESPONSE_GZIP_MIN_SIZE,
+    )
+
+    feed_cache = providers.Singleton(
+        FeedCache,
+        max_entries=config.FEED_CACHE_MAX_ENTRIES,
+        max_bytes=config.FEED_CACHE_MAX_BYTES,
+        ttl=config.FEED_TTL,
+    )
+
+    top_news_snapshot = providers.Singleton(
+        TopNewsSnapshot, max_age=config.INGESTION_MAX_AGE
+    )
+
+    upstream_guard = providers.Singleton(
+        UpstreamGuard,
+        limiter=providers.Singleton(
+            TokenBucket,
+            rate=config.UPSTREAM_RATE_LIMIT,
+            capacity=config.UPSTREAM_RATE_BURST,
+        ),
+        breaker=providers.Singleton(
+            CircuitBreaker,
+            failure_threshold=config.UPSTREAM_BREAKER_THRESHOLD,
+            reset_timeout=config.UPSTREAM_BREAKER_RESET,
+        ),
+        max_retries=config.UPSTREAM_MAX_RETRIES,
+        backoff_base=config.UPSTREAM_BACKOFF_BASE,
+        backoff_max=config.UPSTREAM_BACKOFF_MAX,
+        max_wait=config.UPSTREAM_RATE_MAX_WAIT,
+    )
+
+    article_repository = providers.Singleton(ArticleRepositoryDB)
+    friend_graph = providers.Singleton(
+        FriendGraph, compact_threshold=config.FRIEND_GRAPH_COMPACT_THRESHOLD
+    )
+    recommendation_scorer = providers.Singleton(
+        RecommendationScorer,
+        friends_weight=config.RECOMMENDATION_FRIENDS_WEIGHT,
+        affinity_weight=config.RECOMMENDATION_AFFINITY_WEIGHT,
+        recency_weight=config.RECOMMENDATION_RECENCY_WEIGHT,
+        relevance_weight=config.RECOMMENDATION_RELEVANCE_WEIGHT,
+        half_life=config.RECOMMENDATION_HALF_LIFE,
+        max_candidates=config.RECOMMENDATION_MAX_CANDIDATES,
+        batch_size=config.RECOMMENDATION_BATCH_SIZE,
+    )
+    user_repository = providers.Singleton(
+        UserRepositoryDB,
+        aggregate_query=config.USER_AGGREGATE_QUERY,
+        graph=friend_graph if config.FRIEND_GRAPH_ENABLED else None,
+        scorer=(
+            recommendation_scorer
+            if config.RECOMMENDATION_SCORING_ENABLED
+            else None
+        ),
+    )
+    upstream_news_repository = providers.Singleton(
+        NewsRepository,
+        session=http_session,
+        base_url=config.NEWS_API_URL,
+        batch_concurrency=config.NEWS_BATCH_CONCURRENCY,
+        guard=upstream_guard,
+        page_size=config.NEWS_API_PAGE_SIZE,
+        page_concurrency=config.NEWS_API_PAGE_CONCURRENCY,
+    )
+    coalescing_news_repository = providers.Singleton(
+        CoalescingNewsRepository,
+        repository=upstream_news_repository,
+        batch_concurrency=config.NEWS_BATCH_CONCURRENCY,
+    )
+    stored_news_repository = providers.Singleton(
+        StoredNewsRepository,
+        repository=coalescing_news_repository,
+        store=article_repository,
+    )
+    cached_news_repository = providers.Singleton(
+        CachedNewsRepository,
+        repository=stored_news_repository,
+        cache=news_cache,
+        top_ttl=config.NEWS_CACHE_TOP_TTL,
+        all_ttl=config.NEWS_CACHE_ALL_TTL,
+        stale_ttl=config.NEWS_CACHE_STALE_TTL,
+        stale_if_error_ttl=config.NEWS_CACHE_STALE_IF_ERROR_TTL,
+    )
+    news_repository = providers.Singleton(
+        SnapshotNewsRepository,
+        repository=cached_news_repository,
+        snapshot=top_news_snapshot,
+    )
+
+    news_ingestion_worker = providers.Singleton(
+        NewsIngestionWorker,
+        repository=stored_news_repository,
+        snapshot=top_news_snapshot,
+        categories=config.INGESTION_CATEGORIES,
+        languages=config.INGESTION_LANGUAGES,
+        limit=config.INGESTION_LIMIT,
+        interval=config.INGESTION_INTERVAL,
+        max_requests_per_hour=config.INGESTION_MAX_REQUESTS_PER_HOUR,
+    )
 
-    user_service = providers.Factory(UserService, repository=user_repository)
+    user_service = providers.Factory(
+        UserService, repository=user_repository, feed_cache=feed_cache
+    )
     news_service = providers.Factory(NewsService, repository=news_repository)
+    # a singleton, so concurrent first requests of a user share one build
+    feed_service = providers.Singleton(
+        FeedService,
+        user_repository=user_repository,
+        news_repository=news_repository,
+        cache=feed_cache,
+        categories=config.FEED_CATEGORIES,
+        top_limit=config.FEED_TOP_LIMIT,
+        recommended_limit=config.FEED_RECOMMENDED_LIMIT,
+    )
@@ -38,3 +38,14 @@ class User(BaseModel):
     read_later: List[NewsPreview] = []
 
     model_config = ConfigDict(from_attributes=True, extra="ignore")
+
+
+class FriendSuggestion(BaseModel):
+    user_id: int
+    mutual_friends: int
+
+
+class NewsBatchItem(BaseModel):
+    id: str
+    news: Optional[News] = None
+    error: Optional[str] = None
@@ -1,12 +1,26 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Set
 
-from newsreader.core.domain import News, User, NewsPreview
+from newsreader.core.domain import (
+    FriendSuggestion,
+    News,
+    NewsBatchItem,
+    NewsPreview,
+    User,
+)
 
 
 class IUserRepository(ABC):
     @abstractmethod
-    async def get_all(self) -> List[User]:
+    async def get_all(
+        self, limit: Optional[int] = None, after: Optional[int] = None
+    ) -> List[User]:
+        pass
+
+    @abstractmethod
+    def iter_all(
+        self, batch_size: int = 100, after: Optional[int] = None
+    ) -> AsyncIterator[User]:
         pass
 
     @abstractmethod
@@ -18,11 +32,14 @@ class IUserRepository(ABC):
         pass
 
     @abstractmethod
-    async def delete_user(self, user_id: int) -> None:
+    async def delete_user(self, user_id: int) -> Set[int]:
+        """Delete the user, returning the ids of their former friends."""
         pass
 
     @abstractmethod
-    async def update_user(self, user_id: int, user_data: User) -> None:
+    async def update_user(self, user_id: int, user_data: User) -> Set[int]:
+        """Update the user, returning the ids of the other users whose
+        friendships with them were added or removed."""
         pass
 
     @abstractmethod
@@ -52,7 +69,21 @@ class IUserRepository(ABC):
         pass
 
     @abstractmethod
-    async def get_recommended_news(self, user_id: int) -> List[NewsPreview]:
+    async def get_favorite_categories(
+        self, user_id: int, limit: int = 3
+    ) -> List[str]:
+        pass
+
+    @abstractmethod
+    async def get_recommended_news(
+        self, user_id: int, limit: int = 20, offset: int = 0
+    ) -> List[NewsPreview]:
+        pass
+
+    @abstractmethod
+    async def get_suggested_friends(
+        self, user_id: int, limit: int = 10
+    ) -> List[FriendSuggestion]:
         pass
 
     @abstractmethod
@@ -90,6 +121,55 @@ class INewsRepository(ABC):
     ) -> List[News]:
         pass
 
+    @abstractmethod
+    def iter_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        pass
+
+    @abstractmethod
+    def iter_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        pass
+
+    @abstractmethod
+    async def get_by_id(self, news_id: str) -> Optional[News]:
+        pass
+
+    @abstractmethod
+    async def get_many(
+        self, news_ids: List[str], timeout: Optional[float] = None
+    ) -> List[NewsBatchItem]:
+        pass
+
+
+class IArticleRepository(ABC):
     @abstractmethod
     async def get_by_id(self, news_id: str) -> Optional[News]:
         pass
+
+    @abstractmethod
+    async def get_many(self, news_ids: List[str]) -> List[News]:
+        pass
+
+    @abstractmethod
+    async def save_many(self, news: List[News]) -> None:
+        pass
+
+    @abstractmethod
+    async def search(
+        self,
+        search: str,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        pass
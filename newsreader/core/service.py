@@ -1,12 +1,26 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple, Union
 
-from newsreader.core.domain import News, User, NewsPreview
+from newsreader.core.domain import (
+    FriendSuggestion,
+    News,
+    NewsBatchItem,
+    NewsPreview,
+    User,
+)
 
 
 class IUserService(ABC):
     @abstractmethod
-    async def get_all_users(self) -> List[User]:
+    async def get_all_users(
+        self, limit: Optional[int] = None, after: Optional[int] = None
+    ) -> List[User]:
+        pass
+
+    @abstractmethod
+    def iter_all_users(
+        self, batch_size: int = 100, after: Optional[int] = None
+    ) -> AsyncIterator[User]:
         pass
 
     @abstractmethod
@@ -52,7 +66,15 @@ class IUserService(ABC):
         pass
 
     @abstractmethod
-    async def get_recommended_news(self, user_id: int) -> List[NewsPreview]:
+    async def get_recommended_news(
+        self, user_id: int, limit: int = 20, offset: int = 0
+    ) -> List[NewsPreview]:
+        pass
+
+    @abstractmethod
+    async def get_suggested_friends(
+        self, user_id: int, limit: int = 10
+    ) -> List[FriendSuggestion]:
         pass
 
     @abstractmethod
@@ -90,6 +112,45 @@ class INewsService(ABC):
     ) -> List[News]:
         pass
 
+    @abstractmethod
+    def iter_top_news(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        pass
+
+    @abstractmethod
+    def iter_all_news(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        pass
+
     @abstractmethod
     async def get_news_by_id(self, news_id: str) -> Optional[News]:
         pass
+
+    @abstractmethod
+    async def get_news_batch(
+        self, news_ids: List[str], timeout: Optional[float] = None
+    ) -> List[NewsBatchItem]:
+        pass
+
+    @abstractmethod
+    async def expand_previews(
+        self, previews: List[NewsPreview], timeout: Optional[float] = None
+    ) -> List[Union[News, NewsPreview]]:
+        pass
+
+
+class IFeedService(ABC):
+    @abstractmethod
+    async def get_feed(
+        self, user_id: int, limit: int = 20, cursor: Optional[str] = None
+    ) -> Tuple[List[Union[News, NewsPreview]], Optional[str]]:
+        pass
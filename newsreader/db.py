@@ -1,15 +1,28 @@
 """A module providing database access."""
 
-import asyncio
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Optional,
+    Sequence,
+    Union,
+    cast,
+)
 
-import databases
 import sqlalchemy
-from sqlalchemy.exc import OperationalError, DatabaseError
-from sqlalchemy.ext.asyncio import create_async_engine
-from asyncpg.exceptions import (  # type: ignore
-    CannotConnectNowError,
-    ConnectionDoesNotExistError,
+from sqlalchemy import Connection, Executable, RowMapping
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    create_async_engine,
 )
+from sqlalchemy.pool import QueuePool
 
 from newsreader.config import config
 
@@ -56,7 +69,7 @@ user_favorites_table = sqlalchemy.Table(
 
 read_later_table = sqlalchemy.Table(
     "user_read_later",
-    sqlalchemy.MetaData(),
+    metadata,
     sqlalchemy.Column(
         "user_id",
         sqlalchemy.Integer,
@@ -69,6 +82,79 @@ read_later_table = sqlalchemy.Table(
     sqlalchemy.Column("title", sqlalchemy.String, nullable=False),
 )
 
+sqlalchemy.Index("ix_user_friends_friend_id", user_friends_table.c.friend_id)
+sqlalchemy.Index("ix_user_favorites_news_id", user_favorites_table.c.news_id)
+
+user_recommendations_table = sqlalchemy.Table(
+    "user_recommendations",
+    metadata,
+    sqlalchemy.Column(
+        "user_id",
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey("users.id"),
+        primary_key=True,
+    ),
+    sqlalchemy.Column(
+        "news_id", sqlalchemy.String, nullable=False, primary_key=True
+    ),
+    sqlalchemy.Column("title", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("score", sqlalchemy.Integer, nullable=False),
+)
+
+sqlalchemy.Index(
+    "ix_user_recommendations_user_id_score",
+    user_recommendations_table.c.user_id,
+    user_recommendations_table.c.score.desc(),
+    user_recommendations_table.c.news_id,
+)
+
+articles_table = sqlalchemy.Table(
+    "articles",
+    metadata,
+    sqlalchemy.Column("uuid", sqlalchemy.String, primary_key=True),
+    sqlalchemy.Column("title", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("description", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("keywords", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("snippet", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("url", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("image_url", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("language", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column(
+        "published_at", sqlalchemy.DateTime(timezone=True), nullable=False
+    ),
+    sqlalchemy.Column("source", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column("categories", ARRAY(sqlalchemy.String), nullable=False),
+    sqlalchemy.Column("relevance_score", sqlalchemy.Float, nullable=True),
+    sqlalchemy.Column(
+        "search_vector",
+        TSVECTOR,
+        sqlalchemy.Computed(
+            "to_tsvector('simple', title || ' ' || description || ' ' "
+            "|| keywords || ' ' || snippet)",
+            persisted=True,
+        ),
+    ),
+)
+
+sqlalchemy.Index(
+    "ix_articles_search_vector",
+    articles_table.c.search_vector,
+    postgresql_using="gin",
+)
+
+schema_migrations_table = sqlalchemy.Table(
+    "schema_migrations",
+    metadata,
+    sqlalchemy.Column("version", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("description", sqlalchemy.String, nullable=False),
+    sqlalchemy.Column(
+        "applied_at",
+        sqlalchemy.DateTime(timezone=True),
+        nullable=False,
+        server_default=sqlalchemy.func.now(),
+    ),
+)
+
 db_uri = (
     f"postgresql+asyncpg://{config.DB_USER}:{config.DB_PASSWORD}"
     f"@{config.DB_HOST}/{config.DB_NAME}"
@@ -76,37 +162,156 @@ db_uri = (
 
 engine = create_async_engine(
     db_uri,
-    echo=True,
-    future=True,
+    echo=config.DB_ECHO,
     pool_pre_ping=True,
-)
-
-database = databases.Database(
-    db_uri,
-    force_rollback=True,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    connect_args={
+        "server_settings": {
+            "statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)
+        },
+        # per connection, asyncpg prepares each distinct statement once
+        "prepared_statement_cache_size": (
+            config.DB_PREPARED_STATEMENT_CACHE_SIZE
+        ),
+    },
 )
 
 
-async def init_db(retries: int = 5, delay: int = 5) -> None:
-    """Function initializing the DB.
+class Database:
+    """The app's single entry point to the connection pool of `engine`.
 
-    Args:
-        retries (int, optional): Number of retries of connect to DB.
-            Defaults to 5.
-        delay (int, optional): Delay of connect do DB. Defaults to 2.
+    Each query outside of `transaction()` runs in a transaction of its own,
+    committed right after it. Queries inside `transaction()` share its
+    connection, which is looked up through a context variable.
     """
-    for attempt in range(retries):
-        try:
-            async with engine.begin() as conn:
-                await conn.run_sync(metadata.create_all)
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self._connection: ContextVar[Optional[AsyncConnection]] = ContextVar(
+            "connection", default=None
+        )
+        self._waiters = 0
+        self._acquired = 0
+        self._acquire_timeouts = 0
+        self._acquire_seconds = 0.0
+        self._acquire_max_seconds = 0.0
+
+    async def connect(self) -> None:
+        """Open a first connection, so a bad DB setup fails at startup."""
+        async with self._begin():
+            pass
+
+    async def disconnect(self) -> None:
+        await self.engine.dispose()
+
+    async def fetch_all(
+        self, query: Executable, values: Optional[Dict[str, Any]] = None
+    ) -> Sequence[RowMapping]:
+        async with self._query_connection() as conn:
+            result = await conn.execute(query, values)
+            return result.mappings().all()
+
+    async def fetch_one(
+        self, query: Executable, values: Optional[Dict[str, Any]] = None
+    ) -> Optional[RowMapping]:
+        async with self._query_connection() as conn:
+            result = await conn.execute(query, values)
+            return result.mappings().first()
+
+    async def iterate(
+        self, query: Executable, values: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[RowMapping]:
+        """Stream rows through a server-side cursor."""
+        async with self._query_connection() as conn:
+            result = await conn.stream(query, values)
+            async for row in result.mappings():
+                yield row
+
+    async def execute(
+        self, query: Executable, values: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """Execute a query.
+
+        Returns:
+            Any: The first column of the first returned row, e.g. of a
+                RETURNING clause, or the number of affected rows.
+        """
+        async with self._query_connection() as conn:
+            result = await conn.execute(query, values)
+            if result.returns_rows:
+                return result.scalar()
+            return result.rowcount
+
+    async def run_sync(self, fn: Callable[[Connection], Any]) -> Any:
+        """Run `fn` with a sync connection, e.g. for metadata operations."""
+        async with self._query_connection() as conn:
+            return await conn.run_sync(fn)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Run the enclosed queries in one transaction, or a savepoint."""
+        conn = self._connection.get()
+        if conn is not None:
+            async with conn.begin_nested():
+                yield
+            return
+
+        async with self._begin() as conn:
+            token = self._connection.set(conn)
+            try:
+                yield
+            finally:
+                self._connection.reset(token)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        pool = cast(QueuePool, self.engine.pool)
+        acquired = self._acquired or 1
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "waiters": self._waiters,
+            "acquired": self._acquired,
+            "acquire_timeouts": self._acquire_timeouts,
+            "acquire_avg_ms": self._acquire_seconds / acquired * 1000,
+            "acquire_max_ms": self._acquire_max_seconds * 1000,
+        }
+
+    @asynccontextmanager
+    async def _query_connection(self) -> AsyncIterator[AsyncConnection]:
+        conn = self._connection.get()
+        if conn is not None:
+            yield conn
             return
-        except (
-            OperationalError,
-            DatabaseError,
-            CannotConnectNowError,
-            ConnectionDoesNotExistError,
-        ) as e:
-            print(f"Attempt {attempt + 1} failed: {e}")
-            await asyncio.sleep(delay)
-
-    raise ConnectionError("Could not connect to DB after several retries.")
+        async with self._begin() as conn:
+            yield conn
+
+    @asynccontextmanager
+    async def _begin(self) -> AsyncIterator[AsyncConnection]:
+        """Check a connection out of the pool and begin a transaction."""
+        started = time.monotonic()
+        self._waiters += 1
+        conn = self.engine.connect()
+        try:
+            await conn.start()
+        except sqlalchemy.exc.TimeoutError:
+            self._acquire_timeouts += 1
+            raise
+        finally:
+            self._waiters -= 1
+        elapsed = time.monotonic() - started
+        self._acquired += 1
+        self._acquire_seconds += elapsed
+        self._acquire_max_seconds = max(self._acquire_max_seconds, elapsed)
+
+        try:
+            async with conn.begin():
+                yield conn
+        finally:
+            await conn.close()
+
+
+database = Database(engine)
@@ -0,0 +1,68 @@
+"""A module providing bounded concurrent lookups of many news."""
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi import HTTPException
+
+from newsreader.core.domain import News, NewsBatchItem
+
+
+def unique_ids(news_ids: List[str]) -> List[str]:
+    """Deduplicate ids, keeping the order of their first occurrence."""
+    return list(dict.fromkeys(news_ids))
+
+
+async def fetch_many(
+    news_ids: List[str],
+    get_by_id: Callable[[str], Awaitable[Optional[News]]],
+    semaphore: asyncio.Semaphore,
+    timeout: Optional[float] = None,
+) -> List[NewsBatchItem]:
+    """Fetch news concurrently, at most `semaphore` lookups at a time.
+
+    A failed lookup is reported in its item instead of failing the batch.
+
+    Args:
+        news_ids (List[str]): Ids to fetch, duplicates are fetched once.
+        get_by_id (Callable): Coroutine function fetching a single news.
+        semaphore (asyncio.Semaphore): Bound on concurrent lookups.
+        timeout (Optional[float]): Seconds to wait for the whole batch.
+            Lookups still running by then are cancelled and reported as
+            timed out. Defaults to None (no limit).
+
+    Returns:
+        List[NewsBatchItem]: One item per unique id, in request order.
+    """
+
+    async def fetch(news_id: str) -> NewsBatchItem:
+        async with semaphore:
+            try:
+                news = await get_by_id(news_id)
+            except HTTPException as e:
+                return NewsBatchItem(id=news_id, error=str(e.detail))
+            except Exception as e:
+                return NewsBatchItem(id=news_id, error=str(e))
+        if news is None:
+            return NewsBatchItem(id=news_id, error="News not found")
+        return NewsBatchItem(id=news_id, news=news)
+
+    news_ids = unique_ids(news_ids)
+    if not news_ids:
+        return []
+    tasks = [asyncio.ensure_future(fetch(news_id)) for news_id in news_ids]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    def result(news_id: str, task: asyncio.Future) -> NewsBatchItem:
+        if task in pending:
+            return NewsBatchItem(id=news_id, error="Timed out")
+        if task.cancelled():
+            # a shared lookup was cancelled under this one
+            return NewsBatchItem(id=news_id, error="Cancelled")
+        return task.result()
+
+    return [result(news_id, task) for news_id, task in zip(news_ids, tasks)]
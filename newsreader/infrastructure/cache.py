@@ -0,0 +1,587 @@
+"""A module providing the in-memory news response cache."""
+
+import asyncio
+import gzip
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from newsreader.core.domain import News, NewsBatchItem, NewsPreview
+from newsreader.core.repository import INewsRepository
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[Hashable, ...]
+
+
+def _sizeof_news(news_list: List[News]) -> int:
+    """Estimate the memory footprint of a cached list of news in bytes."""
+    size = 64
+    for news in news_list:
+        size += 256 + sum(
+            len(value)
+            for value in (
+                news.uuid,
+                news.title,
+                news.description,
+                news.keywords,
+                news.snippet,
+                news.url,
+                news.image_url,
+                news.language,
+                news.source,
+            )
+        )
+        size += sum(len(category) for category in news.categories)
+    return size
+
+
+def normalize_categories(
+    categories: Optional[List[str]],
+) -> Optional[List[str]]:
+    """Return categories sorted and deduplicated, or None when empty."""
+    if not categories:
+        return None
+    return sorted(set(categories))
+
+
+def normalize_language(language: Optional[str]) -> Optional[str]:
+    """Return the language lower-cased, or None when empty."""
+    return language.lower() if language else None
+
+
+def make_key(endpoint: str, **params: Any) -> CacheKey:
+    """Build a hashable key identifying an upstream query.
+
+    Args:
+        endpoint (str): Name of the upstream endpoint.
+        **params: Already normalized query parameters.
+
+    Returns:
+        CacheKey: Key shared by all equivalent queries.
+    """
+    return (endpoint,) + tuple(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in sorted(params.items())
+    )
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    size: int
+    expires_at: float
+    stale_until: float
+    error_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def is_usable(self, now: float) -> bool:
+        return now < self.stale_until
+
+    def is_kept(self, now: float) -> bool:
+        return now < self.error_until
+
+
+class TTLCache:
+    """Bounded LRU cache with per-entry TTL and a total size cap."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        sizeof: Callable[[Any], int] = _sizeof_news,
+    ):
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey, now: float) -> Optional[CacheEntry]:
+        """Return a kept entry and mark it recently used.
+
+        The entry may be fresh, stale, or only good enough to be served when
+        reloading it fails; callers check which one it is.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not entry.is_kept(now):
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(
+        self,
+        key: CacheKey,
+        value: Any,
+        ttl: float,
+        stale_ttl: float,
+        stale_if_error_ttl: float = 0.0,
+    ) -> None:
+        """Store a value, evicting least recently used entries if needed."""
+        if key in self._entries:
+            self._remove(key)
+        size = self._sizeof(value)
+        if size > self._max_bytes:
+            return
+        now = time.monotonic()
+        self._entries[key] = CacheEntry(
+            value=value,
+            size=size,
+            expires_at=now + ttl,
+            stale_until=now + ttl + stale_ttl,
+            error_until=now + ttl + stale_ttl + stale_if_error_ttl,
+        )
+        self._bytes += size
+        while (
+            len(self._entries) > self._max_entries
+            or self._bytes > self._max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key: CacheKey) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class ExpiryTracker:
+    """Records until when the cached news served in a block stay fresh."""
+
+    def __init__(self) -> None:
+        self.expires_at: Optional[float] = None
+
+    def ttl(self, max_ttl: float) -> float:
+        """Seconds the served news stay fresh, at most `max_ttl`."""
+        if self.expires_at is None:
+            return max_ttl
+        return min(max(self.expires_at - time.monotonic(), 0.0), max_ttl)
+
+
+_expiry_tracker: ContextVar[Optional[ExpiryTracker]] = ContextVar(
+    "expiry_tracker", default=None
+)
+
+
+@contextmanager
+def track_expiry() -> Iterator[ExpiryTracker]:
+    """Track the freshness of news served by caches within the block.
+
+    Callers caching what they build from those news, e.g. serialized
+    responses, must not keep it fresh for longer than the news themselves.
+    """
+    tracker = ExpiryTracker()
+    token = _expiry_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _expiry_tracker.reset(token)
+
+
+def _record_expiry(expires_at: float) -> None:
+    tracker = _expiry_tracker.get()
+    if tracker is not None and (
+        tracker.expires_at is None or expires_at < tracker.expires_at
+    ):
+        tracker.expires_at = expires_at
+
+
+@dataclass
+class SerializedResponse:
+    """A response body encoded once, with its gzip variant and ETags."""
+
+    body: bytes
+    gzip_body: Optional[bytes]
+    etag: str
+    gzip_etag: str
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body or b"")
+
+    def max_age(self, now: float) -> int:
+        return max(int(self.expires_at - now), 0)
+
+
+class ResponseCache:
+    """Cache of pre-serialized JSON bodies, so hits skip pydantic entirely.
+
+    Bodies of at least `gzip_min_size` bytes are also stored gzipped.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, gzip_min_size: int):
+        self._cache = TTLCache(
+            max_entries, max_bytes, sizeof=lambda response: response.size
+        )
+        self._gzip_min_size = gzip_min_size
+
+    def get(self, key: CacheKey) -> Optional[SerializedResponse]:
+        now = time.monotonic()
+        entry = self._cache.get(key, now)
+        if entry is None or not entry.is_fresh(now):
+            self._cache.misses += 1
+            return None
+        self._cache.hits += 1
+        return entry.value
+
+    def set(self, key: CacheKey, body: bytes, ttl: float) -> SerializedResponse:
+        """Store a serialized body, returning it with its ETags.
+
+        A body which is not fresh anymore (`ttl` of 0) is returned, but not
+        stored.
+        """
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        gzip_body = None
+        if len(body) >= self._gzip_min_size:
+            gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+        response = SerializedResponse(
+            body=body,
+            gzip_body=gzip_body,
+            # strong ETags differ between content codings of the same body
+            etag=f'"{digest}"',
+            gzip_etag=f'"{digest}-gzip"',
+            expires_at=time.monotonic() + ttl,
+        )
+        if ttl > 0:
+            self._cache.set(key, response, ttl, 0)
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+FeedItem = Union[News, NewsPreview]
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a feed cursor that was not issued by FeedCache."""
+
+
+class FeedExpiredError(Exception):
+    """Raised for a feed cursor whose feed is no longer cached."""
+
+
+def make_feed_cursor(version: int, offset: int) -> str:
+    return f"{version}.{offset}"
+
+
+def parse_feed_cursor(cursor: str) -> Tuple[int, int]:
+    """Return the (version, offset) a feed cursor points to."""
+    version, _, offset = cursor.partition(".")
+    if not (version.isdigit() and offset.isdigit()):
+        raise InvalidCursorError(f"Invalid feed cursor: {cursor!r}")
+    return int(version), int(offset)
+
+
+def _sizeof_feed(items: List[FeedItem]) -> int:
+    """Estimate the memory footprint of a cached feed in bytes."""
+    news = [item for item in items if isinstance(item, News)]
+    previews = [item for item in items if not isinstance(item, News)]
+    return _sizeof_news(news) + sum(
+        128 + len(preview.uuid) + len(preview.title) for preview in previews
+    )
+
+
+class FeedCache:
+    """Per-user feeds, each built once and then paged through by cursor.
+
+    Every stored feed gets a new version. Invalidating a user's feed only
+    makes the next first page build a new one: cursors name the version
+    they page through, so clients keep scrolling a consistent feed until it
+    expires.
+
+    Invalidations are numbered by a counter shared by all users. Only the
+    last `max_entries` invalidated users and current feeds are remembered:
+    forgetting older ones only costs a rebuild, as a feed whose build began
+    before a forgotten invalidation never becomes current.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self._cache = TTLCache(max_entries, max_bytes, sizeof=_sizeof_feed)
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._current: OrderedDict[int, int] = OrderedDict()
+        # user id -> number of their last invalidation
+        self._invalidated: OrderedDict[int, int] = OrderedDict()
+        self._invalidation = 0
+        # builds which began before this invalidation may be outdated
+        self._forgotten = 0
+        self._version = 0
+        self.invalidations = 0
+
+    def current(self, user_id: int) -> Optional[Tuple[int, List[FeedItem]]]:
+        """Return the user's feed and its version, if it is still fresh."""
+        version = self._current.get(user_id)
+        if version is None:
+            return None
+        feed = self.get(user_id, version)
+        if feed is None:
+            del self._current[user_id]
+            return None
+        return version, feed
+
+    def get(self, user_id: int, version: int) -> Optional[List[FeedItem]]:
+        now = time.monotonic()
+        entry = self._cache.get(("feed", user_id, version), now)
+        if entry is None or not entry.is_fresh(now):
+            self._cache.misses += 1
+            return None
+        self._cache.hits += 1
+        return entry.value
+
+    def generation(self) -> int:
+        """Return a token to pass to `set` for a feed about to be built.
+
+        Tokens are shared by all users: a feed is outdated if its user was
+        invalidated after the token was taken.
+        """
+        return self._invalidation
+
+    def set(self, user_id: int, items: List[FeedItem], generation: int) -> int:
+        """Store a feed, returning its version.
+
+        The feed becomes the user's current one only if it was not
+        invalidated since `generation` was taken, i.e. while being built.
+        """
+        self._version += 1
+        self._cache.set(("feed", user_id, self._version), items, self._ttl, 0)
+        if (
+            generation >= self._forgotten
+            and generation >= self._invalidated.get(user_id, 0)
+        ):
+            self._current[user_id] = self._version
+            self._current.move_to_end(user_id)
+            if len(self._current) > self._max_entries:
+                self._current.popitem(last=False)
+        return self._version
+
+    def invalidate(self, user_id: int) -> None:
+        self._invalidation += 1
+        self._invalidated[user_id] = self._invalidation
+        self._invalidated.move_to_end(user_id)
+        if len(self._invalidated) > self._max_entries:
+            _, self._forgotten = self._invalidated.popitem(last=False)
+        if self._current.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self._cache.stats(),
+            "invalidations": self.invalidations,
+            "current_feeds": len(self._current),
+            "invalidated_users": len(self._invalidated),
+        }
+
+
+class CachedNewsRepository(INewsRepository):
+    """News repository serving repeated queries from a TTLCache.
+
+    Expired entries are still served for `stale_ttl` seconds while a single
+    background task refreshes them from the wrapped repository. After that,
+    they are kept for another `stale_if_error_ttl` seconds and served only
+    if the wrapped repository fails, e.g. while upstream is down.
+    """
+
+    def __init__(
+        self,
+        repository: INewsRepository,
+        cache: TTLCache,
+        top_ttl: float,
+        all_ttl: float,
+        stale_ttl: float,
+        stale_if_error_ttl: float = 0.0,
+    ):
+        self._repository = repository
+        self._cache = cache
+        self._top_ttl = top_ttl
+        self._all_ttl = all_ttl
+        self._stale_ttl = stale_ttl
+        self._stale_if_error_ttl = stale_if_error_ttl
+        self._refreshing: Dict[CacheKey, asyncio.Task] = {}
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.errors_served_stale = 0
+
+    async def get_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        categories = normalize_categories(categories)
+        language = normalize_language(language)
+        key = make_key(
+            "top", limit=limit, categories=categories, language=language
+        )
+        return await self._get_or_load(
+            key,
+            self._top_ttl,
+            lambda: self._repository.get_top(limit, categories, language),
+        )
+
+    async def get_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        categories = normalize_categories(categories)
+        language = normalize_language(language)
+        key = make_key(
+            "all",
+            limit=limit,
+            search=search,
+            categories=categories,
+            language=language,
+        )
+        return await self._get_or_load(
+            key,
+            self._all_ttl,
+            lambda: self._repository.get_all(
+                limit, search, categories, language
+            ),
+        )
+
+    def iter_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        # streams are meant for large exports, they are not worth caching
+        return self._repository.iter_top(limit, categories, language)
+
+    def iter_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        return self._repository.iter_all(limit, search, categories, language)
+
+    async def get_by_id(self, news_id: str) -> Optional[News]:
+        return await self._repository.get_by_id(news_id)
+
+    async def get_many(
+        self, news_ids: List[str], timeout: Optional[float] = None
+    ) -> List[NewsBatchItem]:
+        return await self._repository.get_many(news_ids, timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self._cache.stats(),
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "errors_served_stale": self.errors_served_stale,
+        }
+
+    async def _get_or_load(
+        self,
+        key: CacheKey,
+        ttl: float,
+        loader: Callable[[], Awaitable[List[News]]],
+    ) -> List[News]:
+        now = time.monotonic()
+        entry = self._cache.get(key, now)
+        if entry is not None and entry.is_fresh(now):
+            self._cache.hits += 1
+            _record_expiry(entry.expires_at)
+            return entry.value
+        if entry is not None and entry.is_usable(now):
+            self._cache.stale_hits += 1
+            self._schedule_refresh(key, ttl, loader)
+            _record_expiry(entry.expires_at)
+            return entry.value
+
+        self._cache.misses += 1
+        try:
+            value = await loader()
+        except Exception as e:
+            if entry is None:
+                raise
+            self.errors_served_stale += 1
+            logger.warning("Serving stale news after load failure: %s", e)
+            _record_expiry(entry.expires_at)
+            return entry.value
+        self._store(key, ttl, value)
+        _record_expiry(time.monotonic() + ttl)
+        return value
+
+    def _store(self, key: CacheKey, ttl: float, value: List[News]) -> None:
+        self._cache.set(
+            key, value, ttl, self._stale_ttl, self._stale_if_error_ttl
+        )
+
+    def _schedule_refresh(
+        self,
+        key: CacheKey,
+        ttl: float,
+        loader: Callable[[], Awaitable[List[News]]],
+    ) -> None:
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, ttl, loader))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(
+        self,
+        key: CacheKey,
+        ttl: float,
+        loader: Callable[[], Awaitable[List[News]]],
+    ) -> None:
+        try:
+            value = await loader()
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.warning("Refreshing cached news failed: %s", e)
+            return
+        self.refreshes += 1
+        self._store(key, ttl, value)
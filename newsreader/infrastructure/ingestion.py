@@ -0,0 +1,200 @@
+"""A module providing background ingestion of top news."""
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from newsreader.core.domain import News, NewsBatchItem
+from newsreader.core.repository import INewsRepository
+from newsreader.infrastructure.cache import (
+    normalize_categories,
+    normalize_language,
+)
+
+logger = logging.getLogger(__name__)
+
+SnapshotCell = Tuple[Optional[str], Optional[str]]
+
+
+class TopNewsSnapshot:
+    """Latest top news per (category, language) cell, kept in memory."""
+
+    def __init__(self, max_age: float):
+        self._max_age = max_age
+        self._cells: Dict[SnapshotCell, Tuple[float, int, List[News]]] = {}
+
+    def update(
+        self,
+        category: Optional[str],
+        language: Optional[str],
+        limit: int,
+        news: List[News],
+    ) -> None:
+        cell = (category or None, normalize_language(language))
+        self._cells[cell] = (time.monotonic(), limit, news)
+
+    def get(
+        self,
+        limit: int,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> Optional[List[News]]:
+        """Return snapshot news for the query, or None when not covered.
+
+        A query is covered when it asks for at most one category, its cell
+        was ingested within `max_age` seconds and with at least `limit`
+        items requested.
+        """
+        categories = normalize_categories(categories)
+        if categories and len(categories) > 1:
+            return None
+        cell = (
+            categories[0] if categories else None,
+            normalize_language(language),
+        )
+        entry = self._cells.get(cell)
+        if entry is None:
+            return None
+        fetched_at, ingested_limit, news = entry
+        if time.monotonic() - fetched_at > self._max_age:
+            return None
+        if limit > ingested_limit:
+            return None
+        return news[:limit]
+
+
+class SnapshotNewsRepository(INewsRepository):
+    """News repository answering /news/top from the ingested snapshot."""
+
+    def __init__(self, repository: INewsRepository, snapshot: TopNewsSnapshot):
+        self._repository = repository
+        self._snapshot = snapshot
+
+    async def get_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        news = self._snapshot.get(limit, categories, language)
+        if news is not None:
+            return news
+        return await self._repository.get_top(limit, categories, language)
+
+    async def get_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        return await self._repository.get_all(
+            limit, search, categories, language
+        )
+
+    async def iter_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        news = self._snapshot.get(limit, categories, language)
+        if news is not None:
+            for item in news:
+                yield item
+            return
+        async for item in self._repository.iter_top(
+            limit, categories, language
+        ):
+            yield item
+
+    def iter_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        return self._repository.iter_all(limit, search, categories, language)
+
+    async def get_by_id(self, news_id: str) -> Optional[News]:
+        return await self._repository.get_by_id(news_id)
+
+    async def get_many(
+        self, news_ids: List[str], timeout: Optional[float] = None
+    ) -> List[NewsBatchItem]:
+        return await self._repository.get_many(news_ids, timeout)
+
+
+class NewsIngestionWorker:
+    """Periodically fetches top news for a matrix of categories/languages.
+
+    Requests are spaced so that at most `max_requests_per_hour` reach the
+    upstream API, whatever the size of the matrix.
+    """
+
+    def __init__(
+        self,
+        repository: INewsRepository,
+        snapshot: TopNewsSnapshot,
+        categories: List[str],
+        languages: List[str],
+        limit: int,
+        interval: float,
+        max_requests_per_hour: int,
+    ):
+        self._repository = repository
+        self._snapshot = snapshot
+        self._cells = list(itertools.product(categories, languages))
+        self._limit = limit
+        self._interval = interval
+        self._spacing = 3600 / max_requests_per_hour
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await self.ingest_once()
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(self._interval - elapsed, self._spacing))
+
+    async def ingest_once(self) -> None:
+        """Fetch every cell of the matrix once."""
+        for index, (category, language) in enumerate(self._cells):
+            if index:
+                await asyncio.sleep(self._spacing)
+            try:
+                news = await self._repository.get_top(
+                    self._limit,
+                    [category] if category else None,
+                    language or None,
+                )
+            except Exception as e:
+                self.errors += 1
+                logger.warning(
+                    "Ingesting top news (%r, %r) failed: %s",
+                    category,
+                    language,
+                    e,
+                )
+                continue
+            self._snapshot.update(category, language, self._limit, news)
+        self.runs += 1
@@ -1,20 +1,81 @@
-from typing import List, Optional, Union, Dict
+from typing import (
+    Any,
+    AsyncIterator,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    Dict,
+)
 
 import aiohttp
+import asyncio
+from collections import Counter, deque
+import json
+import logging
 import os
+import time
 from urllib.parse import quote
-from sqlalchemy import select, delete, insert
+from sqlalchemy import (
+    select,
+    delete,
+    exists,
+    insert,
+    any_,
+    bindparam,
+    cast,
+    func,
+    literal,
+    literal_column,
+    or_,
+    text,
+    true,
+    Float,
+    Integer,
+    String,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.exc import SQLAlchemyError
-from newsreader.core.domain import News, User, NewsPreview
+from newsreader.core.domain import (
+    FriendSuggestion,
+    News,
+    User,
+    NewsPreview,
+    NewsBatchItem,
+)
 from newsreader.db import (
     user_table,
     user_friends_table,
     user_favorites_table,
     read_later_table,
+    user_recommendations_table,
+    articles_table,
     database,
 )
-from newsreader.core.repository import IUserRepository, INewsRepository
+from newsreader.core.repository import (
+    IUserRepository,
+    INewsRepository,
+    IArticleRepository,
+)
+from newsreader.infrastructure.batch import fetch_many
+from newsreader.infrastructure.graph import FriendGraph
+from newsreader.infrastructure.resilience import (
+    UpstreamGuard,
+    UpstreamStatusError,
+)
+from newsreader.infrastructure.scoring import (
+    CandidateBatch,
+    CategoryAffinity,
+    RecommendationScorer,
+    TopK,
+)
 from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import from_json
+
+logger = logging.getLogger(__name__)
 
 
 class UserRepositoryMock(IUserRepository):
@@ -34,34 +95,162 @@ class UserRepositoryMock(IUserRepository):
         self.users_db[self.max_id] = user
         return self.max_id
 
-    async def delete_user(self, user_id: int) -> None:
-        self.users_db.pop(user_id)
+    async def delete_user(self, user_id: int) -> Set[int]:
+        return set(self.users_db.pop(user_id).friends)
 
-    async def update_user(self, user_id: int, user_data: User) -> None:
+    async def update_user(self, user_id: int, user_data: User) -> Set[int]:
         user_data.id = user_id
-        if self.users_db.get(user_id):
-            self.users_db[user_id] = user_data
+        user = self.users_db.get(user_id)
+        if user is None:
+            return set()
+        self.users_db[user_id] = user_data
+        return set(user.friends) ^ set(user_data.friends)
 
 
 async def _handle_api_response(response: aiohttp.ClientResponse):
     """Helper to handle API responses and errors"""
     try:
         response.raise_for_status()
-        return await response.json()
+        return from_json(await response.read())
+    except aiohttp.ClientResponseError as e:
+        # not the URL, it carries the api token
+        raise UpstreamStatusError(e.status, e.message)
     except aiohttp.ClientError as e:
         raise HTTPException(status_code=500, detail=f"Network error: {e}")
-    except HTTPException as e:
-        raise HTTPException(
-            status_code=response.status, detail=f"API Error: {e.detail}"
-        )  # Raise the already created HTTP Exception
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unknown error: {e}")
 
 
+_news_list_adapter = TypeAdapter(List[News])
+
+
 class NewsRepository(INewsRepository):
-    def __init__(self):
-        self._api_token = os.getenv("API_KEY")
-        self._base_url = "https://api.thenewsapi.com/v1/news/"
+    """News repository reading from thenewsapi.
+
+    Upstream caps the number of articles per response at `page_size`, so
+    larger limits are split into pages fetched `page_concurrency` at a time.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        base_url: str = "https://api.thenewsapi.com/v1/news/",
+        batch_concurrency: int = 10,
+        guard: Optional[UpstreamGuard] = None,
+        page_size: int = 25,
+        page_concurrency: int = 4,
+    ):
+        self._session = session
+        self._api_token = os.getenv("API_KEY", "")
+        self._base_url = base_url
+        self._batch_semaphore = asyncio.Semaphore(batch_concurrency)
+        self._guard = guard
+        self._page_size = page_size
+        self._page_concurrency = page_concurrency
+        self.parsed = 0
+        self.dropped = 0
+        self.parse_errors: Counter[str] = Counter()
+
+    def _parse_news_list(self, data: Any) -> List[News]:
+        """Validate the `data` array of a response in one pass.
+
+        Invalid items are dropped and their errors counted per field and
+        error type, e.g. "published_at:datetime_from_date_parsing".
+        """
+        items = data.get("data", [])
+        try:
+            news = _news_list_adapter.validate_python(items)
+        except ValidationError as e:
+            invalid = set()
+            for error in e.errors(include_url=False):
+                loc = error["loc"]
+                if not loc:  # `data` is not a list at all
+                    self.parse_errors[error["type"]] += 1
+                    return []
+                invalid.add(loc[0])
+                field = loc[1] if len(loc) > 1 else ""
+                self.parse_errors[f"{field}:{error['type']}"] += 1
+            self.dropped += len(invalid)
+            logger.warning("Dropped %d invalid news items", len(invalid))
+            news = _news_list_adapter.validate_python(
+                [item for i, item in enumerate(items) if i not in invalid]
+            )
+        self.parsed += len(news)
+        return news
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "parsed": self.parsed,
+            "dropped": self.dropped,
+            "errors": dict(self.parse_errors),
+        }
+
+    async def _request(
+        self, path: str, params: Dict[str, Union[str, int]]
+    ) -> Any:
+        """GET an upstream endpoint, through the guard if there is one."""
+
+        async def fetch() -> Any:
+            async with self._session.get(
+                f"{self._base_url}{path}",
+                params={"api_token": self._api_token, **params},
+            ) as response:
+                return await _handle_api_response(response)
+
+        if self._guard is None:
+            return await fetch()
+        return await self._guard.call(fetch)
+
+    async def _iter_pages(
+        self, path: str, params: Dict[str, Union[str, int]], limit: int
+    ) -> AsyncIterator[News]:
+        """Yield up to `limit` unique news from consecutive upstream pages.
+
+        Pages are requested concurrently but yielded in order. A page shorter
+        than `page_size` is the last one, later pages are then cancelled.
+        """
+        page_count = -(-limit // self._page_size)
+        if page_count <= 1:
+            for news in self._parse_news_list(
+                await self._request(path, {**params, "limit": limit})
+            ):
+                yield news
+            return
+
+        def fetch_page(page: int) -> asyncio.Task:
+            return asyncio.ensure_future(
+                self._request(
+                    path, {**params, "limit": self._page_size, "page": page}
+                )
+            )
+
+        pages = deque(
+            fetch_page(page)
+            for page in range(1, min(page_count, self._page_concurrency) + 1)
+        )
+        next_page = len(pages) + 1
+        seen: Set[str] = set()
+        try:
+            while pages and len(seen) < limit:
+                data = await pages.popleft()
+                news_list = self._parse_news_list(data)
+                for news in news_list:
+                    if news.uuid in seen:
+                        continue
+                    seen.add(news.uuid)
+                    yield news
+                    if len(seen) == limit:
+                        return
+                if len(data.get("data", [])) < self._page_size:
+                    return
+                if next_page <= page_count:
+                    pages.append(fetch_page(next_page))
+                    next_page += 1
+        finally:
+            for task in pages:
+                if task.done() and not task.cancelled():
+                    task.exception()  # retrieved, so it is not logged
+                task.cancel()
 
     async def get_top(
         self,
@@ -69,40 +258,44 @@ class NewsRepository(INewsRepository):
         categories: Optional[List[str]] = None,
         language: Optional[str] = None,
     ) -> List[News]:
-        params: Dict[str, Union[str, int]] = {
-            "api_token": self._api_token,
-            "limit": limit,
-        }
+        return [
+            news async for news in self.iter_top(limit, categories, language)
+        ]
+
+    async def get_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        return [
+            news
+            async for news in self.iter_all(limit, search, categories, language)
+        ]
+
+    def iter_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        params: Dict[str, Union[str, int]] = {}
         if categories:
             params["categories"] = ",".join(categories)
         if language:
             params["language"] = language
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{self._base_url}top", params=params
-            ) as response:
-                data = await _handle_api_response(response)
-                news_list = data.get("data", [])
-                validated_news = []
-                for news_data in news_list:
-                    try:
-                        validated_news.append(News.model_validate(news_data))
-                    except (KeyError, ValueError) as e:
-                        print(f"Error parsing news: {e}")
-                return validated_news
+        return self._iter_pages("top", params, limit)
 
-    async def get_all(
+    def iter_all(
         self,
         limit: int = 10,
         search: Optional[str] = None,
         categories: Optional[List[str]] = None,
         language: Optional[str] = None,
-    ) -> List[News]:
-        params: Dict[str, Union[str, int]] = {
-            "api_token": self._api_token,
-            "limit": limit,
-        }
+    ) -> AsyncIterator[News]:
+        params: Dict[str, Union[str, int]] = {}
         if search:
             params["search"] = quote(search)
         if categories:
@@ -110,75 +303,460 @@ class NewsRepository(INewsRepository):
         if language:
             params["language"] = language
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{self._base_url}all", params=params
-            ) as response:
-                data = await _handle_api_response(response)
-                news_list = data.get("data", [])
-                validated_news = []
-                for news_data in news_list:
-                    try:
-                        validated_news.append(News.model_validate(news_data))
-                    except (KeyError, ValueError) as e:
-                        print(f"Error parsing news: {e}")
-                return validated_news
+        return self._iter_pages("all", params, limit)
 
     async def get_by_id(self, news_id: str) -> Optional[News]:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                f"{self._base_url}/uuid/{news_id}",
-                params={"api_token": self._api_token},
-            ) as response:
-                data = await _handle_api_response(response)
-                if data:
-                    return News.model_validate(data)
-                else:
-                    return None
+        data = await self._request(f"uuid/{news_id}", {})
+        if data:
+            return News.model_validate(data)
+        else:
+            return None
+
+    async def get_many(
+        self, news_ids: List[str], timeout: Optional[float] = None
+    ) -> List[NewsBatchItem]:
+        return await fetch_many(
+            news_ids, self.get_by_id, self._batch_semaphore, timeout
+        )
+
+
+def _json_agg_lateral(column: Any, where: Any, name: str) -> Any:
+    """Build a LATERAL subquery aggregating `column` into a JSON array."""
+    return (
+        select(
+            func.coalesce(
+                func.json_agg(column), literal_column("'[]'::json")
+            ).label(name)
+        )
+        .where(where)
+        .lateral(name)
+    )
+
+
+def _news_preview_json(table: Any) -> Any:
+    """Build a JSON object matching NewsPreview from a favorites-like table."""
+    # keys are inlined, Postgres cannot infer types of json_build_object args
+    return func.json_build_object(
+        literal_column("'uuid'"),
+        table.c.news_id,
+        literal_column("'title'"),
+        table.c.title,
+    )
+
+
+_friends_agg = _json_agg_lateral(
+    user_friends_table.c.friend_id,
+    user_friends_table.c.user_id == user_table.c.id,
+    "friends",
+)
+_favorites_agg = _json_agg_lateral(
+    _news_preview_json(user_favorites_table),
+    user_favorites_table.c.user_id == user_table.c.id,
+    "favorites",
+)
+_read_later_agg = _json_agg_lateral(
+    _news_preview_json(read_later_table),
+    read_later_table.c.user_id == user_table.c.id,
+    "read_later",
+)
+
+# the whole User aggregate (with friends, favorites and read later) in one
+# round trip
+_user_aggregate_query = select(
+    user_table.c.id,
+    user_table.c.name,
+    _friends_agg.c.friends,
+    _favorites_agg.c.favorites,
+    _read_later_agg.c.read_later,
+).select_from(
+    user_table.join(_friends_agg, true())
+    .join(_favorites_agg, true())
+    .join(_read_later_agg, true())
+)
+
+# Hot queries are built once, with the user id as a named bind parameter.
+# This skips rebuilding the expression and its compiled-cache key on every
+# call, and the identical SQL is reused from asyncpg's prepared statements.
+_user_by_id_query = user_table.select().where(
+    user_table.c.id == bindparam("user_id")
+)
+_user_aggregate_by_id_query = _user_aggregate_query.where(
+    user_table.c.id == bindparam("user_id")
+)
+_friend_ids_query = select(user_friends_table.c.friend_id).where(
+    user_friends_table.c.user_id == bindparam("user_id")
+)
+_favorites_query = select(
+    user_favorites_table.c.news_id, user_favorites_table.c.title
+).where(user_favorites_table.c.user_id == bindparam("user_id"))
+_friend = user_friends_table.alias("friend")
+_friend_of_friend = user_friends_table.alias("friend_of_friend")
+_mutual_friends = func.count().label("mutual_friends")
+_suggested_friends_query = (
+    select(_friend_of_friend.c.friend_id, _mutual_friends)
+    .select_from(
+        _friend.join(
+            _friend_of_friend,
+            _friend_of_friend.c.user_id == _friend.c.friend_id,
+        )
+    )
+    .where(
+        _friend.c.user_id == bindparam("user_id"),
+        _friend_of_friend.c.friend_id != bindparam("user_id"),
+        ~exists().where(
+            user_friends_table.c.user_id == bindparam("user_id"),
+            user_friends_table.c.friend_id == _friend_of_friend.c.friend_id,
+        ),
+    )
+    .group_by(_friend_of_friend.c.friend_id)
+    .order_by(_mutual_friends.desc(), _friend_of_friend.c.friend_id)
+    .limit(bindparam("limit", type_=Integer))
+)
+_read_later_query = select(
+    read_later_table.c.news_id, read_later_table.c.title
+).where(read_later_table.c.user_id == bindparam("user_id"))
+
+_recommendations = user_recommendations_table
+# friends' favorites not yet in user's favorites or read later, most liked
+# first
+_recommended_query = (
+    select(_recommendations.c.news_id, _recommendations.c.title)
+    .where(_recommendations.c.user_id == bindparam("user_id"))
+    .where(
+        ~exists().where(
+            (user_favorites_table.c.user_id == bindparam("user_id"))
+            & (user_favorites_table.c.news_id == _recommendations.c.news_id)
+        )
+    )
+    .where(
+        ~exists().where(
+            (read_later_table.c.user_id == bindparam("user_id"))
+            & (read_later_table.c.news_id == _recommendations.c.news_id)
+        )
+    )
+    .order_by(_recommendations.c.score.desc(), _recommendations.c.news_id)
+)
+_recommended_page_query = _recommended_query.limit(
+    bindparam("limit", type_=Integer)
+).offset(bindparam("offset", type_=Integer))
+# columns scored by RecommendationScorer, NULL for articles not stored
+_recommendation_candidates_query = (
+    _recommended_query.add_columns(
+        _recommendations.c.score,
+        cast(func.extract("epoch", articles_table.c.published_at), Float).label(
+            "published_at"
+        ),
+        articles_table.c.relevance_score,
+        articles_table.c.categories,
+    )
+    .select_from(
+        _recommendations.outerjoin(
+            articles_table,
+            articles_table.c.uuid == _recommendations.c.news_id,
+        )
+    )
+    .limit(bindparam("limit", type_=Integer))
+)
+_favorite_categories_query = (
+    select(articles_table.c.categories)
+    .select_from(
+        user_favorites_table.join(
+            articles_table,
+            articles_table.c.uuid == user_favorites_table.c.news_id,
+        )
+    )
+    .where(user_favorites_table.c.user_id == bindparam("user_id"))
+)
+
+
+def _friend_favorites(where: Any = None) -> Any:
+    """Select (user_id, news_id, title) rows for favorites of user's friends.
+
+    Every row is worth one point of the news item's recommendation score.
+    """
+    query = select(
+        user_friends_table.c.user_id,
+        user_favorites_table.c.news_id,
+        user_favorites_table.c.title,
+    ).select_from(
+        user_friends_table.join(
+            user_favorites_table,
+            user_favorites_table.c.user_id == user_friends_table.c.friend_id,
+        )
+    )
+    if where is not None:
+        query = query.where(where)
+    return query
+
+
+def _add_recommendation_scores(contributions: Any, sign: int = 1) -> Any:
+    """Build an upsert adding `sign` points per row of `contributions`."""
+    rows = contributions.subquery()
+    grouped = select(
+        rows.c.user_id,
+        rows.c.news_id,
+        func.min(rows.c.title),
+        func.count() * sign,
+    ).group_by(rows.c.user_id, rows.c.news_id)
+    query = pg_insert(user_recommendations_table).from_select(
+        ["user_id", "news_id", "title", "score"], grouped
+    )
+    return query.on_conflict_do_update(
+        index_elements=[
+            user_recommendations_table.c.user_id,
+            user_recommendations_table.c.news_id,
+        ],
+        set_={
+            "score": user_recommendations_table.c.score + query.excluded.score
+        },
+    )
+
+
+def recommendation_rebuild_queries(
+    user_ids: Optional[List[int]] = None,
+) -> List[Any]:
+    """Build queries recomputing stored recommendations from scratch.
+
+    Args:
+        user_ids (Optional[List[int]]): Users to rebuild. Defaults to None,
+            which rebuilds recommendations of all users.
+
+    Returns:
+        List[Any]: Queries to execute in order, in one transaction.
+    """
+    # scores are read from these tables, so writes wait for the rebuild
+    lock_query = text("LOCK TABLE user_friends, user_favorites IN SHARE MODE")
+    delete_query = delete(user_recommendations_table)
+    if user_ids is None:
+        return [
+            lock_query,
+            delete_query,
+            _add_recommendation_scores(_friend_favorites()),
+        ]
+
+    ids = bindparam("user_ids", user_ids, type_=ARRAY(Integer), unique=True)
+    return [
+        lock_query,
+        delete_query.where(user_recommendations_table.c.user_id == any_(ids)),
+        _add_recommendation_scores(
+            _friend_favorites(user_friends_table.c.user_id == any_(ids))
+        ),
+    ]
+
+
+# first key of the advisory locks taken per user, see _lock_users
+_USER_LOCK_CLASS = 1
+
+
+def _lock_users_query(user_ids: Iterable[int]) -> Any:
+    """Take a transaction advisory lock per user, in ascending id order."""
+    ids = (
+        func.unnest(_array(sorted(set(user_ids)), Integer))
+        .table_valued("id")
+        .render_derived()
+    )
+    return select(
+        func.pg_advisory_xact_lock(_USER_LOCK_CLASS, ids.c.id)
+    ).select_from(ids)
+
+
+def _array(values: Iterable[Any], item_type: Any = String) -> Any:
+    """Bind values as a single Postgres array parameter, e.g. for = ANY."""
+    return bindparam(
+        "values", list(values), type_=ARRAY(item_type), unique=True
+    )
+
+
+def _friendships(user_id: int, outgoing: Set[int], incoming: Set[int]) -> Any:
+    """Match user->friend rows for `outgoing` and friend->user for `incoming`.
+
+    Returns None when both sets are empty.
+    """
+    clauses = []
+    if outgoing:
+        clauses.append(
+            (user_friends_table.c.user_id == user_id)
+            & (
+                user_friends_table.c.friend_id
+                == any_(_array(outgoing, Integer))
+            )
+        )
+    if incoming:
+        clauses.append(
+            (user_friends_table.c.friend_id == user_id)
+            & (user_friends_table.c.user_id == any_(_array(incoming, Integer)))
+        )
+    return or_(*clauses) if clauses else None
+
+
+def _is_friendship(user_id: int, friend_id: int) -> Any:
+    """Match both directions of a friendship between two users."""
+    return (
+        (user_friends_table.c.user_id == user_id)
+        & (user_friends_table.c.friend_id == friend_id)
+    ) | (
+        (user_friends_table.c.user_id == friend_id)
+        & (user_friends_table.c.friend_id == user_id)
+    )
+
+
+def _json_list(value: Any) -> List[Any]:
+    """Decode a JSON array column (drivers may return it as text)."""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value or []
 
 
 class UserRepositoryDB(IUserRepository):
-    async def get_all(self) -> List[User]:
-        query = user_table.select()
+    def __init__(
+        self,
+        aggregate_query: bool = True,
+        graph: Optional[FriendGraph] = None,
+        scorer: Optional[RecommendationScorer] = None,
+    ):
+        self._aggregate_query = aggregate_query
+        self._graph = graph
+        self._scorer = scorer
+
+    async def load_friend_graph(self) -> None:
+        """Load `user_friends` into the friend graph, if there is one."""
+        if self._graph is None:
+            return
+        query = (
+            select(user_friends_table.c.user_id, user_friends_table.c.friend_id)
+            .order_by(
+                user_friends_table.c.user_id, user_friends_table.c.friend_id
+            )
+            .execution_options(yield_per=10_000)
+        )
+        edges = (
+            (row["user_id"], row["friend_id"])
+            async for row in database.iterate(query)
+        )
+        await self._graph.load(edges)
+
+    def _loaded_graph(self) -> Optional[FriendGraph]:
+        if self._graph is not None and self._graph.loaded:
+            return self._graph
+        return None
+
+    async def get_all(
+        self, limit: Optional[int] = None, after: Optional[int] = None
+    ) -> List[User]:
+        query = user_table.select().order_by(user_table.c.id)
+        if after is not None:
+            query = query.where(user_table.c.id > after)
+        if limit is not None:
+            query = query.limit(limit)
         results = await database.fetch_all(query)
-        users = []
-        for row in results:
-            user = User.model_validate(row)
-            user.friends = await self.get_friend_ids(user.id)
-            user.favorites = await self.get_favorites(user.id)
-            user.read_later = await self.get_read_later(user.id)
-            users.append(user)
+        return await self._load_users(results)
+
+    async def iter_all(
+        self, batch_size: int = 100, after: Optional[int] = None
+    ) -> AsyncIterator[User]:
+        """Yield all users ordered by id, one keyset page at a time."""
+        while True:
+            users = await self.get_all(limit=batch_size, after=after)
+            for user in users:
+                yield user
+            if len(users) < batch_size:
+                return
+            after = users[-1].id
 
-        return users
+    async def _load_users(self, rows) -> List[User]:
+        """Assemble User aggregates for the given user rows.
+
+        Friends, favorites and read later items of all users are fetched
+        with one query each, so the number of queries does not depend on
+        the number of users.
+        """
+        users = {row["id"]: User.model_validate(row) for row in rows}
+        if not users:
+            return []
+        user_ids = bindparam(
+            "user_ids", list(users), type_=ARRAY(Integer), unique=True
+        )
+
+        friends_query = select(
+            user_friends_table.c.user_id, user_friends_table.c.friend_id
+        ).where(user_friends_table.c.user_id == any_(user_ids))
+        for row in await database.fetch_all(friends_query):
+            users[row["user_id"]].friends.append(row["friend_id"])
+
+        favorites_query = select(
+            user_favorites_table.c.user_id,
+            user_favorites_table.c.news_id,
+            user_favorites_table.c.title,
+        ).where(user_favorites_table.c.user_id == any_(user_ids))
+        for row in await database.fetch_all(favorites_query):
+            users[row["user_id"]].favorites.append(
+                NewsPreview(uuid=row["news_id"], title=row["title"])
+            )
+
+        read_later_query = select(
+            read_later_table.c.user_id,
+            read_later_table.c.news_id,
+            read_later_table.c.title,
+        ).where(read_later_table.c.user_id == any_(user_ids))
+        for row in await database.fetch_all(read_later_query):
+            users[row["user_id"]].read_later.append(
+                NewsPreview(uuid=row["news_id"], title=row["title"])
+            )
+
+        return list(users.values())
 
     async def get_by_id(self, user_id: int) -> User | None:
-        query = user_table.select().where(user_table.c.id == user_id)
-        result = await database.fetch_one(query)
+        if not self._aggregate_query:
+            return await self._get_by_id_concurrently(user_id)
+
+        result = await database.fetch_one(
+            _user_aggregate_by_id_query, {"user_id": user_id}
+        )
+        if result:
+            return User(
+                id=result["id"],
+                name=result["name"],
+                friends=_json_list(result["friends"]),
+                favorites=_json_list(result["favorites"]),
+                read_later=_json_list(result["read_later"]),
+            )
+        return None
+
+    async def _get_by_id_concurrently(self, user_id: int) -> User | None:
+        result, friends, favorites, read_later = await asyncio.gather(
+            database.fetch_one(_user_by_id_query, {"user_id": user_id}),
+            self.get_friend_ids(user_id),
+            self.get_favorites(user_id),
+            self.get_read_later(user_id),
+        )
         if result:
             user = User.model_validate(result)
-            user.friends = await self.get_friend_ids(user_id)
-            user.favorites = await self.get_favorites(user_id)
-            user.read_later = await self.get_read_later(user_id)
+            user.friends = friends
+            user.favorites = favorites
+            user.read_later = read_later
             return user
         return None
 
     async def get_friend_ids(self, user_id: int) -> List[int]:
-        query = select(user_friends_table.c.friend_id).where(
-            user_friends_table.c.user_id == user_id
+        results = await database.fetch_all(
+            _friend_ids_query, {"user_id": user_id}
         )
-        results = await database.fetch_all(query)
         return [row["friend_id"] for row in results] if results else []
 
     async def create_user(self, user: User) -> int:
-        query = user_table.insert().values(
-            **user.model_dump(
-                exclude={"id", "friends", "favorites", "read_later"}
+        query = (
+            user_table.insert()
+            .values(
+                **user.model_dump(
+                    exclude={"id", "friends", "favorites", "read_later"}
+                )
             )
+            .returning(user_table.c.id)
         )
         user_id = await database.execute(query)
         return user_id
 
-    async def delete_user(self, user_id: int) -> None:
+    async def delete_user(self, user_id: int) -> Set[int]:
         del_favorites_query = delete(user_favorites_table).where(
             user_favorites_table.c.user_id == user_id
         )
@@ -190,15 +768,40 @@ class UserRepositoryDB(IUserRepository):
             | (user_friends_table.c.friend_id == user_id)
         )
         del_user_query2 = delete(user_table).where(user_table.c.id == user_id)
+        del_recommendations_query = delete(user_recommendations_table).where(
+            user_recommendations_table.c.user_id == user_id
+        )
 
         async with database.transaction():
+            outgoing, incoming = await self._lock_friendships(user_id)
+            await self._update_recommendations(
+                user_friends_table.c.friend_id == user_id, sign=-1
+            )
+            await database.execute(del_recommendations_query)
             await database.execute(del_favorites_query)
             await database.execute(del_read_later_query)
             await database.execute(del_friend_query1)
             await database.execute(del_user_query2)
 
-    async def update_user(self, user_id: int, user_data: User) -> None:
+        graph = self._loaded_graph()
+        if graph:
+            graph.remove_user(user_id)
+        return outgoing | incoming
+
+    async def update_user(self, user_id: int, user_data: User) -> Set[int]:
+        """Update the user, writing only rows that actually changed."""
+        friend_ids = set(user_data.friends)
+        if user_id in friend_ids:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot add yourself as a friend.",
+            )
+
         async with database.transaction():
+            outgoing, incoming = await self._lock_friendships(
+                user_id, friend_ids
+            )
+
             # update the user name
             query = (
                 user_table.update()
@@ -207,85 +810,223 @@ class UserRepositoryDB(IUserRepository):
             )
             await database.execute(query)
 
-            # fetch all existing user id
-            existing_users = await database.fetch_all(select(user_table.c.id))
-            existing_user_ids = {row["id"] for row in existing_users}
-
             # validate friends
-            for friend_id in user_data.friends:
-                if friend_id not in existing_user_ids:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Friend with ID {friend_id} does not exist.",
-                    )
-                if friend_id == user_id:
+            if friend_ids:
+                existing_query = select(user_table.c.id).where(
+                    user_table.c.id == any_(_array(friend_ids, Integer))
+                )
+                existing_users = await database.fetch_all(existing_query)
+                missing_ids = friend_ids - {row["id"] for row in existing_users}
+                if missing_ids:
                     raise HTTPException(
                         status_code=400,
-                        detail="Cannot add yourself as a friend.",
+                        detail=f"Friend with ID {min(missing_ids)} "
+                        "does not exist.",
                     )
 
-            # delete existing friends
-            delete_friends_query = user_friends_table.delete().where(
-                (user_friends_table.c.user_id == user_id)
-                | (user_friends_table.c.friend_id == user_id)
+            await self._update_favorites(user_id, user_data.favorites)
+            await self._update_read_later(user_id, user_data.read_later)
+            await self._update_friendships(
+                user_id, friend_ids, outgoing, incoming
             )
-            await database.execute(delete_friends_query)
-
-            # insert new friends with bidirectional relationships
-            if user_data.friends:
-                insert_friends = []
-                for friend_id in user_data.friends:
-                    insert_friends.append(
-                        {"user_id": user_id, "friend_id": friend_id}
-                    )
-                    insert_friends.append(
-                        {"user_id": friend_id, "friend_id": user_id}
-                    )
-                await database.execute_many(
-                    user_friends_table.insert(), insert_friends
-                )
 
-            # delete existing favorites
-            delete_favorites_query = user_favorites_table.delete().where(
-                user_favorites_table.c.user_id == user_id
+        graph = self._loaded_graph()
+        if graph:
+            for friend_id in outgoing - friend_ids:
+                graph.remove_edge(user_id, friend_id)
+            for friend_id in incoming - friend_ids:
+                graph.remove_edge(friend_id, user_id)
+            for friend_id in friend_ids - outgoing:
+                graph.add_edge(user_id, friend_id)
+            for friend_id in friend_ids - incoming:
+                graph.add_edge(friend_id, user_id)
+        return (
+            (outgoing - friend_ids)
+            | (incoming - friend_ids)
+            | (friend_ids - outgoing)
+            | (friend_ids - incoming)
+        )
+
+    async def _update_favorites(
+        self, user_id: int, favorites: List[NewsPreview]
+    ) -> None:
+        removed, added, retitled = await self._diff_news_rows(
+            user_favorites_table, user_id, favorites
+        )
+
+        if removed:
+            # friends' scores are computed from the current favorites
+            removed_favorites = (user_friends_table.c.friend_id == user_id) & (
+                user_favorites_table.c.news_id == any_(_array(removed))
             )
-            await database.execute(delete_favorites_query)
-
-            # insert new favorites
-            if user_data.favorites:
-                insert_favorites = []
-                for favorite in user_data.favorites:
-                    insert_favorites.append(
-                        {
-                            "user_id": user_id,
-                            "news_id": favorite.uuid,
-                            "title": favorite.title,
-                        }
-                    )
-                await database.execute_many(
-                    user_favorites_table.insert(), insert_favorites
-                )
+            await self._update_recommendations(removed_favorites, sign=-1)
+            await self._delete_news_rows(user_favorites_table, user_id, removed)
+        if added or retitled:
+            await self._upsert_news_rows(
+                user_favorites_table, user_id, added + retitled
+            )
+        if added:
+            added_favorites = (user_friends_table.c.friend_id == user_id) & (
+                user_favorites_table.c.news_id
+                == any_(_array(news.uuid for news in added))
+            )
+            await self._update_recommendations(added_favorites)
+
+    async def _update_read_later(
+        self, user_id: int, read_later: List[NewsPreview]
+    ) -> None:
+        removed, added, retitled = await self._diff_news_rows(
+            read_later_table, user_id, read_later
+        )
 
-            # delete existing read later
-            delete_read_later_query = read_later_table.delete().where(
-                read_later_table.c.user_id == user_id
+        if removed:
+            await self._delete_news_rows(read_later_table, user_id, removed)
+        if added or retitled:
+            await self._upsert_news_rows(
+                read_later_table, user_id, added + retitled
             )
-            await database.execute(delete_read_later_query)
-
-            # insert new read later
-            if user_data.read_later:
-                insert_read_later = []
-                for read_later in user_data.read_later:
-                    insert_read_later.append(
-                        {
-                            "user_id": user_id,
-                            "news_id": read_later.uuid,
-                            "title": read_later.title,
-                        }
-                    )
-                await database.execute_many(
-                    read_later_table.insert(), insert_read_later
-                )
+
+    async def _update_friendships(
+        self,
+        user_id: int,
+        friend_ids: Set[int],
+        outgoing: Set[int],
+        incoming: Set[int],
+    ) -> None:
+        """Make friendships of the user exactly `friend_ids`, both ways.
+
+        `outgoing` and `incoming` are the user's current friends and users
+        having the user as a friend.
+        """
+        removed = _friendships(
+            user_id, outgoing - friend_ids, incoming - friend_ids
+        )
+        if removed is not None:
+            await self._update_recommendations(removed, sign=-1)
+            await database.execute(delete(user_friends_table).where(removed))
+
+        added_outgoing = friend_ids - outgoing
+        added_incoming = friend_ids - incoming
+        if added_outgoing or added_incoming:
+            rows = [
+                {"user_id": user_id, "friend_id": friend_id}
+                for friend_id in added_outgoing
+            ] + [
+                {"user_id": friend_id, "friend_id": user_id}
+                for friend_id in added_incoming
+            ]
+            await database.execute(
+                pg_insert(user_friends_table)
+                .values(rows)
+                .on_conflict_do_nothing()
+            )
+            added = _friendships(user_id, added_outgoing, added_incoming)
+            await self._update_recommendations(added)
+
+    async def _friendship_ids(self, user_id: int) -> Tuple[Set[int], Set[int]]:
+        """Return friends of the user and users having the user as a friend."""
+        query = select(
+            user_friends_table.c.user_id, user_friends_table.c.friend_id
+        ).where(
+            (user_friends_table.c.user_id == user_id)
+            | (user_friends_table.c.friend_id == user_id)
+        )
+        outgoing, incoming = set(), set()
+        for row in await database.fetch_all(query):
+            if row["user_id"] == user_id:
+                outgoing.add(row["friend_id"])
+            else:
+                incoming.add(row["user_id"])
+        return outgoing, incoming
+
+    async def _lock_users(self, user_ids: Iterable[int]) -> None:
+        """Serialize changes to recommendation scores involving the users.
+
+        Scores are counters updated from the friendships and favorites a
+        transaction sees. Under READ COMMITTED, a friend favoriting a news
+        while the friendship is added would otherwise be missed by both
+        transactions. Every change therefore locks the users whose
+        favorites or friendships it changes, until it commits.
+        """
+        await database.execute(_lock_users_query(user_ids))
+
+    async def _lock_friendships(
+        self, user_id: int, friend_ids: Iterable[int] = ()
+    ) -> Tuple[Set[int], Set[int]]:
+        """Lock the user, `friend_ids` and everyone in a friendship with them.
+
+        Returns:
+            Tuple[Set[int], Set[int]]: Friends of the user and users having
+                the user as a friend, read under the locks.
+        """
+        outgoing, incoming = await self._friendship_ids(user_id)
+        locked = {user_id, *friend_ids, *outgoing, *incoming}
+        await self._lock_users(locked)
+        # friendships changed while waiting for the user's lock
+        outgoing, incoming = await self._friendship_ids(user_id)
+        if not (outgoing | incoming) <= locked:
+            await self._lock_users((outgoing | incoming) - locked)
+        return outgoing, incoming
+
+    async def _diff_news_rows(
+        self, table: Any, user_id: int, news: List[NewsPreview]
+    ) -> Tuple[Set[str], List[NewsPreview], List[NewsPreview]]:
+        """Compare the user's rows of `table` with the wanted `news`.
+
+        Returns:
+            Tuple[Set[str], List[NewsPreview], List[NewsPreview]]: Ids of
+                rows to delete, news to insert and news whose stored title
+                differs.
+        """
+        query = select(table.c.news_id, table.c.title).where(
+            table.c.user_id == user_id
+        )
+        current = {
+            row["news_id"]: row["title"]
+            for row in await database.fetch_all(query)
+        }
+        wanted = {item.uuid: item for item in news}
+        removed = set(current) - set(wanted)
+        added, retitled = [], []
+        for news_id, item in wanted.items():
+            if news_id not in current:
+                added.append(item)
+            elif current[news_id] != item.title:
+                retitled.append(item)
+        return removed, added, retitled
+
+    async def _delete_news_rows(
+        self, table: Any, user_id: int, news_ids: Iterable[str]
+    ) -> None:
+        query = delete(table).where(
+            (table.c.user_id == user_id)
+            & (table.c.news_id == any_(_array(news_ids)))
+        )
+        await database.execute(query)
+
+    async def _upsert_news_rows(
+        self, table: Any, user_id: int, news: List[NewsPreview]
+    ) -> None:
+        # one statement for any number of rows: unnest arrays of values
+        rows = select(
+            literal(user_id, Integer),
+            func.unnest(
+                cast(_array(item.uuid for item in news), ARRAY(String))
+            ),
+            func.unnest(
+                cast(_array(item.title for item in news), ARRAY(String))
+            ),
+        )
+        query = pg_insert(table).from_select(
+            ["user_id", "news_id", "title"], rows
+        )
+        query = query.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.news_id],
+            set_={"title": query.excluded.title},
+            # rows of a concurrent insert are only rewritten if they differ
+            where=table.c.title.is_distinct_from(query.excluded.title),
+        )
+        await database.execute(query)
 
     async def get_friends(self, user_id: int) -> List[User]:
         friend_ids = await self.get_friend_ids(user_id)
@@ -304,11 +1045,20 @@ class UserRepositoryDB(IUserRepository):
             query1 = insert(user_friends_table).values(
                 user_id=user_id, friend_id=friend_id
             )
-            await database.execute(query1)
             query2 = insert(user_friends_table).values(
                 user_id=friend_id, friend_id=user_id
             )
-            await database.execute(query2)
+            async with database.transaction():
+                await self._lock_users([user_id, friend_id])
+                await database.execute(query1)
+                await database.execute(query2)
+                await self._update_recommendations(
+                    _is_friendship(user_id, friend_id)
+                )
+            graph = self._loaded_graph()
+            if graph:
+                graph.add_edge(user_id, friend_id)
+                graph.add_edge(friend_id, user_id)
         else:
             raise ValueError("User or friend not exist")
 
@@ -317,19 +1067,47 @@ class UserRepositoryDB(IUserRepository):
             (user_friends_table.c.user_id == user_id)
             & (user_friends_table.c.friend_id == friend_id)
         )
-        await database.execute(query1)
-
         query2 = delete(user_friends_table).where(
             (user_friends_table.c.user_id == friend_id)
             & (user_friends_table.c.friend_id == user_id)
         )
-        await database.execute(query2)
+        async with database.transaction():
+            await self._lock_users([user_id, friend_id])
+            await self._update_recommendations(
+                _is_friendship(user_id, friend_id), sign=-1
+            )
+            await database.execute(query1)
+            await database.execute(query2)
+
+        graph = self._loaded_graph()
+        if graph:
+            graph.remove_edge(user_id, friend_id)
+            graph.remove_edge(friend_id, user_id)
+
+    async def get_suggested_friends(
+        self, user_id: int, limit: int = 10
+    ) -> List[FriendSuggestion]:
+        """Rank friends of the user's friends by mutual friends."""
+        graph = self._loaded_graph()
+        if graph:
+            suggestions = graph.suggest(user_id, limit)
+        else:
+            suggestions = [
+                (row["friend_id"], row["mutual_friends"])
+                for row in await database.fetch_all(
+                    _suggested_friends_query,
+                    {"user_id": user_id, "limit": limit},
+                )
+            ]
+        return [
+            FriendSuggestion(user_id=candidate, mutual_friends=mutual)
+            for candidate, mutual in suggestions
+        ]
 
     async def get_favorites(self, user_id: int) -> List[NewsPreview]:
-        query = select(
-            user_favorites_table.c.news_id, user_favorites_table.c.title
-        ).where(user_favorites_table.c.user_id == user_id)
-        results = await database.fetch_all(query)
+        results = await database.fetch_all(
+            _favorites_query, {"user_id": user_id}
+        )
         return [
             NewsPreview(uuid=row["news_id"], title=row["title"])
             for row in results
@@ -341,32 +1119,114 @@ class UserRepositoryDB(IUserRepository):
         query = insert(user_favorites_table).values(
             user_id=user_id, news_id=news_id, title=title
         )
-        await database.execute(query)
+        async with database.transaction():
+            await self._lock_users([user_id])
+            await database.execute(query)
+            await self._update_recommendations(
+                (user_friends_table.c.friend_id == user_id)
+                & (user_favorites_table.c.news_id == news_id)
+            )
 
     async def delete_from_favorites(self, user_id: int, news_id: str) -> None:
         query = delete(user_favorites_table).where(
             (user_favorites_table.c.user_id == user_id)
             & (user_favorites_table.c.news_id == news_id)
         )
-        await database.execute(query)
+        async with database.transaction():
+            await self._lock_users([user_id])
+            await self._update_recommendations(
+                (user_friends_table.c.friend_id == user_id)
+                & (user_favorites_table.c.news_id == news_id),
+                sign=-1,
+            )
+            await database.execute(query)
+
+    async def get_favorite_categories(
+        self, user_id: int, limit: int = 3
+    ) -> List[str]:
+        """Return the categories of most of the user's stored favorites."""
+        results = await database.fetch_all(
+            _favorite_categories_query, {"user_id": user_id}
+        )
+        counts: Counter[str] = Counter()
+        for row in results:
+            counts.update(row["categories"])
+        return [category for category, _ in counts.most_common(limit)]
+
+    async def get_recommended_news(
+        self, user_id: int, limit: int = 20, offset: int = 0
+    ) -> List[NewsPreview]:
+        """Return friends' favorites ranked by how many friends liked them.
+
+        With a scorer, they are ranked by its score instead, which also
+        weighs how well their categories match the user's favorites, how
+        recent and how relevant they are. News already in the user's
+        favorites or read later are skipped.
+        """
+        if self._scorer is None:
+            results = await database.fetch_all(
+                _recommended_page_query,
+                {"user_id": user_id, "limit": limit, "offset": offset},
+            )
+            return [
+                NewsPreview(uuid=row["news_id"], title=row["title"])
+                for row in results
+            ]
+
+        favorites = await database.fetch_all(
+            _favorite_categories_query, {"user_id": user_id}
+        )
+        affinity = CategoryAffinity(row["categories"] for row in favorites)
+        top = TopK(offset + limit)
+        now = time.time()
+        async for batch in self._candidate_batches(user_id, self._scorer):
+            top.push(batch, self._scorer.score(batch, affinity, now))
+        return [
+            NewsPreview(uuid=news_id, title=title)
+            for news_id, title in top.result()[offset:]
+        ]
+
+    async def _candidate_batches(
+        self, user_id: int, scorer: RecommendationScorer
+    ) -> AsyncIterator[CandidateBatch]:
+        rows = []
+        async for row in database.iterate(
+            _recommendation_candidates_query,
+            {"user_id": user_id, "limit": scorer.max_candidates},
+        ):
+            rows.append(row)
+            if len(rows) == scorer.batch_size:
+                yield CandidateBatch.from_rows(rows)
+                rows = []
+        if rows:
+            yield CandidateBatch.from_rows(rows)
+
+    async def rebuild_recommendations(
+        self, user_ids: Optional[List[int]] = None
+    ) -> None:
+        async with database.transaction():
+            for query in recommendation_rebuild_queries(user_ids):
+                await database.execute(query)
 
-    async def get_recommended_news(self, user_id: int) -> List[NewsPreview]:
-        friends = await self.get_friends(user_id)
-        recommendations = []
-        seen_news_ids = set()
-        for friend in friends:
-            favorites = await self.get_favorites(friend.id)
-            for favorite in favorites:
-                if favorite.uuid not in seen_news_ids:
-                    recommendations.append(favorite)
-                    seen_news_ids.add(favorite.uuid)
-        return recommendations
+    async def _update_recommendations(self, where: Any, sign: int = 1) -> None:
+        """Add (or with sign=-1 remove) friend favorites matching `where`."""
+        contributions = _friend_favorites(where)
+        await database.execute(_add_recommendation_scores(contributions, sign))
+        if sign < 0:
+            affected = contributions.with_only_columns(
+                user_friends_table.c.user_id
+            )
+            await database.execute(
+                delete(user_recommendations_table).where(
+                    (user_recommendations_table.c.score <= 0)
+                    & user_recommendations_table.c.user_id.in_(affected)
+                )
+            )
 
     async def get_read_later(self, user_id: int) -> List[NewsPreview]:
-        query = select(
-            read_later_table.c.news_id, read_later_table.c.title
-        ).where(read_later_table.c.user_id == user_id)
-        results = await database.fetch_all(query)
+        results = await database.fetch_all(
+            _read_later_query, {"user_id": user_id}
+        )
         return [
             NewsPreview(uuid=row["news_id"], title=row["title"])
             for row in results
@@ -386,3 +1246,75 @@ class UserRepositoryDB(IUserRepository):
             & (read_later_table.c.news_id == news_id)
         )
         await database.execute(query)
+
+
+# every column but the generated full-text search vector
+_article_columns = [
+    column for column in articles_table.c if column.name != "search_vector"
+]
+
+
+class ArticleRepositoryDB(IArticleRepository):
+    async def get_by_id(self, news_id: str) -> Optional[News]:
+        query = select(*_article_columns).where(
+            articles_table.c.uuid == news_id
+        )
+        result = await database.fetch_one(query)
+        return News.model_validate(result) if result else None
+
+    async def get_many(self, news_ids: List[str]) -> List[News]:
+        if not news_ids:
+            return []
+        query = select(*_article_columns).where(
+            articles_table.c.uuid == any_(_array(news_ids))
+        )
+        results = await database.fetch_all(query)
+        return [News.model_validate(result) for result in results]
+
+    async def save_many(self, news: List[News]) -> None:
+        if not news:
+            return
+        # articles are immutable, keep whichever copy was stored first
+        query = (
+            pg_insert(articles_table)
+            .values([item.model_dump() for item in news])
+            .on_conflict_do_nothing()
+        )
+        await database.execute(query)
+
+    async def search(
+        self,
+        search: str,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        """Full-text search over stored articles, best matches first.
+
+        The relevance score of returned news is their ts_rank_cd rank.
+        """
+        tsquery = func.websearch_to_tsquery(
+            literal_column("'simple'::regconfig"), search
+        )
+        rank = func.ts_rank_cd(articles_table.c.search_vector, tsquery)
+        columns = [
+            column
+            for column in _article_columns
+            if column.name != "relevance_score"
+        ]
+        query = (
+            select(*columns, rank.label("relevance_score"))
+            .where(articles_table.c.search_vector.op("@@")(tsquery))
+            .order_by(rank.desc(), articles_table.c.published_at.desc())
+            .limit(limit)
+        )
+        if categories:
+            query = query.where(
+                articles_table.c.categories.overlap(
+                    cast(_array(categories), ARRAY(String))
+                )
+            )
+        if language:
+            query = query.where(articles_table.c.language == language)
+        results = await database.fetch_all(query)
+        return [News.model_validate(result) for result in results]
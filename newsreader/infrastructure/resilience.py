@@ -0,0 +1,242 @@
+"""A module providing rate limiting, retries and circuit breaking for
+upstream API calls."""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, TypeVar, Union
+
+import aiohttp
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised instead of calling upstream when it is known to be failing.
+
+    `retry_after` is the number of seconds after which a call may go
+    through again.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamStatusError(HTTPException):
+    """Upstream answered with an error status.
+
+    Clients get 404 when upstream has no such news and 502 otherwise: an
+    upstream 401 or 402 means our credentials or quota are at fault, not
+    the client's request, so its status is never passed through.
+    """
+
+    def __init__(self, upstream_status: int, message: str):
+        super().__init__(
+            status_code=404 if upstream_status == 404 else 502,
+            detail=f"API Error: {upstream_status} {message}",
+        )
+        self.upstream_status = upstream_status
+
+
+# upstream refuses our credentials or quota: retrying will not help, but
+# calling upstream again before the breaker's timeout will not either
+_REFUSED_STATUSES = {401, 402, 403}
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by all upstream requests."""
+
+    def __init__(self, rate: float, capacity: int):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, max_wait: float) -> None:
+        """Take one token, waiting for it at most `max_wait` seconds.
+
+        Raises:
+            UpstreamUnavailableError: No token became available in time.
+        """
+        deadline = time.monotonic() + max_wait
+        # waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity,
+                    self._tokens + (now - self._updated_at) * self._rate,
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+                if now + wait > deadline:
+                    raise UpstreamUnavailableError(
+                        "Upstream rate limit reached", retry_after=wait
+                    )
+                await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """Stops calling upstream after `failure_threshold` failures in a row.
+
+    Once open, calls fail fast for `reset_timeout` seconds, then a single
+    probe call is let through: its success closes the circuit again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self._reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if (
+            self.state == self.HALF_OPEN
+            or self._failures >= self._failure_threshold
+        ):
+            if self.state != self.OPEN:
+                logger.warning("Upstream circuit opened")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def record_cancelled(self) -> None:
+        # let another call probe if the probing one went away
+        self._probing = False
+
+    def retry_after(self) -> float:
+        """Seconds until a call may be let through again."""
+        if self.state == self.OPEN:
+            elapsed = time.monotonic() - self._opened_at
+            return max(self._reset_timeout - elapsed, 0.0)
+        # half open, waiting for the probe
+        return 1.0
+
+
+def _is_retriable(error: Exception) -> bool:
+    """Whether an error means upstream failed, not that the request did."""
+    if isinstance(error, UpstreamStatusError):
+        status = error.upstream_status
+        return status == 429 or status >= 500
+    if isinstance(error, HTTPException):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(
+        error, (aiohttp.ClientError, OSError, asyncio.TimeoutError)
+    )
+
+
+class UpstreamGuard:
+    """Runs upstream calls through a rate limiter, retries and a breaker.
+
+    Only idempotent calls (GETs) should go through the guard, as failed
+    calls are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        breaker: CircuitBreaker,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        max_wait: float,
+    ):
+        self._limiter = limiter
+        self._breaker = breaker
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._max_wait = max_wait
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self._max_retries + 1):
+            if not self._breaker.allow():
+                self.rejected += 1
+                raise UpstreamUnavailableError(
+                    "Upstream circuit is open",
+                    retry_after=self._breaker.retry_after(),
+                )
+            try:
+                await self._limiter.acquire(self._max_wait)
+                self.calls += 1
+                result = await fn()
+            except asyncio.CancelledError:
+                self._breaker.record_cancelled()
+                raise
+            except UpstreamUnavailableError:
+                self.rejected += 1
+                self._breaker.record_cancelled()
+                raise
+            except Exception as e:
+                if (
+                    isinstance(e, UpstreamStatusError)
+                    and e.upstream_status in _REFUSED_STATUSES
+                ):
+                    self.failures += 1
+                    self._breaker.record_failure()
+                    raise
+                if not _is_retriable(e):
+                    # upstream answered, the request itself was wrong
+                    self._breaker.record_success()
+                    raise
+                self.failures += 1
+                self._breaker.record_failure()
+                if attempt == self._max_retries:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+            else:
+                self._breaker.record_success()
+                return result
+        raise AssertionError("unreachable")
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(
+            0, min(self._backoff_max, self._backoff_base * 2**attempt)
+        )
+
+    def stats(self) -> Dict[str, Union[int, str]]:
+        return {
+            "state": self._breaker.state,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
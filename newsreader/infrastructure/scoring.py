@@ -0,0 +1,186 @@
+"""A module providing vectorized scoring of recommended news."""
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+
+class CategoryAffinity:
+    """The share of a user's favorites in each of their categories.
+
+    Only categories of the user's favorites are indexed: any other category
+    of a candidate adds nothing to its affinity.
+    """
+
+    def __init__(self, favorite_categories: Iterable[Sequence[str]]):
+        counts: Counter[str] = Counter()
+        favorites = 0
+        for categories in favorite_categories:
+            favorites += 1
+            counts.update(set(categories))
+        self.index = {category: i for i, category in enumerate(counts)}
+        self.vector = np.fromiter(
+            counts.values(), dtype=np.float64, count=len(counts)
+        ) / max(favorites, 1)
+
+    def encode(
+        self, categories: Sequence[Sequence[str]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode candidates' categories as sparse (row, category) pairs."""
+        index = self.index
+        rows = [
+            row
+            for row, names in enumerate(categories)
+            for name in names
+            if name in index
+        ]
+        columns = [
+            index[name]
+            for names in categories
+            for name in names
+            if name in index
+        ]
+        return (
+            np.array(rows, dtype=np.intp),
+            np.array(columns, dtype=np.intp),
+        )
+
+    def score(
+        self, rows: np.ndarray, columns: np.ndarray, size: int
+    ) -> np.ndarray:
+        """Sum the shares of each candidate's categories, capped at 1."""
+        affinity = np.bincount(
+            rows, weights=self.vector[columns], minlength=size
+        )
+        return np.minimum(affinity, 1.0)
+
+
+@dataclass
+class CandidateBatch:
+    """Columns of a batch of recommendation candidates.
+
+    `published_at` holds UNIX timestamps and, like `relevance`, NaN where
+    the article is not stored or the value is missing.
+    """
+
+    news_ids: List[str]
+    titles: List[str]
+    friends: np.ndarray
+    published_at: np.ndarray
+    relevance: np.ndarray
+    categories: Sequence[Sequence[str]]
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Mapping[Any, Any]]) -> "CandidateBatch":
+        """Build a batch from rows of the recommendation candidates query."""
+        return cls(
+            news_ids=[row["news_id"] for row in rows],
+            titles=[row["title"] for row in rows],
+            friends=np.fromiter(
+                (row["score"] for row in rows), dtype=np.int64, count=len(rows)
+            ),
+            # None becomes NaN
+            published_at=np.array(
+                [row["published_at"] for row in rows], dtype=np.float64
+            ),
+            relevance=np.array(
+                [row["relevance_score"] for row in rows], dtype=np.float64
+            ),
+            categories=[row["categories"] or () for row in rows],
+        )
+
+    def __len__(self) -> int:
+        return len(self.news_ids)
+
+
+class RecommendationScorer:
+    """Scores candidates by friend overlap, affinity, recency and relevance.
+
+    Each signal is mapped to [0, 1] before weighting, so weights compare
+    directly: friend counts and relevance saturate as x / (x + 1) and
+    recency halves every `half_life` seconds since publication. Only the
+    `max_candidates` most liked candidates are scored, `batch_size` at a
+    time.
+    """
+
+    def __init__(
+        self,
+        friends_weight: float,
+        affinity_weight: float,
+        recency_weight: float,
+        relevance_weight: float,
+        half_life: float,
+        max_candidates: int,
+        batch_size: int,
+    ):
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self._friends_weight = friends_weight
+        self._affinity_weight = affinity_weight
+        self._recency_weight = recency_weight
+        self._relevance_weight = relevance_weight
+        self._decay = np.log(2) / half_life
+
+    def score(
+        self, batch: CandidateBatch, affinity: CategoryAffinity, now: float
+    ) -> np.ndarray:
+        size = len(batch)
+        friends = batch.friends.astype(np.float64)
+        scores = self._friends_weight * friends / (friends + 1)
+
+        rows, columns = affinity.encode(batch.categories)
+        scores += self._affinity_weight * affinity.score(rows, columns, size)
+
+        age = np.maximum(now - batch.published_at, 0)
+        recency = np.exp(-self._decay * age)
+        scores += self._recency_weight * np.nan_to_num(recency)
+
+        relevance = np.nan_to_num(np.maximum(batch.relevance, 0))
+        scores += self._relevance_weight * relevance / (relevance + 1)
+        return scores
+
+
+class TopK:
+    """Keeps the `k` best scored candidates over a stream of batches.
+
+    Candidates are ranked by score, then by id, so the kept ones are the
+    first `k` of the full ranking even when scores tie across the k-th
+    place, and pages cut from results for growing `k` do not overlap.
+    """
+
+    def __init__(self, k: int):
+        self._k = k
+        self._scores: np.ndarray = np.empty(0, dtype=np.float64)
+        self._items: List[Tuple[str, str]] = []
+
+    def push(self, batch: CandidateBatch, scores: np.ndarray) -> None:
+        keep = self._best(scores, batch.news_ids)
+        self._scores = np.concatenate((self._scores, scores[keep]))
+        self._items.extend((batch.news_ids[i], batch.titles[i]) for i in keep)
+        if len(self._items) > self._k:
+            keep = self._best(
+                self._scores, [news_id for news_id, _ in self._items]
+            )
+            self._scores = self._scores[keep]
+            self._items = [self._items[i] for i in keep]
+
+    def result(self) -> List[Tuple[str, str]]:
+        """Return (news_id, title) pairs, best score first, then by id."""
+        scores = self._scores.tolist()
+        order = sorted(
+            range(len(scores)), key=lambda i: (-scores[i], self._items[i][0])
+        )
+        return [self._items[i] for i in order]
+
+    def _best(self, scores: np.ndarray, ids: Sequence[str]) -> List[int]:
+        if len(scores) <= self._k:
+            return list(range(len(scores)))
+        kth = np.partition(scores, len(scores) - self._k)[-self._k]
+        better = np.flatnonzero(scores > kth).tolist()
+        # of the candidates tied with the k-th, keep the smallest ids
+        tied = sorted(
+            np.flatnonzero(scores == kth).tolist(), key=ids.__getitem__
+        )
+        return better + tied[: self._k - len(better)]
@@ -1,10 +1,30 @@
-from typing import List, Optional
-from newsreader.core.domain import User, News, NewsPreview
+import asyncio
+import logging
+from itertools import zip_longest
+from typing import AsyncIterator, List, Optional, Sequence, Set, Tuple, Union
+from newsreader.core.domain import (
+    FriendSuggestion,
+    User,
+    News,
+    NewsPreview,
+    NewsBatchItem,
+)
 from newsreader.core.repository import IUserRepository, INewsRepository
-from newsreader.core.service import IUserService, INewsService
+from newsreader.core.service import IUserService, INewsService, IFeedService
+from newsreader.infrastructure.cache import (
+    FeedCache,
+    FeedExpiredError,
+    FeedItem,
+    make_feed_cursor,
+    parse_feed_cursor,
+)
+from newsreader.infrastructure.resilience import UpstreamUnavailableError
+from newsreader.infrastructure.singleflight import SingleFlight
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
 
+logger = logging.getLogger(__name__)
+
 
 def _handle_db_error(func):
     """Helper to handle database errors"""
@@ -21,12 +41,34 @@ def _handle_db_error(func):
 class UserService(IUserService):
     _repository: IUserRepository
 
-    def __init__(self, repository: IUserRepository):
+    def __init__(
+        self,
+        repository: IUserRepository,
+        feed_cache: Optional[FeedCache] = None,
+    ):
         self._repository = repository
+        self._feed_cache = feed_cache
+
+    def _invalidate_feeds(self, *user_ids: int) -> None:
+        """Drop cached feeds built from lists that just changed.
+
+        Only the users whose own lists changed are invalidated: changes to
+        friends' favorites reach a feed when it expires.
+        """
+        if self._feed_cache is not None:
+            for user_id in user_ids:
+                self._feed_cache.invalidate(user_id)
 
     @_handle_db_error
-    async def get_all_users(self) -> List[User]:
-        return await self._repository.get_all()
+    async def get_all_users(
+        self, limit: Optional[int] = None, after: Optional[int] = None
+    ) -> List[User]:
+        return await self._repository.get_all(limit=limit, after=after)
+
+    def iter_all_users(
+        self, batch_size: int = 100, after: Optional[int] = None
+    ) -> AsyncIterator[User]:
+        return self._repository.iter_all(batch_size=batch_size, after=after)
 
     @_handle_db_error
     async def get_user_by_id(self, user_id: int) -> Optional[User]:
@@ -38,11 +80,16 @@ class UserService(IUserService):
 
     @_handle_db_error
     async def delete_user(self, user_id: int) -> None:
-        await self._repository.delete_user(user_id)
+        friend_ids = await self._repository.delete_user(user_id)
+        self._invalidate_feeds(user_id, *friend_ids)
 
     @_handle_db_error
     async def update_user(self, user_id: int, user_data: User) -> None:
-        await self._repository.update_user(user_id=user_id, user_data=user_data)
+        friend_ids = await self._repository.update_user(
+            user_id=user_id, user_data=user_data
+        )
+        # friendships are symmetric, so friend lists of others changed too
+        self._invalidate_feeds(user_id, *friend_ids)
 
     @_handle_db_error
     async def get_friends(self, user_id: int) -> List[User]:
@@ -50,11 +97,13 @@ class UserService(IUserService):
 
     @_handle_db_error
     async def add_friend(self, user_id: int, friend_id: int) -> None:
-        return await self._repository.add_friend(user_id, friend_id)
+        await self._repository.add_friend(user_id, friend_id)
+        self._invalidate_feeds(user_id, friend_id)
 
     @_handle_db_error
     async def delete_friend(self, user_id: int, friend_id: int) -> None:
-        return await self._repository.delete_friend(user_id, friend_id)
+        await self._repository.delete_friend(user_id, friend_id)
+        self._invalidate_feeds(user_id, friend_id)
 
     @_handle_db_error
     async def get_favorites(self, user_id: int) -> List[NewsPreview]:
@@ -65,14 +114,28 @@ class UserService(IUserService):
         self, user_id: int, news_id: str, title: str
     ) -> None:
         await self._repository.add_to_favorites(user_id, news_id, title)
+        self._invalidate_feeds(user_id)
 
     @_handle_db_error
     async def delete_from_favorites(self, user_id: int, news_id: str) -> None:
         await self._repository.delete_from_favorites(user_id, news_id)
+        self._invalidate_feeds(user_id)
+
+    @_handle_db_error
+    async def get_recommended_news(
+        self, user_id: int, limit: int = 20, offset: int = 0
+    ) -> List[NewsPreview]:
+        return await self._repository.get_recommended_news(
+            user_id, limit=limit, offset=offset
+        )
 
     @_handle_db_error
-    async def get_recommended_news(self, user_id: int) -> List[NewsPreview]:
-        return await self._repository.get_recommended_news(user_id)
+    async def get_suggested_friends(
+        self, user_id: int, limit: int = 10
+    ) -> List[FriendSuggestion]:
+        return await self._repository.get_suggested_friends(
+            user_id, limit=limit
+        )
 
     @_handle_db_error
     async def get_read_later(self, user_id: int) -> List[NewsPreview]:
@@ -83,10 +146,12 @@ class UserService(IUserService):
         self, user_id: int, news_id: str, title: str
     ) -> None:
         await self._repository.add_read_later(user_id, news_id, title)
+        self._invalidate_feeds(user_id)
 
     @_handle_db_error
     async def delete_read_later(self, user_id: int, news_id: str) -> None:
         await self._repository.delete_read_later(user_id, news_id)
+        self._invalidate_feeds(user_id)
 
 
 class NewsService(INewsService):
@@ -103,6 +168,8 @@ class NewsService(INewsService):
     ) -> List[News]:
         try:
             return await self._repository.get_top(limit, categories, language)
+        except (HTTPException, UpstreamUnavailableError):
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
@@ -117,8 +184,145 @@ class NewsService(INewsService):
             return await self._repository.get_all(
                 limit, search, categories, language
             )
+        except (HTTPException, UpstreamUnavailableError):
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
+    def iter_top_news(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        return self._repository.iter_top(limit, categories, language)
+
+    def iter_all_news(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        return self._repository.iter_all(limit, search, categories, language)
+
     async def get_news_by_id(self, news_id: str) -> Optional[News]:
         return await self._repository.get_by_id(news_id)
+
+    async def get_news_batch(
+        self, news_ids: List[str], timeout: Optional[float] = None
+    ) -> List[NewsBatchItem]:
+        return await self._repository.get_many(news_ids, timeout)
+
+    async def expand_previews(
+        self, previews: List[NewsPreview], timeout: Optional[float] = None
+    ) -> List[Union[News, NewsPreview]]:
+        """Replace previews with full news, keeping the ones not loaded.
+
+        Previews whose news failed to load within `timeout` seconds are
+        returned unchanged, so callers still get partial results.
+        """
+        items = await self._repository.get_many(
+            [preview.uuid for preview in previews], timeout
+        )
+        loaded = {item.id: item.news for item in items if item.news}
+        return [loaded.get(preview.uuid, preview) for preview in previews]
+
+
+class FeedService(IFeedService):
+    """Builds users' home feeds and pages through them by cursor.
+
+    A feed interleaves the user's recommendations with top news of the
+    categories they favorite most, without news already in their favorites
+    or read later. It is built once per user and cached, so paging through
+    it does not recompute anything.
+    """
+
+    def __init__(
+        self,
+        user_repository: IUserRepository,
+        news_repository: INewsRepository,
+        cache: FeedCache,
+        categories: int,
+        top_limit: int,
+        recommended_limit: int,
+    ):
+        self._user_repository = user_repository
+        self._news_repository = news_repository
+        self._cache = cache
+        self._categories = categories
+        self._top_limit = top_limit
+        self._recommended_limit = recommended_limit
+        self._flight = SingleFlight()
+
+    async def get_feed(
+        self, user_id: int, limit: int = 20, cursor: Optional[str] = None
+    ) -> Tuple[List[FeedItem], Optional[str]]:
+        """Return a page of the user's feed and the cursor of the next one.
+
+        Raises:
+            InvalidCursorError: The cursor is malformed.
+            FeedExpiredError: The feed the cursor points into expired.
+        """
+        if cursor is None:
+            offset = 0
+            current = self._cache.current(user_id)
+            if current is None:
+                current = await self._flight.do(
+                    ("feed", user_id), lambda: self._build(user_id)
+                )
+            version, feed = current
+        else:
+            version, offset = parse_feed_cursor(cursor)
+            cached = self._cache.get(user_id, version)
+            if cached is None:
+                raise FeedExpiredError("Feed expired, reload it without cursor")
+            feed = cached
+
+        next_cursor = None
+        if offset + limit < len(feed):
+            next_cursor = make_feed_cursor(version, offset + limit)
+        return feed[offset : offset + limit], next_cursor
+
+    async def _build(self, user_id: int) -> Tuple[int, List[FeedItem]]:
+        generation = self._cache.generation()
+        categories = await self._user_repository.get_favorite_categories(
+            user_id, self._categories
+        )
+        favorites = await self._user_repository.get_favorites(user_id)
+        read_later = await self._user_repository.get_read_later(user_id)
+        recommended = await self._user_repository.get_recommended_news(
+            user_id, limit=self._recommended_limit
+        )
+        # without favorite categories, fall back to top news of any category
+        targets: List[Optional[str]] = list(categories) or [None]
+        top_news = await asyncio.gather(
+            *(
+                self._news_repository.get_top(
+                    self._top_limit, [category] if category else None
+                )
+                for category in targets
+            ),
+            return_exceptions=True,
+        )
+        sources: List[Sequence[FeedItem]] = [recommended]
+        for category, news in zip(targets, top_news):
+            if isinstance(news, BaseException):
+                # serve the rest of the feed without this category
+                logger.warning(
+                    "Feed of user %s skips top news of %s: %s",
+                    user_id,
+                    category,
+                    news,
+                )
+                continue
+            sources.append(news)
+
+        seen: Set[str] = {news.uuid for news in favorites + read_later}
+        feed: List[FeedItem] = []
+        for items in zip_longest(*sources):
+            for item in items:
+                if item is not None and item.uuid not in seen:
+                    seen.add(item.uuid)
+                    feed.append(item)
+        return self._cache.set(user_id, feed, generation), feed
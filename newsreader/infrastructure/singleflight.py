@@ -0,0 +1,151 @@
+"""A module providing coalescing of identical in-flight upstream requests."""
+
+import asyncio
+from dataclasses import dataclass
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from newsreader.core.domain import News, NewsBatchItem
+from newsreader.core.repository import INewsRepository
+from newsreader.infrastructure.batch import fetch_many
+from newsreader.infrastructure.cache import (
+    CacheKey,
+    make_key,
+    normalize_categories,
+    normalize_language,
+)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key and shares its outcome with all callers.
+
+    The call runs in its own task, so a cancelled caller does not cancel it
+    for the others. It is cancelled only once every caller has gone away.
+    """
+
+    def __init__(self):
+        self._calls: Dict[CacheKey, _Call] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: CacheKey, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(task=asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.calls += 1
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # forget the call first, so that a caller arriving before
+                # the cancelled task finishes starts a new one
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: CacheKey, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class CoalescingNewsRepository(INewsRepository):
+    """News repository sharing one upstream request between equal queries."""
+
+    def __init__(
+        self, repository: INewsRepository, batch_concurrency: int = 10
+    ):
+        self._repository = repository
+        self._flight = SingleFlight()
+        self._batch_semaphore = asyncio.Semaphore(batch_concurrency)
+
+    async def get_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        categories = normalize_categories(categories)
+        language = normalize_language(language)
+        key = make_key(
+            "top", limit=limit, categories=categories, language=language
+        )
+        return await self._flight.do(
+            key,
+            lambda: self._repository.get_top(limit, categories, language),
+        )
+
+    async def get_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        categories = normalize_categories(categories)
+        language = normalize_language(language)
+        key = make_key(
+            "all",
+            limit=limit,
+            search=search,
+            categories=categories,
+            language=language,
+        )
+        return await self._flight.do(
+            key,
+            lambda: self._repository.get_all(
+                limit, search, categories, language
+            ),
+        )
+
+    def iter_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        # a stream cannot be shared between consumers, pass it through
+        return self._repository.iter_top(limit, categories, language)
+
+    def iter_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        return self._repository.iter_all(limit, search, categories, language)
+
+    async def get_by_id(self, news_id: str) -> Optional[News]:
+        return await self._flight.do(
+            make_key("uuid", news_id=news_id),
+            lambda: self._repository.get_by_id(news_id),
+        )
+
+    async def get_many(
+        self, news_ids: List[str], timeout: Optional[float] = None
+    ) -> List[NewsBatchItem]:
+        # fan out through get_by_id so batches share in-flight lookups too
+        return await fetch_many(
+            news_ids, self.get_by_id, self._batch_semaphore, timeout
+        )
@@ -0,0 +1,149 @@
+"""A module providing read-through access to the local article store."""
+
+import logging
+import time
+from typing import AsyncIterator, List, Optional
+
+from newsreader.core.domain import News, NewsBatchItem
+from newsreader.core.repository import IArticleRepository, INewsRepository
+from newsreader.infrastructure.batch import unique_ids
+
+logger = logging.getLogger(__name__)
+
+SAVE_BATCH_SIZE = 100
+
+
+class StoredNewsRepository(INewsRepository):
+    """News repository persisting every article it sees to a local store.
+
+    Articles are immutable, so `get_by_id` only goes upstream on a miss, and
+    searches are answered from the local full-text index whenever it has at
+    least `limit` matches.
+    """
+
+    def __init__(self, repository: INewsRepository, store: IArticleRepository):
+        self._repository = repository
+        self._store = store
+
+    async def get_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        news = await self._repository.get_top(limit, categories, language)
+        await self._save(news)
+        return news
+
+    async def get_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> List[News]:
+        if search:
+            local = await self._search(search, limit, categories, language)
+            if len(local) >= limit:
+                return local
+
+        news = await self._repository.get_all(
+            limit, search, categories, language
+        )
+        await self._save(news)
+        return news
+
+    async def iter_top(
+        self,
+        limit: int = 10,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        async for news in self._save_stream(
+            self._repository.iter_top(limit, categories, language)
+        ):
+            yield news
+
+    async def iter_all(
+        self,
+        limit: int = 10,
+        search: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        language: Optional[str] = None,
+    ) -> AsyncIterator[News]:
+        async for news in self._save_stream(
+            self._repository.iter_all(limit, search, categories, language)
+        ):
+            yield news
+
+    async def get_by_id(self, news_id: str) -> Optional[News]:
+        try:
+            stored = await self._store.get_by_id(news_id)
+        except Exception as e:
+            logger.warning("Reading article %s failed: %s", news_id, e)
+            stored = None
+        if stored:
+            return stored
+
+        news = await self._repository.get_by_id(news_id)
+        if news:
+            await self._save([news])
+        return news
+
+    async def get_many(
+        self, news_ids: List[str], timeout: Optional[float] = None
+    ) -> List[NewsBatchItem]:
+        started = time.monotonic()
+        news_ids = unique_ids(news_ids)
+        try:
+            stored = await self._store.get_many(news_ids)
+        except Exception as e:
+            logger.warning("Reading %d articles failed: %s", len(news_ids), e)
+            stored = []
+        items = {
+            news.uuid: NewsBatchItem(id=news.uuid, news=news) for news in stored
+        }
+
+        misses = [news_id for news_id in news_ids if news_id not in items]
+        if misses:
+            if timeout is not None:
+                timeout = max(timeout - (time.monotonic() - started), 0)
+            fetched = await self._repository.get_many(misses, timeout)
+            await self._save([item.news for item in fetched if item.news])
+            items.update((item.id, item) for item in fetched)
+        return [items[news_id] for news_id in news_ids]
+
+    async def _search(
+        self,
+        search: str,
+        limit: int,
+        categories: Optional[List[str]],
+        language: Optional[str],
+    ) -> List[News]:
+        """Search the local index, empty results mean "ask upstream"."""
+        try:
+            return await self._store.search(search, limit, categories, language)
+        except Exception as e:
+            logger.warning("Searching articles for %r failed: %s", search, e)
+            return []
+
+    async def _save_stream(
+        self, stream: AsyncIterator[News]
+    ) -> AsyncIterator[News]:
+        """Pass a stream through, saving its articles in batches."""
+        batch: List[News] = []
+        async for news in stream:
+            yield news
+            batch.append(news)
+            if len(batch) >= SAVE_BATCH_SIZE:
+                await self._save(batch)
+                batch = []
+        if batch:
+            await self._save(batch)
+
+    async def _save(self, news: List[News]) -> None:
+        # the store is an optimization, never fail a request because of it
+        try:
+            await self._store.save_many(news)
+        except Exception as e:
+            logger.warning("Saving %d articles failed: %s", len(news), e)
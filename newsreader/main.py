@@ -3,9 +3,12 @@ import os
 # print("API_KEY:", os.getenv("API_KEY"))
 
 from fastapi import FastAPI
-from newsreader.api.routers import user_router, news_router
+from newsreader.api.responses import FastJSONResponse
+from newsreader.api.routers import user_router, news_router, metrics_router
+from newsreader.config import config
 from newsreader.container import Container
-from newsreader.db import database, init_db
+from newsreader.db import database
+from newsreader.migrations import init_db
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
@@ -16,12 +19,24 @@ container.wire(modules=["newsreader.api.routers"])
 @asynccontextmanager
 async def lifespan(_: FastAPI) -> AsyncGenerator:
     """Lifespan function working on app startup."""
-    await init_db()
+    if config.MIGRATE_ON_STARTUP:
+        await init_db()
     await database.connect()
+    await container.init_resources()  # type: ignore[misc]
+    await container.user_repository().load_friend_graph()
+    if config.INGESTION_ENABLED:
+        worker = await container.news_ingestion_worker()  # type: ignore[misc]
+        worker.start()
     yield
+    if config.INGESTION_ENABLED:
+        await worker.stop()
+    await container.shutdown_resources()  # type: ignore[misc]
     await database.disconnect()
 
 
-app = FastAPI(debug=True, lifespan=lifespan)
+app = FastAPI(
+    debug=True, lifespan=lifespan, default_response_class=FastJSONResponse
+)
 app.include_router(user_router, prefix="/user")
 app.include_router(news_router, prefix="/news")
+app.include_router(metrics_router, prefix="/metrics")
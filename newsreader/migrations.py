@@ -0,0 +1,280 @@
+"""A module providing versioned schema migrations.
+
+Each migration runs once, in version order, and is recorded in the
+`schema_migrations` table. Migrations run while holding an advisory lock,
+so app instances starting together apply them once. Consecutive pending
+migrations run in a single transaction, so a failed one leaves the schema
+unchanged, except for `concurrent` migrations: their statements, e.g.
+CREATE INDEX CONCURRENTLY, run one by one outside of any transaction, so
+that they do not block writes to populated tables while the app deploys.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import Insert, func, insert, select, text
+from sqlalchemy.exc import DBAPIError, InterfaceError
+from sqlalchemy.ext.asyncio import AsyncConnection
+from asyncpg.exceptions import (  # type: ignore
+    CannotConnectNowError,
+    ConnectionDoesNotExistError,
+)
+
+from newsreader.db import database, schema_migrations_table
+
+logger = logging.getLogger(__name__)
+
+# arbitrary key of the advisory lock serializing migration runs
+_LOCK_KEY = 7_402_351
+
+
+_CONNECTION_ERRORS = (
+    OSError,
+    InterfaceError,
+    CannotConnectNowError,
+    ConnectionDoesNotExistError,
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    statements: List[str]
+    # run the statements outside of a transaction, they must be idempotent
+    concurrent: bool = False
+
+
+def _create_index_concurrently(name: str, definition: str) -> List[str]:
+    """Statements creating an index without blocking writes to its table.
+
+    A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind, which
+    IF NOT EXISTS would keep: it is dropped first, so a retry rebuilds it.
+    """
+    return [
+        f"""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT FROM pg_index JOIN pg_class ON pg_class.oid = indexrelid
+                WHERE relname = '{name}' AND NOT indisvalid
+            ) THEN
+                DROP INDEX {name};
+            END IF;
+        END
+        $$
+        """,
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}",
+    ]
+
+
+MIGRATIONS: List[Migration] = [
+    # the schema of init.sql, so databases created by it or by the former
+    # create_all are adopted as they are
+    Migration(
+        1,
+        "Create the initial schema",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                name VARCHAR(100) NOT NULL
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_friends (
+                user_id INTEGER REFERENCES users(id),
+                friend_id INTEGER REFERENCES users(id),
+                PRIMARY KEY (user_id, friend_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_favorites (
+                user_id INTEGER REFERENCES users(id),
+                news_id VARCHAR(255) NOT NULL,
+                title TEXT NOT NULL,
+                PRIMARY KEY (user_id, news_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_read_later (
+                user_id INTEGER REFERENCES users(id),
+                news_id VARCHAR(255) NOT NULL,
+                title TEXT NOT NULL,
+                PRIMARY KEY (user_id, news_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS user_recommendations (
+                user_id INTEGER REFERENCES users(id),
+                news_id VARCHAR NOT NULL,
+                title VARCHAR NOT NULL,
+                score INTEGER NOT NULL,
+                PRIMARY KEY (user_id, news_id)
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_user_recommendations_user_id_score
+                ON user_recommendations (user_id, score DESC, news_id)
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                uuid VARCHAR PRIMARY KEY,
+                title VARCHAR NOT NULL,
+                description VARCHAR NOT NULL,
+                keywords VARCHAR NOT NULL,
+                snippet VARCHAR NOT NULL,
+                url VARCHAR NOT NULL,
+                image_url VARCHAR NOT NULL,
+                language VARCHAR NOT NULL,
+                published_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                source VARCHAR NOT NULL,
+                categories VARCHAR[] NOT NULL,
+                relevance_score FLOAT,
+                search_vector TSVECTOR GENERATED ALWAYS AS (
+                    to_tsvector(
+                        'simple',
+                        title || ' ' || description || ' ' || keywords
+                        || ' ' || snippet
+                    )
+                ) STORED
+            )
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS ix_articles_search_vector
+                ON articles USING GIN (search_vector)
+            """,
+        ],
+    ),
+    Migration(
+        2,
+        "Index user_friends.friend_id and user_favorites.news_id",
+        [
+            # the friend_id half of friendship lookups, e.g. when deleting
+            # a user or updating recommendations of their friends
+            *_create_index_concurrently(
+                "ix_user_friends_friend_id", "user_friends (friend_id)"
+            ),
+            # who favorited a news item
+            *_create_index_concurrently(
+                "ix_user_favorites_news_id", "user_favorites (news_id)"
+            ),
+        ],
+        concurrent=True,
+    ),
+]
+
+
+async def applied_versions() -> List[int]:
+    """Return versions of the migrations already applied, in order."""
+    async with database.transaction():
+        await database.run_sync(
+            lambda conn: schema_migrations_table.create(conn, checkfirst=True)
+        )
+        rows = await database.fetch_all(
+            select(schema_migrations_table.c.version).order_by(
+                schema_migrations_table.c.version
+            )
+        )
+    return [row["version"] for row in rows]
+
+
+async def migrate(target: Optional[int] = None) -> List[Migration]:
+    """Apply pending migrations up to `target`, all when None.
+
+    Returns:
+        List[Migration]: The migrations applied by this call.
+    """
+    applied: List[Migration] = []
+    # a connection of its own holds the lock across transactions
+    async with database.engine.connect() as conn:
+        lock = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await lock.execute(select(func.pg_advisory_lock(_LOCK_KEY)))
+        try:
+            done = set(await applied_versions())
+            pending = [
+                migration
+                for migration in MIGRATIONS
+                if migration.version not in done
+                and (target is None or migration.version <= target)
+            ]
+            while pending:
+                batch = [pending.pop(0)]
+                if batch[0].concurrent:
+                    await _apply_concurrently(lock, batch[0])
+                else:
+                    while pending and not pending[0].concurrent:
+                        batch.append(pending.pop(0))
+                    async with database.transaction():
+                        for migration in batch:
+                            await _apply(migration)
+                applied.extend(batch)
+        finally:
+            await lock.execute(select(func.pg_advisory_unlock(_LOCK_KEY)))
+    return applied
+
+
+def _log_migration(migration: Migration) -> None:
+    logger.info(
+        "Applying migration %s: %s",
+        migration.version,
+        migration.description,
+    )
+
+
+def _record(migration: Migration) -> Insert:
+    return insert(schema_migrations_table).values(
+        version=migration.version,
+        description=migration.description,
+    )
+
+
+async def _apply(migration: Migration) -> None:
+    _log_migration(migration)
+    for statement in migration.statements:
+        await database.execute(text(statement))
+    await database.execute(_record(migration))
+
+
+async def _apply_concurrently(
+    conn: AsyncConnection, migration: Migration
+) -> None:
+    _log_migration(migration)
+    for statement in migration.statements:
+        await conn.execute(text(statement))
+    await conn.execute(_record(migration))
+
+
+async def init_db(retries: int = 5, delay: int = 5) -> None:
+    """Function initializing the DB by applying pending migrations.
+
+    Args:
+        retries (int, optional): Number of retries of connect to DB.
+            Defaults to 5.
+        delay (int, optional): Delay of connect do DB. Defaults to 5.
+    """
+    for attempt in range(retries):
+        try:
+            await migrate()
+            return
+        except Exception as e:
+            # a failing migration is not retried, nor reported as the DB
+            # being unreachable
+            if not _is_connection_error(e):
+                raise
+            print(f"Attempt {attempt + 1} failed: {e}")
+            await asyncio.sleep(delay)
+
+    raise ConnectionError("Could not connect to DB after several retries.")
+
+
+def _is_connection_error(error: Exception) -> bool:
+    if isinstance(error, DBAPIError) and not isinstance(error, InterfaceError):
+        # asyncpg errors raised while connecting come wrapped
+        cause = getattr(error.orig, "__cause__", None)
+        return error.connection_invalidated or isinstance(
+            cause, _CONNECTION_ERRORS
+        )
+    return isinstance(error, _CONNECTION_ERRORS)
@@ -0,0 +1,128 @@
+"""Fixtures shared by the tests.
+
+Tests using `db` run against a scratch database, TEST_DB_NAME
+(newsreader_test by default), created on the Postgres server of DB_HOST,
+DB_USER and DB_PASSWORD once per session and emptied before each test.
+They are skipped when the server cannot be reached.
+
+Tests using `news_api` talk to benchmarks.stub_api, a local stand-in for
+thenewsapi.
+"""
+
+import asyncio
+import os
+import re
+from typing import Any, AsyncIterator, Iterator, List
+
+import aiohttp
+import asyncpg  # type: ignore
+import pytest
+from aiohttp.test_utils import TestServer
+
+# before newsreader.db creates its engine from the config
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "newsreader_test")
+
+from sqlalchemy import event, text  # noqa: E402
+
+from benchmarks.stub_api import StubAPI  # noqa: E402
+from newsreader.config import config  # noqa: E402
+from newsreader.db import Database, database  # noqa: E402
+from newsreader.migrations import migrate  # noqa: E402
+
+_TABLES = [
+    "user_recommendations",
+    "user_read_later",
+    "user_favorites",
+    "user_friends",
+    "users",
+    "articles",
+]
+
+
+async def _create_database(name: str) -> None:
+    if not re.fullmatch(r"[a-z_][a-z0-9_]*", name):
+        raise ValueError(f"Invalid database name: {name!r}")
+    conn = await asyncpg.connect(
+        f"postgresql://{config.DB_USER}:{config.DB_PASSWORD}"
+        f"@{config.DB_HOST}/postgres",
+        timeout=5,
+    )
+    try:
+        await conn.execute(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)")
+        await conn.execute(f"CREATE DATABASE {name}")
+    finally:
+        await conn.close()
+    await migrate()
+    await database.disconnect()
+
+
+@pytest.fixture(scope="session")
+def _test_database() -> None:
+    try:
+        asyncio.run(_create_database(config.DB_NAME or ""))
+    except (OSError, asyncpg.PostgresError) as e:
+        pytest.skip(f"Postgres is not available: {e}")
+
+
+@pytest.fixture
+async def db(_test_database: None) -> AsyncIterator[Database]:
+    """The app's database, with all tables emptied."""
+    await database.execute(
+        text(f"TRUNCATE {', '.join(_TABLES)} RESTART IDENTITY CASCADE")
+    )
+    try:
+        yield database
+    finally:
+        # pooled connections belong to the event loop of this test
+        await database.disconnect()
+
+
+class QueryCounter:
+    """Record SQL statements sent to the database."""
+
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+
+    def __call__(self, conn: Any, cursor: Any, statement: str, *_: Any):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self) -> None:
+        self.statements.clear()
+
+
+@pytest.fixture
+def queries(db: Database) -> Iterator[QueryCounter]:
+    counter = QueryCounter()
+    event.listen(db.engine.sync_engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(db.engine.sync_engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("API_KEY", "test")
+
+
+@pytest.fixture
+async def news_api() -> AsyncIterator[StubAPI]:
+    """benchmarks.stub_api, recording requests, answering without latency."""
+    stub = StubAPI(record_requests=True)
+    server = TestServer(stub.app())
+    await server.start_server()
+    stub.url = str(server.make_url("/v1/news/"))
+    try:
+        yield stub
+    finally:
+        await server.close()
+
+
+@pytest.fixture
+async def http_session() -> AsyncIterator[aiohttp.ClientSession]:
+    async with aiohttp.ClientSession() as session:
+        yield session
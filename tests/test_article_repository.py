@@ -0,0 +1,121 @@
+from newsreader.core.domain import News
+from newsreader.infrastructure.repository import (
+    ArticleRepositoryDB,
+    NewsRepository,
+)
+from newsreader.infrastructure.store import StoredNewsRepository
+
+from benchmarks.stub_api import article
+
+
+def _news(number: int, title: str, category: str = "tech") -> News:
+    return News.model_validate({**article(number, category), "title": title})
+
+
+def _uuids(news):
+    return [item.uuid for item in news]
+
+
+async def test_saved_articles_keep_their_first_copy(db):
+    articles = ArticleRepositoryDB()
+    original = _news(1, "Original title")
+
+    await articles.save_many([original, _news(2, "Other")])
+    await articles.save_many([_news(1, "Changed title")])
+
+    assert await articles.get_by_id("u1") == original
+    assert sorted(_uuids(await articles.get_many(["u2", "u1", "u9"]))) == [
+        "u1",
+        "u2",
+    ]
+    assert await articles.get_many([]) == []
+
+
+async def test_search_uses_web_search_syntax(db):
+    articles = ArticleRepositoryDB()
+    await articles.save_many(
+        [
+            _news(1, "Rust compiler release"),
+            _news(2, "Python release notes"),
+            _news(3, "Python compiler internals, Python everywhere"),
+        ]
+    )
+
+    assert _uuids(await articles.search("python -compiler")) == ["u2"]
+    assert _uuids(await articles.search('"compiler release"')) == ["u1"]
+    assert sorted(_uuids(await articles.search("release OR internals"))) == [
+        "u1",
+        "u2",
+        "u3",
+    ]
+    # more matches rank first, the rank is the relevance score
+    found = await articles.search("python")
+    assert _uuids(found) == ["u3", "u2"]
+    assert found[0].relevance_score > found[1].relevance_score > 0
+
+
+async def test_search_filters_by_category_and_language(db):
+    articles = ArticleRepositoryDB()
+    await articles.save_many(
+        [
+            _news(1, "Election results", "politics"),
+            _news(2, "Election software", "tech"),
+            News.model_validate(
+                {
+                    **article(3, "politics"),
+                    "title": "Election",
+                    "language": "de",
+                }
+            ),
+        ]
+    )
+
+    assert _uuids(await articles.search("election", categories=["tech"])) == [
+        "u2"
+    ]
+    assert sorted(
+        _uuids(
+            await articles.search(
+                "election", categories=["politics", "sports"], language="en"
+            )
+        )
+    ) == ["u1"]
+    assert len(await articles.search("election", limit=1)) == 1
+
+
+async def test_stored_articles_are_not_fetched_again(
+    db, news_api, http_session
+):
+    repository = StoredNewsRepository(
+        NewsRepository(http_session, base_url=news_api.url),
+        ArticleRepositoryDB(),
+    )
+
+    first = await repository.get_by_id("u3")
+    assert await repository.get_by_id("u3") == first
+    items = await repository.get_many(["u1", "u3"])
+
+    assert [item.news.uuid for item in items if item.news] == ["u1", "u3"]
+    assert [path for _, path, _ in news_api.requests] == [
+        "/v1/news/uuid/u3",
+        "/v1/news/uuid/u1",
+    ]
+
+
+async def test_search_is_answered_locally_with_enough_matches(
+    db, news_api, http_session
+):
+    repository = StoredNewsRepository(
+        NewsRepository(http_session, base_url=news_api.url),
+        ArticleRepositoryDB(),
+    )
+    await repository.get_top(3)
+    assert len(news_api.requests) == 1
+
+    local = await repository.get_all(limit=3, search="synthetic")
+    assert sorted(_uuids(local)) == ["u0", "u1", "u2"]
+    assert len(news_api.requests) == 1
+
+    # fewer local matches than asked for, upstream is searched
+    await repository.get_all(limit=4, search="synthetic")
+    assert len(news_api.requests) == 2
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from newsreader.api import routers
+from newsreader.core.domain import News, NewsPreview
+from newsreader.infrastructure.batch import fetch_many
+from newsreader.infrastructure.repository import NewsRepository
+from newsreader.infrastructure.service import NewsService
+
+from benchmarks.stub_api import article
+
+
+class Upstream:
+    """Looks news up one by one, slowly or failing for the given ids."""
+
+    def __init__(self, slow=(), broken=(), concurrency: int = 2) -> None:
+        self.slow = set(slow)
+        self.broken = set(broken)
+        self.lookups: List[str] = []
+        self.running = 0
+        self.max_running = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def get_by_id(self, news_id: str) -> Optional[News]:
+        self.lookups.append(news_id)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(1 if news_id in self.slow else 0.01)
+        finally:
+            self.running -= 1
+        if news_id in self.broken:
+            raise RuntimeError(f"{news_id} failed")
+        return News.model_validate(article(int(news_id[1:])))
+
+    async def get_many(self, news_ids, timeout=None):
+        return await fetch_many(
+            news_ids, self.get_by_id, self._semaphore, timeout
+        )
+
+
+async def test_batch_looks_up_each_unique_id_once(news_api, http_session):
+    upstream = NewsRepository(http_session, base_url=news_api.url)
+
+    items = await upstream.get_many(["u1", "u2", "u1", "missing"])
+
+    assert [item.id for item in items] == ["u1", "u2", "missing"]
+    assert [item.news.uuid for item in items[:2] if item.news] == ["u1", "u2"]
+    assert items[2].news is None and "404" in (items[2].error or "")
+    # thenewsapi has no batch endpoint, one request per id
+    assert sorted(path for _, path, _ in news_api.requests) == [
+        "/v1/news/uuid/missing",
+        "/v1/news/uuid/u1",
+        "/v1/news/uuid/u2",
+    ]
+
+
+async def test_lookups_are_bounded_and_failures_kept_per_id():
+    upstream = Upstream(broken=["u3"])
+
+    items = await upstream.get_many([f"u{i}" for i in range(6)])
+
+    assert upstream.max_running == 2
+    assert [item.id for item in items] == [f"u{i}" for i in range(6)]
+    assert items[3].news is None and items[3].error == "u3 failed"
+    assert all(item.news for item in items if item.id != "u3")
+
+
+async def test_lookups_past_timeout_are_reported_timed_out():
+    upstream = Upstream(slow=["u1"])
+
+    items = await upstream.get_many(["u0", "u1"], timeout=0.2)
+
+    assert items[0].news is not None
+    assert (items[1].news, items[1].error) == (None, "Timed out")
+    # the slow lookup was cancelled, not left running
+    await asyncio.sleep(0)
+    assert upstream.running == 0
+
+
+class Favorites:
+    def __init__(self, previews: List[NewsPreview]) -> None:
+        self._previews = previews
+
+    async def get_favorites(self, user_id: int) -> List[NewsPreview]:
+        return self._previews
+
+
+async def test_expanded_favorites_keep_previews_not_loaded_in_budget():
+    previews = [NewsPreview(uuid=f"u{i}", title=f"Saved {i}") for i in range(3)]
+    service = NewsService(Upstream(slow=["u1"], broken=["u2"]))
+
+    started = time.monotonic()
+    expanded = await routers.get_favorites(
+        1,
+        expand="full",
+        budget_ms=200,
+        user_service=Favorites(previews),
+        news_service=service,
+    )
+
+    assert time.monotonic() - started < 0.5
+    assert isinstance(expanded[0], News) and expanded[0].uuid == "u0"
+    # the slow and the failed lookup are answered with their previews
+    assert expanded[1:] == previews[1:]
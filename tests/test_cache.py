@@ -0,0 +1,207 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from newsreader.core.domain import News, NewsPreview
+from newsreader.infrastructure import cache as cache_module
+from newsreader.infrastructure.cache import (
+    CachedNewsRepository,
+    FeedCache,
+    TTLCache,
+)
+
+from benchmarks.stub_api import article
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the monotonic clock of the cache module."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(
+        cache_module, "time", SimpleNamespace(monotonic=lambda: now.value)
+    )
+    return now
+
+
+def _sizeof(value) -> int:
+    return len(value)
+
+
+def test_ttl_cache_entry_goes_stale_then_expires(clock):
+    cache = TTLCache(max_entries=10, max_bytes=1000, sizeof=_sizeof)
+    cache.set(("k",), "value", ttl=10, stale_ttl=5, stale_if_error_ttl=20)
+
+    entry = cache.get(("k",), clock.value + 9)
+    assert entry is not None and entry.is_fresh(clock.value + 9)
+    entry = cache.get(("k",), clock.value + 10)
+    assert entry is not None and not entry.is_fresh(clock.value + 10)
+    assert entry.is_usable(clock.value + 14)
+    assert not entry.is_usable(clock.value + 15)
+    # kept only to be served if reloading fails
+    assert cache.get(("k",), clock.value + 34) is not None
+    assert cache.get(("k",), clock.value + 35) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_cache_evicts_least_recently_used_entries(clock):
+    cache = TTLCache(max_entries=2, max_bytes=1000, sizeof=_sizeof)
+    cache.set(("a",), "a", ttl=10, stale_ttl=0)
+    cache.set(("b",), "b", ttl=10, stale_ttl=0)
+    cache.get(("a",), clock.value)
+
+    cache.set(("c",), "c", ttl=10, stale_ttl=0)
+
+    assert cache.get(("b",), clock.value) is None
+    assert cache.get(("a",), clock.value) is not None
+    assert cache.get(("c",), clock.value) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_evicts_over_max_bytes(clock):
+    cache = TTLCache(max_entries=10, max_bytes=10, sizeof=_sizeof)
+    cache.set(("a",), "aaaa", ttl=10, stale_ttl=0)
+    cache.set(("b",), "bbbb", ttl=10, stale_ttl=0)
+    cache.set(("c",), "cccc", ttl=10, stale_ttl=0)
+    # larger than the whole cache, not stored at all
+    cache.set(("d",), "d" * 11, ttl=10, stale_ttl=0)
+
+    assert cache.get(("a",), clock.value) is None
+    assert cache.get(("d",), clock.value) is None
+    assert cache.stats()["bytes"] == 8
+
+
+class Upstream:
+    """Returns new news on every call, or fails when told to."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.fail = False
+
+    async def get_top(self, limit, categories, language):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("upstream failed")
+        return [News.model_validate(article(self.calls))]
+
+
+def _repository(upstream: Upstream) -> CachedNewsRepository:
+    return CachedNewsRepository(
+        upstream,
+        TTLCache(max_entries=10, max_bytes=1_000_000),
+        top_ttl=10,
+        all_ttl=10,
+        stale_ttl=5,
+        stale_if_error_ttl=60,
+    )
+
+
+def _uuids(news):
+    return [item.uuid for item in news]
+
+
+async def test_stale_news_are_served_while_refreshed_once(clock):
+    upstream = Upstream()
+    repository = _repository(upstream)
+    assert _uuids(await repository.get_top(1)) == ["u1"]
+
+    clock.value += 11
+    stale = await asyncio.gather(*(repository.get_top(1) for _ in range(3)))
+
+    assert [_uuids(news) for news in stale] == [["u1"]] * 3
+    await asyncio.sleep(0.01)
+    assert upstream.calls == 2
+    assert repository.stats()["refreshes"] == 1
+    assert _uuids(await repository.get_top(1)) == ["u2"]
+
+
+async def test_failed_refresh_keeps_serving_stale_news(clock):
+    upstream = Upstream()
+    repository = _repository(upstream)
+    await repository.get_top(1)
+
+    clock.value += 11
+    upstream.fail = True
+    assert _uuids(await repository.get_top(1)) == ["u1"]
+    await asyncio.sleep(0.01)
+
+    assert repository.stats()["refresh_errors"] == 1
+    assert _uuids(await repository.get_top(1)) == ["u1"]
+
+
+async def test_news_are_served_stale_only_if_reloading_fails(clock):
+    upstream = Upstream()
+    repository = _repository(upstream)
+    await repository.get_top(1)
+
+    # past stale_ttl, news are reloaded before answering
+    clock.value += 16
+    assert _uuids(await repository.get_top(1)) == ["u2"]
+
+    clock.value += 16
+    upstream.fail = True
+    assert _uuids(await repository.get_top(1)) == ["u2"]
+    assert repository.stats()["errors_served_stale"] == 1
+
+    # past stale_if_error_ttl, the error is raised
+    clock.value += 60
+    with pytest.raises(RuntimeError):
+        await repository.get_top(1)
+
+
+def _feed(name: str):
+    return [NewsPreview(uuid=name, title=name)]
+
+
+def test_feed_invalidated_while_built_does_not_become_current():
+    cache = FeedCache(max_entries=10, max_bytes=1_000_000, ttl=60)
+    generation = cache.generation()
+    cache.invalidate(1)
+
+    version = cache.set(1, _feed("outdated"), generation)
+
+    assert cache.current(1) is None
+    # clients paging through it keep getting it
+    assert cache.get(1, version) == _feed("outdated")
+    version = cache.set(1, _feed("fresh"), cache.generation())
+    assert cache.current(1) == (version, _feed("fresh"))
+
+
+def test_invalidating_another_user_keeps_feed_current():
+    cache = FeedCache(max_entries=10, max_bytes=1_000_000, ttl=60)
+    generation = cache.generation()
+    cache.invalidate(2)
+
+    version = cache.set(1, _feed("fresh"), generation)
+
+    assert cache.current(1) == (version, _feed("fresh"))
+
+
+def test_feed_cache_remembers_a_bounded_number_of_users():
+    cache = FeedCache(max_entries=10, max_bytes=1_000_000, ttl=60)
+
+    for user_id in range(1000):
+        cache.set(user_id, _feed(str(user_id)), cache.generation())
+        cache.invalidate(user_id)
+    for user_id in range(1000, 2000):
+        cache.set(user_id, _feed(str(user_id)), cache.generation())
+
+    stats = cache.stats()
+    assert stats["invalidated_users"] == 10
+    assert stats["current_feeds"] == 10
+
+
+def test_build_older_than_a_forgotten_invalidation_is_not_current():
+    cache = FeedCache(max_entries=2, max_bytes=1_000_000, ttl=60)
+    generation = cache.generation()
+    cache.invalidate(1)
+    # invalidations of other users push out the one of user 1
+    cache.invalidate(2)
+    cache.invalidate(3)
+
+    cache.set(1, _feed("outdated"), generation)
+
+    assert cache.current(1) is None
+    version = cache.set(1, _feed("fresh"), cache.generation())
+    assert cache.current(1) == (version, _feed("fresh"))
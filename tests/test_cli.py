@@ -0,0 +1,5 @@
+from newsreader.cli import _explain_hot_queries
+
+
+async def test_hot_queries_use_their_indexes(db):
+    assert await _explain_hot_queries() == {}
@@ -0,0 +1,103 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Tuple
+
+from newsreader.infrastructure.graph import FriendGraph
+
+FRIENDS = {0: [1, 2], 1: [0, 2, 3], 2: [0, 1], 3: [1]}
+
+
+async def _edges(
+    friends: Dict[int, List[int]],
+) -> AsyncIterator[Tuple[int, int]]:
+    for user_id, friend_ids in sorted(friends.items()):
+        for friend_id in friend_ids:
+            yield user_id, friend_id
+
+
+async def _graph(compact_threshold: int = 1000) -> FriendGraph:
+    graph = FriendGraph(compact_threshold)
+    await graph.load(_edges(FRIENDS))
+    return graph
+
+
+def _all_friends(graph: FriendGraph) -> Dict[int, List[int]]:
+    return {user_id: sorted(graph.friends(user_id)) for user_id in range(6)}
+
+
+def _change(graph: FriendGraph) -> None:
+    graph.add_edge(3, 4)
+    graph.add_edge(4, 3)
+    graph.remove_edge(1, 2)
+    graph.remove_edge(2, 1)
+
+
+async def test_compact_keeps_friends():
+    graph = await _graph()
+    _change(graph)
+    graph.remove_user(0)
+    expected = _all_friends(graph)
+
+    graph.compact()
+
+    assert _all_friends(graph) == expected
+    assert graph.stats()["pending_changes"] == 0
+    assert graph.stats()["edges"] == sum(map(len, expected.values()))
+
+
+async def test_compact_in_thread_replays_changes_made_meanwhile():
+    graph = await _graph()
+    _change(graph)
+
+    compaction = asyncio.create_task(graph.compact_in_thread())
+    await asyncio.sleep(0)
+    assert graph.stats()["compacting"] == 1
+    # the graph keeps being read and changed while the arrays are built
+    graph.add_edge(5, 0)
+    graph.remove_edge(3, 4)
+    graph.remove_user(2)
+    expected = _all_friends(graph)
+    await compaction
+
+    assert _all_friends(graph) == expected
+    assert graph.stats()["compacting"] == 0
+    assert graph.stats()["compactions"] == 1
+    assert graph.stats()["pending_changes"] == 3
+    graph.compact()
+    assert _all_friends(graph) == expected
+
+
+async def test_compact_in_thread_is_dropped_after_reload():
+    graph = await _graph()
+    _change(graph)
+
+    compaction = asyncio.create_task(graph.compact_in_thread())
+    await asyncio.sleep(0)
+    await graph.load(_edges({0: [5], 5: [0]}))
+    await compaction
+
+    assert _all_friends(graph) == {0: [5], 1: [], 2: [], 3: [], 4: [], 5: [0]}
+    assert graph.stats()["compactions"] == 0
+
+
+async def test_threshold_compacts_in_background():
+    graph = await _graph(compact_threshold=4)
+    _change(graph)
+    expected = _all_friends(graph)
+
+    # the change reaching the threshold does not rebuild the arrays itself
+    assert graph.stats()["compacting"] == 0
+    assert graph.stats()["compactions"] == 0
+    while graph.stats()["compactions"] == 0:
+        await asyncio.sleep(0.001)
+
+    assert _all_friends(graph) == expected
+    assert graph.stats()["pending_changes"] == 0
+
+
+def test_threshold_compacts_inline_without_event_loop():
+    graph = asyncio.run(_graph(compact_threshold=4))
+    _change(graph)
+
+    assert graph.stats()["compactions"] == 1
+    assert graph.stats()["pending_changes"] == 0
+    assert graph.friends(3) == [1, 4]
@@ -0,0 +1,197 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from newsreader.core.domain import News
+from newsreader.infrastructure import ingestion
+from newsreader.infrastructure.ingestion import (
+    NewsIngestionWorker,
+    SnapshotNewsRepository,
+    TopNewsSnapshot,
+)
+from newsreader.infrastructure.repository import NewsRepository
+
+from benchmarks.stub_api import article
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the monotonic clock of the ingestion module."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(
+        ingestion, "time", SimpleNamespace(monotonic=lambda: now.value)
+    )
+    return now
+
+
+def _news(count: int, category: str = "general"):
+    return [News.model_validate(article(i, category)) for i in range(count)]
+
+
+def test_snapshot_covers_queries_of_one_ingested_cell(clock):
+    snapshot = TopNewsSnapshot(max_age=60)
+    snapshot.update("tech", "en", 10, _news(10, "tech"))
+
+    assert snapshot.get(5, ["tech"], "en") == _news(5, "tech")
+    # categories and language are normalized like cache keys
+    assert snapshot.get(10, ["tech", "tech"], "EN") == _news(10, "tech")
+    assert snapshot.get(5, ["tech"], None) is None
+    assert snapshot.get(5, ["sports"], "en") is None
+    assert snapshot.get(5, None, "en") is None
+
+
+def test_snapshot_does_not_cover_several_categories(clock):
+    snapshot = TopNewsSnapshot(max_age=60)
+    snapshot.update("tech", None, 10, _news(10))
+    snapshot.update("sports", None, 10, _news(10))
+
+    assert snapshot.get(5, ["tech", "sports"]) is None
+
+
+def test_snapshot_does_not_cover_more_than_the_ingested_limit(clock):
+    snapshot = TopNewsSnapshot(max_age=60)
+    snapshot.update(None, None, 10, _news(10))
+
+    assert snapshot.get(10) == _news(10)
+    assert snapshot.get(11) is None
+
+
+def test_snapshot_expires_after_max_age(clock):
+    snapshot = TopNewsSnapshot(max_age=60)
+    snapshot.update(None, None, 10, _news(10))
+
+    clock.value += 60
+    assert snapshot.get(5) == _news(5)
+    clock.value += 1
+    assert snapshot.get(5) is None
+
+
+async def test_ingest_once_fills_snapshot_from_upstream(news_api, http_session):
+    upstream = NewsRepository(http_session, base_url=news_api.url)
+    snapshot = TopNewsSnapshot(max_age=60)
+    worker = NewsIngestionWorker(
+        upstream,
+        snapshot,
+        categories=["", "tech"],
+        languages=["", "en"],
+        limit=5,
+        interval=300,
+        max_requests_per_hour=3_600_000,
+    )
+
+    await worker.ingest_once()
+
+    assert worker.runs == 1
+    assert worker.errors == 0
+    queries = [query for _, _, query in news_api.requests]
+    assert [query.pop("api_token") for query in queries] == ["test"] * 4
+    assert queries == [
+        {"limit": "5"},
+        {"limit": "5", "language": "en"},
+        {"limit": "5", "categories": "tech"},
+        {"limit": "5", "categories": "tech", "language": "en"},
+    ]
+    # /news/top is then answered without calling upstream
+    repository = SnapshotNewsRepository(upstream, snapshot)
+    top = await repository.get_top(3, ["tech"], "en")
+    assert [news.uuid for news in top] == ["u0", "u1", "u2"]
+    assert top[0].categories == ["tech"]
+    assert len(news_api.requests) == 4
+
+
+async def test_ingest_once_keeps_going_after_a_failed_cell(
+    news_api, http_session
+):
+    upstream = NewsRepository(http_session, base_url=news_api.url)
+    snapshot = TopNewsSnapshot(max_age=60)
+    worker = NewsIngestionWorker(
+        upstream,
+        snapshot,
+        categories=["tech", "sports"],
+        languages=[""],
+        limit=5,
+        interval=300,
+        max_requests_per_hour=3_600_000,
+    )
+    news_api.faults.append(500)
+
+    await worker.ingest_once()
+
+    assert worker.errors == 1
+    assert snapshot.get(5, ["tech"]) is None
+    assert snapshot.get(5, ["sports"]) is not None
+
+
+async def test_ingest_once_spaces_requests_by_hourly_quota(
+    news_api, http_session
+):
+    upstream = NewsRepository(http_session, base_url=news_api.url)
+    worker = NewsIngestionWorker(
+        upstream,
+        TopNewsSnapshot(max_age=60),
+        categories=["", "tech", "sports"],
+        languages=[""],
+        limit=5,
+        interval=300,
+        # a request every 50 ms
+        max_requests_per_hour=72_000,
+    )
+
+    await worker.ingest_once()
+
+    times = [at for at, _, _ in news_api.requests]
+    assert len(times) == 3
+    assert all(
+        later - earlier >= 0.045 for earlier, later in zip(times, times[1:])
+    )
+
+
+def _pages(news_api):
+    return [
+        (query["limit"], query["page"]) for _, _, query in news_api.requests
+    ]
+
+
+def _paged(news_api, http_session) -> NewsRepository:
+    news_api.page_size = 5
+    return NewsRepository(
+        http_session, base_url=news_api.url, page_size=5, page_concurrency=2
+    )
+
+
+async def test_limit_above_page_size_is_fetched_in_pages(
+    news_api, http_session
+):
+    upstream = _paged(news_api, http_session)
+
+    top = await upstream.get_top(12)
+
+    assert [news.uuid for news in top] == [f"u{i}" for i in range(12)]
+    assert _pages(news_api) == [("5", "1"), ("5", "2"), ("5", "3")]
+
+
+async def test_short_page_is_the_last_one(news_api, http_session):
+    upstream = _paged(news_api, http_session)
+    news_api.total = 7
+
+    top = await upstream.get_top(20)
+
+    assert [news.uuid for news in top] == [f"u{i}" for i in range(7)]
+    # the third page is requested only once the first one is read
+    assert _pages(news_api) == [("5", "1"), ("5", "2")]
+
+
+async def test_streaming_stops_requesting_pages_when_closed(
+    news_api, http_session
+):
+    upstream = _paged(news_api, http_session)
+    news_api.latency = 0.01
+
+    news = upstream.iter_top(20)
+    first = [(await anext(news)).uuid for _ in range(3)]
+    await news.aclose()
+    await asyncio.sleep(0.05)
+
+    assert first == ["u0", "u1", "u2"]
+    assert _pages(news_api) == [("5", "1"), ("5", "2")]
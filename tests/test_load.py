@@ -0,0 +1,51 @@
+from benchmarks.load import _percentile, regressions
+
+SETTINGS = {"requests": 100, "concurrency": 4}
+
+
+def _results(**scenarios):
+    return {
+        "settings": dict(SETTINGS),
+        "scenarios": {
+            name: {"rps": rps, "p95_ms": p95, "errors": errors}
+            for name, (rps, p95, errors) in scenarios.items()
+        },
+    }
+
+
+def test_percentile_picks_the_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+
+    assert _percentile(values, 50) == 51.0
+    assert _percentile(values, 95) == 95.0
+    assert _percentile(values, 100) == 100.0
+    assert _percentile([7.0], 99) == 7.0
+
+
+def test_results_within_tolerance_are_not_regressions():
+    baseline = _results(top=(100.0, 10.0, 0), fast=(500.0, 1.0, 0))
+    # 25% slower plus the slack is still allowed, as is noise in 1 ms
+    results = _results(top=(76.0, 14.5, 0), fast=(400.0, 2.9, 0))
+
+    assert regressions(results, baseline, tolerance=0.25, slack_ms=2) == []
+
+
+def test_slower_fewer_or_failing_requests_are_regressions():
+    baseline = _results(top=(100.0, 10.0, 0), all=(100.0, 10.0, 1))
+    results = _results(top=(74.0, 15.0, 0), all=(100.0, 10.0, 2))
+
+    assert regressions(results, baseline, tolerance=0.25, slack_ms=2) == [
+        "top: p95 15.0 ms > 14.50 ms",
+        "top: 74.0 req/s < 75.0 req/s",
+        "all: 2 errors > 1",
+    ]
+
+
+def test_runs_with_other_settings_are_not_compared():
+    baseline = _results(top=(100.0, 10.0, 0))
+    results = _results(top=(1.0, 1000.0, 5))
+    results["settings"]["concurrency"] = 8
+
+    assert regressions(results, baseline, tolerance=0.25, slack_ms=2) == [
+        f"settings differ from the baseline: {SETTINGS}"
+    ]
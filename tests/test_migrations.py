@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from newsreader import migrations
+from newsreader.migrations import (
+    MIGRATIONS,
+    Migration,
+    applied_versions,
+    init_db,
+    migrate,
+)
+
+
+async def _valid_indexes(db, table):
+    rows = await db.fetch_all(
+        text(
+            "SELECT relname FROM pg_index"
+            " JOIN pg_class ON pg_class.oid = indexrelid"
+            " WHERE indrelid = CAST(:table AS regclass) AND indisvalid"
+        ),
+        {"table": table},
+    )
+    return {row["relname"] for row in rows}
+
+
+async def test_migrations_are_applied_once(db):
+    assert await migrate() == []
+    assert await applied_versions() == [m.version for m in MIGRATIONS]
+    assert "ix_user_friends_friend_id" in await _valid_indexes(
+        db, "user_friends"
+    )
+    assert "ix_user_favorites_news_id" in await _valid_indexes(
+        db, "user_favorites"
+    )
+
+
+async def test_concurrent_migration_runs_outside_a_transaction(db, monkeypatch):
+    migration = Migration(
+        999,
+        "Index users.name",
+        migrations._create_index_concurrently(
+            "ix_test_users_name", "users (name)"
+        ),
+        concurrent=True,
+    )
+    monkeypatch.setattr(migrations, "MIGRATIONS", [*MIGRATIONS, migration])
+    try:
+        # CREATE INDEX CONCURRENTLY fails inside a transaction
+        assert await migrate() == [migration]
+        assert "ix_test_users_name" in await _valid_indexes(db, "users")
+        assert await migrate() == []
+    finally:
+        await db.execute(text("DROP INDEX IF EXISTS ix_test_users_name"))
+        await db.execute(
+            text("DELETE FROM schema_migrations WHERE version = 999")
+        )
+
+
+async def test_init_db_retries_connection_errors(monkeypatch):
+    attempts = 0
+
+    async def unreachable():
+        nonlocal attempts
+        attempts += 1
+        raise ConnectionRefusedError("refused")
+
+    monkeypatch.setattr(migrations, "migrate", unreachable)
+
+    with pytest.raises(ConnectionError, match="Could not connect"):
+        await init_db(retries=3, delay=0)
+    assert attempts == 3
+
+
+async def test_init_db_does_not_retry_failing_migrations(monkeypatch):
+    attempts = 0
+
+    async def broken():
+        nonlocal attempts
+        attempts += 1
+        raise ProgrammingError("CREATE TABL users", {}, Exception("syntax"))
+
+    monkeypatch.setattr(migrations, "migrate", broken)
+
+    with pytest.raises(ProgrammingError):
+        await init_db(retries=3, delay=0)
+    assert attempts == 1
@@ -0,0 +1,279 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+from fastapi import HTTPException
+
+from newsreader.api import routers
+from newsreader.infrastructure import cache
+from newsreader.infrastructure.cache import CachedNewsRepository, TTLCache
+from newsreader.infrastructure.repository import NewsRepository
+from newsreader.infrastructure.resilience import (
+    CircuitBreaker,
+    TokenBucket,
+    UpstreamGuard,
+    UpstreamUnavailableError,
+)
+from newsreader.infrastructure.service import NewsService
+
+
+def _guard(
+    failure_threshold: int = 5,
+    reset_timeout: float = 60.0,
+    max_retries: int = 2,
+    limiter: Optional[TokenBucket] = None,
+) -> UpstreamGuard:
+    return UpstreamGuard(
+        limiter=limiter or TokenBucket(rate=1000, capacity=1000),
+        breaker=CircuitBreaker(failure_threshold, reset_timeout),
+        max_retries=max_retries,
+        backoff_base=0.001,
+        backoff_max=0.001,
+        max_wait=1.0,
+    )
+
+
+async def test_guard_retries_until_upstream_answers(news_api, http_session):
+    guard = _guard(max_retries=2)
+    upstream = NewsRepository(http_session, news_api.url, guard=guard)
+    news_api.faults.extend([503, 500])
+
+    news = await upstream.get_top(3)
+
+    assert [item.uuid for item in news] == ["u0", "u1", "u2"]
+    assert len(news_api.requests) == 3
+    assert guard.stats() == {
+        "state": CircuitBreaker.CLOSED,
+        "calls": 3,
+        "retries": 2,
+        "failures": 2,
+        "rejected": 0,
+    }
+
+
+async def test_guard_does_not_retry_rejected_requests(news_api, http_session):
+    guard = _guard(max_retries=2)
+    upstream = NewsRepository(http_session, news_api.url, guard=guard)
+    news_api.faults.append(400)
+
+    with pytest.raises(HTTPException):
+        await upstream.get_top(3)
+
+    assert len(news_api.requests) == 1
+    assert guard.retries == 0
+
+
+async def test_breaker_opens_fails_fast_then_probes_and_closes(
+    news_api, http_session
+):
+    guard = _guard(failure_threshold=2, reset_timeout=0.1, max_retries=0)
+    upstream = NewsRepository(http_session, news_api.url, guard=guard)
+    news_api.faults.extend([500, 500])
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await upstream.get_top(3)
+    assert guard.stats()["state"] == CircuitBreaker.OPEN
+
+    # open: calls fail without reaching upstream
+    with pytest.raises(UpstreamUnavailableError) as error:
+        await upstream.get_top(3)
+    assert 0 < error.value.retry_after <= 0.1
+    assert len(news_api.requests) == 2
+    assert guard.rejected == 1
+
+    # half open: a single probe goes through and closes the circuit
+    await asyncio.sleep(0.1)
+    news_api.latency = 0.05
+    probe = asyncio.create_task(upstream.get_top(3))
+    await asyncio.sleep(0.01)
+    with pytest.raises(UpstreamUnavailableError):
+        await upstream.get_top(3)
+    assert len(await probe) == 3
+    assert guard.stats()["state"] == CircuitBreaker.CLOSED
+    assert len(news_api.requests) == 3
+
+    news_api.latency = 0.0
+    assert len(await upstream.get_top(3)) == 3
+
+
+async def test_failed_probe_opens_the_circuit_again(news_api, http_session):
+    guard = _guard(failure_threshold=1, reset_timeout=0.05, max_retries=0)
+    upstream = NewsRepository(http_session, news_api.url, guard=guard)
+    news_api.faults.extend([500, 500])
+
+    with pytest.raises(HTTPException):
+        await upstream.get_top(3)
+    await asyncio.sleep(0.05)
+    with pytest.raises(HTTPException):
+        await upstream.get_top(3)
+
+    assert guard.stats()["state"] == CircuitBreaker.OPEN
+    with pytest.raises(UpstreamUnavailableError):
+        await upstream.get_top(3)
+    assert len(news_api.requests) == 2
+
+
+async def test_token_bucket_rejects_calls_over_the_rate(news_api, http_session):
+    limiter = TokenBucket(rate=1, capacity=2)
+    guard = UpstreamGuard(
+        limiter=limiter,
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60),
+        max_retries=2,
+        backoff_base=0.001,
+        backoff_max=0.001,
+        max_wait=0.0,
+    )
+    upstream = NewsRepository(http_session, news_api.url, guard=guard)
+
+    await upstream.get_top(3)
+    await upstream.get_top(3)
+    with pytest.raises(UpstreamUnavailableError) as error:
+        await upstream.get_top(3)
+
+    assert 0 < error.value.retry_after <= 1
+    assert len(news_api.requests) == 2
+    # a full bucket is not an upstream failure
+    assert guard.stats()["state"] == CircuitBreaker.CLOSED
+    assert guard.rejected == 1
+
+
+async def test_token_bucket_waits_up_to_max_wait():
+    limiter = TokenBucket(rate=100, capacity=1)
+
+    await limiter.acquire(max_wait=0)
+    await limiter.acquire(max_wait=0.05)
+    with pytest.raises(UpstreamUnavailableError):
+        await limiter.acquire(max_wait=0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the monotonic clock of the cache module."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(
+        cache, "time", SimpleNamespace(monotonic=lambda: now.value)
+    )
+    return now
+
+
+async def test_cache_serves_stale_news_while_upstream_fails(
+    clock, news_api, http_session
+):
+    guard = _guard(max_retries=0)
+    repository = CachedNewsRepository(
+        NewsRepository(http_session, news_api.url, guard=guard),
+        TTLCache(max_entries=10, max_bytes=1_000_000),
+        top_ttl=10,
+        all_ttl=10,
+        stale_ttl=5,
+        stale_if_error_ttl=60,
+    )
+    news = await repository.get_top(3)
+
+    # past stale_ttl, the entry is only served when loading fails
+    clock.value += 20
+    news_api.faults.append(503)
+    assert await repository.get_top(3) == news
+    assert repository.errors_served_stale == 1
+    assert len(news_api.requests) == 2
+
+    # past stale_if_error_ttl, the error is raised
+    clock.value += 60
+    news_api.faults.append(503)
+    with pytest.raises(HTTPException) as error:
+        await repository.get_top(3)
+    assert error.value.status_code == 502
+
+
+async def _get_all_news(service: NewsService):
+    return await routers.get_all_news(
+        limit=3,
+        search=None,
+        categories=None,
+        language=None,
+        stream=False,
+        service=service,
+    )
+
+
+async def test_open_circuit_is_answered_with_503_and_retry_after(
+    news_api, http_session
+):
+    guard = _guard(failure_threshold=1, reset_timeout=30, max_retries=0)
+    service = NewsService(
+        NewsRepository(http_session, news_api.url, guard=guard)
+    )
+    news_api.faults.append(502)
+
+    with pytest.raises(HTTPException) as error:
+        await _get_all_news(service)
+    # a bad gateway rather than a server error
+    assert error.value.status_code == 502
+
+    with pytest.raises(HTTPException) as error:
+        await _get_all_news(service)
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": "30"}
+
+
+async def test_news_not_found_is_not_turned_into_server_error(http_session):
+    class EmptyRepository(NewsRepository):
+        async def get_all(self, *args, **kwargs):
+            return []
+
+    service = NewsService(EmptyRepository(http_session))
+
+    with pytest.raises(HTTPException) as error:
+        await _get_all_news(service)
+    assert error.value.status_code == 404
+
+
+async def test_exhausted_quota_trips_the_breaker_without_retries(
+    news_api, http_session
+):
+    guard = _guard(failure_threshold=2, reset_timeout=30, max_retries=2)
+    service = NewsService(
+        NewsRepository(http_session, news_api.url, guard=guard)
+    )
+    # thenewsapi answers 402 usage_limit_reached once the quota is used up
+    news_api.faults.extend([402, 402, 402])
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            await _get_all_news(service)
+        # our quota is not the client's fault, its status is not passed on
+        assert error.value.status_code == 502
+    assert len(news_api.requests) == 2
+    assert guard.retries == 0
+    assert guard.stats()["state"] == CircuitBreaker.OPEN
+
+    with pytest.raises(HTTPException) as error:
+        await _get_all_news(service)
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": "30"}
+    assert len(news_api.requests) == 2
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 422])
+async def test_upstream_client_errors_are_not_passed_through(
+    news_api, http_session, status
+):
+    upstream = NewsRepository(http_session, news_api.url, guard=_guard())
+    news_api.faults.append(status)
+
+    with pytest.raises(HTTPException) as error:
+        await upstream.get_by_id("u1")
+    assert error.value.status_code == 502
+
+
+async def test_upstream_not_found_stays_not_found(news_api, http_session):
+    guard = _guard(failure_threshold=1)
+    upstream = NewsRepository(http_session, news_api.url, guard=guard)
+    news_api.faults.append(404)
+
+    with pytest.raises(HTTPException) as error:
+        await upstream.get_by_id("u1")
+    assert error.value.status_code == 404
+    assert guard.stats()["state"] == CircuitBreaker.CLOSED
@@ -0,0 +1,166 @@
+import asyncio
+import gzip
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request
+
+from newsreader.api import responses, routers
+from newsreader.core.domain import News
+from newsreader.infrastructure import cache
+from newsreader.infrastructure.cache import (
+    CachedNewsRepository,
+    ResponseCache,
+    TTLCache,
+    make_key,
+)
+from newsreader.infrastructure.service import NewsService
+
+from benchmarks.stub_api import article
+
+
+def _request(**headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/news/top",
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+
+
+def _response_cache(gzip_min_size: int = 0) -> ResponseCache:
+    return ResponseCache(
+        max_entries=10, max_bytes=1_000_000, gzip_min_size=gzip_min_size
+    )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the monotonic clock of the cache and response modules."""
+    now = SimpleNamespace(value=1000.0)
+    fake_time = SimpleNamespace(monotonic=lambda: now.value)
+    monkeypatch.setattr(cache, "time", fake_time)
+    monkeypatch.setattr(responses, "time", fake_time)
+    return now
+
+
+def test_matching_etag_is_answered_with_304(clock):
+    serialized = _response_cache().set(("k",), b'{"a": 1}', ttl=60)
+
+    response = responses.cached_json_response(serialized, _request())
+    assert response.status_code == 200
+    assert response.body == b'{"a": 1}'
+    etag = response.headers["etag"]
+
+    not_modified = responses.cached_json_response(
+        serialized, _request(if_none_match=f'W/{etag}, "other"')
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["etag"] == etag
+
+    other = responses.cached_json_response(
+        serialized, _request(if_none_match='"other"')
+    )
+    assert other.status_code == 200
+
+
+def test_gzip_is_served_when_accepted(clock):
+    body = b"[" + b'{"title": "news"},' * 100 + b"{}]"
+    serialized = _response_cache(gzip_min_size=1024).set(("k",), body, 60)
+
+    zipped = responses.cached_json_response(
+        serialized, _request(accept_encoding="br, gzip")
+    )
+    plain = responses.cached_json_response(serialized, _request())
+
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(zipped.body) == body
+    assert "content-encoding" not in plain.headers
+    assert plain.body == body
+    # both codings answer to either ETag, which differ
+    assert zipped.headers["etag"] != plain.headers["etag"]
+    assert (
+        responses.cached_json_response(
+            serialized, _request(if_none_match=plain.headers["etag"])
+        ).status_code
+        == 304
+    )
+    for response in (zipped, plain):
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["cache-control"] == "public, max-age=60"
+
+
+def test_small_bodies_are_not_gzipped(clock):
+    serialized = _response_cache(gzip_min_size=1024).set(("k",), b"[]", 60)
+
+    response = responses.cached_json_response(
+        serialized, _request(accept_encoding="gzip")
+    )
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+class Upstream:
+    """Returns a new news every time it is called."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def get_top(self, limit, categories, language):
+        self.calls += 1
+        return [News.model_validate(article(self.calls))]
+
+
+async def test_top_news_response_is_not_fresher_than_cached_news(clock):
+    upstream = Upstream()
+    service = NewsService(
+        CachedNewsRepository(
+            upstream,
+            TTLCache(max_entries=10, max_bytes=1_000_000),
+            top_ttl=60,
+            all_ttl=60,
+            stale_ttl=600,
+        )
+    )
+    response_cache = _response_cache()
+
+    async def get_top():
+        return await routers.get_top_news(
+            _request(),
+            limit=1,
+            categories=None,
+            language=None,
+            stream=False,
+            service=service,
+            response_cache=response_cache,
+        )
+
+    first = await get_top()
+    assert first.headers["cache-control"] == "public, max-age=60"
+
+    # the response expires with the news it was built from
+    clock.value += 40
+    response = await get_top()
+    assert response.headers["etag"] == first.headers["etag"]
+    assert response.headers["cache-control"] == "public, max-age=20"
+
+    # stale news are served while refreshed, but not as fresh
+    clock.value += 30
+    stale = await get_top()
+    assert stale.headers["etag"] == first.headers["etag"]
+    assert stale.headers["cache-control"] == "public, max-age=0"
+    assert response_cache.get(make_key("top", limit=1)) is None
+
+    # once refreshed, the new news get a new ETag
+    await asyncio.sleep(0)
+    assert upstream.calls == 2
+    fresh = await get_top()
+    assert fresh.headers["etag"] != first.headers["etag"]
+    assert fresh.headers["cache-control"] == "public, max-age=60"
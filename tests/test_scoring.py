@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+
+from newsreader.infrastructure.scoring import CandidateBatch, TopK
+
+
+def _batch(news_ids):
+    size = len(news_ids)
+    return CandidateBatch(
+        news_ids=news_ids,
+        titles=[f"Title {news_id}" for news_id in news_ids],
+        friends=np.zeros(size, dtype=np.int64),
+        published_at=np.full(size, np.nan),
+        relevance=np.full(size, np.nan),
+        categories=[()] * size,
+    )
+
+
+def _top(k, candidates, batch_size):
+    top = TopK(k)
+    for start in range(0, len(candidates), batch_size):
+        chunk = candidates[start : start + batch_size]
+        top.push(
+            _batch([news_id for news_id, _ in chunk]),
+            np.array([score for _, score in chunk]),
+        )
+    return [news_id for news_id, _ in top.result()]
+
+
+def test_top_k_pages_through_tied_scores():
+    rng = random.Random(7)
+    # few distinct scores, so most ties straddle the page boundaries
+    candidates = [
+        (f"n{i:03}", rng.choice([0.25, 0.5, 1.0])) for i in range(200)
+    ]
+    rng.shuffle(candidates)
+    ranking = [
+        news_id
+        for news_id, _ in sorted(candidates, key=lambda c: (-c[1], c[0]))
+    ]
+
+    limit = 7
+    pages = [
+        _top(offset + limit, candidates, batch_size=16)[offset:]
+        for offset in range(0, len(candidates), limit)
+    ]
+
+    assert [news_id for page in pages for news_id in page] == ranking
+
+
+def test_top_k_does_not_depend_on_batching():
+    candidates = [(f"n{i:03}", 1.0) for i in range(50)][::-1]
+
+    for batch_size in (1, 3, 10, 50):
+        assert _top(5, candidates, batch_size) == [
+            "n000",
+            "n001",
+            "n002",
+            "n003",
+            "n004",
+        ]
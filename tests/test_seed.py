@@ -0,0 +1,45 @@
+from sqlalchemy import func, select
+
+from newsreader.db import (
+    articles_table,
+    user_favorites_table,
+    user_friends_table,
+    user_recommendations_table,
+)
+from newsreader.infrastructure.repository import UserRepositoryDB
+
+from benchmarks.seed import seed
+
+
+async def _rows(db, table):
+    rows = await db.fetch_all(select(table))
+    return sorted(tuple(row[column.name] for column in table.c) for row in rows)
+
+
+async def test_seed_inserts_symmetric_friendships_and_recommendations(db):
+    counts = await seed(
+        users=20, friends=4, favorites=3, read_later=2, news=30, seed=1
+    )
+
+    assert counts["users"] == 20
+    assert counts["favorites"] == 60
+    assert counts["read_later"] == 40
+    friendships = {
+        (row["user_id"], row["friend_id"])
+        for row in await db.fetch_all(select(user_friends_table))
+    }
+    assert len(friendships) == counts["friendships"]
+    assert all((friend, user) in friendships for user, friend in friendships)
+    assert all(user != friend for user, friend in friendships)
+    # every favorite is a stored article
+    stored = await db.fetch_one(
+        select(func.count().label("count")).select_from(articles_table)
+    )
+    assert stored and stored["count"] == 30
+    favorites = await db.fetch_all(select(user_favorites_table.c.news_id))
+    assert {row["news_id"] for row in favorites} <= {f"u{i}" for i in range(30)}
+
+    recommendations = await _rows(db, user_recommendations_table)
+    assert recommendations
+    await UserRepositoryDB().rebuild_recommendations()
+    assert recommendations == await _rows(db, user_recommendations_table)
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from newsreader.infrastructure.singleflight import SingleFlight
+
+
+class Upstream:
+    """A call which runs until released, counting how often it started."""
+
+    def __init__(self) -> None:
+        self.started = 0
+        self.cancelled = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> int:
+        self.started += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.started
+
+
+async def test_callers_share_one_call():
+    flight = SingleFlight()
+    upstream = Upstream()
+
+    callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(3)]
+    await asyncio.sleep(0)
+    upstream.release.set()
+
+    assert await asyncio.gather(*callers) == [1, 1, 1]
+    assert upstream.started == 1
+    assert (flight.calls, flight.shared) == (1, 2)
+
+
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+    upstream = Upstream()
+    first = asyncio.create_task(flight.do("k", upstream))
+    second = asyncio.create_task(flight.do("k", upstream))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    upstream.release.set()
+
+    assert await second == 1
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert upstream.cancelled == 0
+
+
+async def test_call_is_cancelled_once_every_caller_left():
+    flight = SingleFlight()
+    upstream = Upstream()
+    callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert upstream.cancelled == 1
+
+
+async def test_caller_arriving_while_call_is_cancelled_starts_a_new_one():
+    flight = SingleFlight()
+    upstream = Upstream()
+    first = asyncio.create_task(flight.do("k", upstream))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    # the shared call is cancelled, but has not finished yet
+    late = asyncio.create_task(flight.do("k", upstream))
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    upstream.release.set()
+
+    assert await late == 2
+    assert upstream.started == 2
+    assert upstream.cancelled == 1
+
+
+async def test_error_is_raised_to_every_caller():
+    flight = SingleFlight()
+    started = 0
+
+    async def failing() -> None:
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(
+        *(flight.do("k", failing) for _ in range(3)), return_exceptions=True
+    )
+
+    assert started == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    # the failed call is forgotten, the next caller retries
+    with pytest.raises(ValueError):
+        await flight.do("k", failing)
+    assert started == 2
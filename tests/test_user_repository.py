@@ -0,0 +1,269 @@
+import asyncio
+from typing import List, Tuple
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+
+from newsreader.api import routers
+
+from newsreader.core.domain import NewsPreview, User
+from newsreader.db import (
+    Database,
+    read_later_table,
+    user_favorites_table,
+    user_friends_table,
+    user_recommendations_table,
+    user_table,
+)
+from newsreader.infrastructure.cache import FeedCache
+from newsreader.infrastructure.repository import UserRepositoryDB
+from newsreader.infrastructure.service import UserService
+
+
+async def _create_users(db: Database, count: int) -> List[int]:
+    """Create users, each a friend of the next, with a favorite and a news
+    to read later."""
+    user_ids = list(range(1, count + 1))
+    await db.execute(
+        user_table.insert().values(
+            [{"id": i, "name": f"User {i}"} for i in user_ids]
+        )
+    )
+    friendships = [{"user_id": i, "friend_id": i % count + 1} for i in user_ids]
+    if count > 1:
+        await db.execute(user_friends_table.insert().values(friendships))
+    for table in (user_favorites_table, read_later_table):
+        await db.execute(
+            table.insert().values(
+                [
+                    {"user_id": i, "news_id": f"n{i}", "title": f"News {i}"}
+                    for i in user_ids
+                ]
+            )
+        )
+    return user_ids
+
+
+@pytest.mark.parametrize("count", [1, 50])
+async def test_get_all_query_count_does_not_depend_on_users(db, queries, count):
+    await _create_users(db, count)
+    repository = UserRepositoryDB()
+
+    queries.reset()
+    users = await repository.get_all()
+
+    # users, then friends, favorites and read later of all of them
+    assert queries.count == 4
+    assert len(users) == count
+    assert all(len(user.favorites) == 1 for user in users)
+    assert all(len(user.read_later) == 1 for user in users)
+    if count > 1:
+        assert all(len(user.friends) == 1 for user in users)
+
+
+async def _recommendations(db: Database) -> List[Tuple[int, str, int]]:
+    rows = await db.fetch_all(
+        select(
+            user_recommendations_table.c.user_id,
+            user_recommendations_table.c.news_id,
+            user_recommendations_table.c.score,
+        ).order_by(
+            user_recommendations_table.c.user_id,
+            user_recommendations_table.c.news_id,
+        )
+    )
+    return [(row["user_id"], row["news_id"], row["score"]) for row in rows]
+
+
+async def test_concurrent_changes_keep_recommendation_scores(db):
+    pairs = 50
+    await db.execute(
+        user_table.insert().values(
+            [{"id": i, "name": f"User {i}"} for i in range(1, 2 * pairs + 1)]
+        )
+    )
+    repository = UserRepositoryDB()
+
+    # a friend favorites news while the friendship is added or changed
+    await asyncio.gather(
+        *(
+            change
+            for i in range(1, pairs + 1)
+            for change in (
+                repository.add_friend(i, pairs + i),
+                repository.add_to_favorites(pairs + i, f"n{i}", "News"),
+            )
+        )
+    )
+    await asyncio.gather(
+        *(
+            change
+            for i in range(1, pairs + 1)
+            for change in (
+                repository.update_user(
+                    i, User(id=i, name=f"User {i}", friends=[])
+                ),
+                repository.add_to_favorites(pairs + i, f"m{i}", "News"),
+            )
+        )
+    )
+    await asyncio.gather(
+        *(
+            change
+            for i in range(1, pairs + 1)
+            for change in (
+                repository.add_friend(pairs + i, i),
+                repository.delete_from_favorites(pairs + i, f"n{i}"),
+            )
+        )
+    )
+
+    incremental = await _recommendations(db)
+    await repository.rebuild_recommendations()
+    assert incremental == await _recommendations(db)
+    assert len(incremental) == pairs
+
+
+async def _assert_matches_rebuild(
+    db: Database, repository: UserRepositoryDB
+) -> List[Tuple[int, str, int]]:
+    incremental = await _recommendations(db)
+    await repository.rebuild_recommendations()
+    assert incremental == await _recommendations(db)
+    return incremental
+
+
+async def test_each_change_keeps_recommendations_like_a_rebuild(db):
+    repository = UserRepositoryDB()
+    user_ids = [
+        await repository.create_user(User(id=0, name=f"User {i}"))
+        for i in range(1, 5)
+    ]
+    first, second, third, fourth = user_ids
+    for user_id in (second, third):
+        await repository.add_to_favorites(user_id, "shared", "Shared")
+    await repository.add_to_favorites(fourth, "own", "Own")
+
+    await repository.add_friend(first, second)
+    await repository.add_friend(first, third)
+    assert await _assert_matches_rebuild(db, repository) == [
+        (first, "shared", 2)
+    ]
+    assert await repository.get_recommended_news(first) == [
+        NewsPreview(uuid="shared", title="Shared")
+    ]
+
+    await repository.add_friend(first, fourth)
+    await repository.add_to_favorites(second, "more", "More")
+    assert await _assert_matches_rebuild(db, repository) == [
+        (first, "more", 1),
+        (first, "own", 1),
+        (first, "shared", 2),
+    ]
+
+    await repository.delete_from_favorites(second, "shared")
+    await repository.delete_friend(first, fourth)
+    assert await _assert_matches_rebuild(db, repository) == [
+        (first, "more", 1),
+        (first, "shared", 1),
+    ]
+
+    await repository.delete_user(third)
+    await repository.delete_user(second)
+    assert await _assert_matches_rebuild(db, repository) == []
+
+
+async def test_update_user_applies_changed_titles(db):
+    await _create_users(db, 1)
+    repository = UserRepositoryDB()
+    user = await repository.get_by_id(1)
+    assert user is not None
+
+    user.favorites[0].title = "Favorite renamed"
+    user.read_later[0].title = "Read later renamed"
+    user.favorites.append(NewsPreview(uuid="n2", title="News 2"))
+    await repository.update_user(1, user)
+
+    updated = await repository.get_by_id(1)
+    assert updated is not None
+    assert sorted(updated.favorites, key=lambda news: news.uuid) == [
+        NewsPreview(uuid="n1", title="Favorite renamed"),
+        NewsPreview(uuid="n2", title="News 2"),
+    ]
+    assert updated.read_later == [
+        NewsPreview(uuid="n1", title="Read later renamed")
+    ]
+
+
+async def _users_page(limit, after=None):
+    response = Response()
+    users = await routers.get_all_users(
+        response,
+        limit=limit,
+        after=after,
+        stream=False,
+        service=UserService(UserRepositoryDB()),
+    )
+    return users, response.headers.get("X-Next-Cursor")
+
+
+@pytest.mark.parametrize("count", [5, 6])
+async def test_keyset_pages_walk_all_users(db, count):
+    user_ids = await _create_users(db, count)
+
+    seen = []
+    users, cursor = await _users_page(limit=2)
+    seen.extend(user.id for user in users)
+    while cursor is not None:
+        users, cursor = await _users_page(limit=2, after=int(cursor))
+        assert users
+        seen.extend(user.id for user in users)
+
+    assert seen == user_ids
+
+
+async def test_keyset_page_past_the_last_user_is_empty(db):
+    await _create_users(db, 2)
+
+    users, cursor = await _users_page(limit=2)
+    # a full last page has no cursor to an empty one
+    assert [user.id for user in users] == [1, 2]
+    assert cursor is None
+    # but an older cursor may still point past the last user
+    assert await _users_page(limit=2, after=2) == ([], None)
+
+
+async def test_no_users_is_not_found(db):
+    with pytest.raises(HTTPException) as error:
+        await _users_page(limit=2)
+    assert error.value.status_code == 404
+
+
+async def test_update_user_invalidates_feeds_of_changed_friends(db):
+    await db.execute(
+        user_table.insert().values(
+            [{"id": i, "name": f"User {i}"} for i in range(1, 5)]
+        )
+    )
+    feed_cache = FeedCache(max_entries=10, max_bytes=1_000_000, ttl=60)
+    service = UserService(UserRepositoryDB(), feed_cache)
+    await service.add_friend(1, 2)
+    for user_id in range(1, 5):
+        feed_cache.set(user_id, [], feed_cache.generation())
+
+    # 2 is no longer a friend of 1, 3 becomes one
+    await service.update_user(1, User(id=1, name="User 1", friends=[3]))
+
+    assert [feed_cache.current(i) is None for i in range(1, 5)] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    assert await service.get_user_by_id(2) == User(id=2, name="User 2")
+
+    feed_cache.set(3, [], feed_cache.generation())
+    await service.delete_user(1)
+    assert feed_cache.current(3) is None
+    assert feed_cache.current(4) is not None